@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic import BaseModel
 
 
@@ -8,6 +10,34 @@ class Settings(BaseModel):
     quest_ws_min_hz: int = 1
     quest_ws_max_hz: int = 200
     quest_ws_default_hz: int = 30
+
+    # set_project 시 모든 gap 브릿지를 미리 계산 (첫 재생/스크럽 지연 제거)
+    motion_precompute_bridges: bool = False
+    motion_bridge_workers: int = 4
+    # 브릿지 LRU 캐시 한도 (개수 / 메모리)
+    motion_bridge_cache_entries: int = 4096
+    motion_bridge_cache_mb: int = 64
+    # gap 브릿지 방식: ruckig | quintic | septic (다항식은 limit 초과 시 Ruckig로 대체)
+    motion_bridge_mode: Literal["ruckig", "quintic", "septic"] = "ruckig"
+    # 최종 trajectory를 제어 주기(master_arm_loop_period) 격자로 미리 렌더링
+    # (재생 tick / export / prefetch가 평가 대신 인덱스로 읽는다)
+    motion_bake: bool = False
+    # 소스 프레임 저장 형식: float64 | float32 | int16 (관절별 scale/offset 양자화)
+    motion_frame_storage: Literal["float64", "float32", "int16"] = "float64"
+    # 소스 레지스트리를 .npy(해시 이름)로 저장하고 memmap으로 여는 디렉터리 (None이면 메모리에만)
+    motion_source_dir: Optional[str] = None
+    # 소스 레지스트리 메모리 상한 (0이면 무제한). 넘으면 현재 프로젝트가 쓰지 않는 소스부터 LRU로 버린다
+    motion_source_registry_mb: int = 512
+    # export 시 한 번에 평가/포맷하는 행 수 (메모리 = chunk 하나 분량)
+    motion_export_chunk_rows: int = 4096
+    # evaluator 단계별 지연 히스토그램 계측 (/motion/stats, 런타임에도 켤 수 있다)
+    motion_instrument: bool = False
+    # seek / prefetch 결과 LRU (0이면 끔). quantum_ms > 1이면 그 격자로 시각을 스냅
+    motion_pose_cache_mb: int = 16
+    motion_pose_cache_quantum_ms: int = 1
+    # 평가(seek / prefetch / envelope / export) 스레드 풀 크기와 연결당 동시 실행 수
+    motion_eval_workers: int = 4
+    motion_eval_per_connection: int = 2
     
     
 settings = Settings()
\ No newline at end of file
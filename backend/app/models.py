@@ -1,6 +1,6 @@
 # app/models.py
 from __future__ import annotations
-from typing import Dict, List, Optional, Literal, Any
+from typing import Annotated, Dict, List, Optional, Literal, Union
 from pydantic import BaseModel, Field, model_validator
 
 from app.motion.types import DOF
@@ -10,13 +10,22 @@ from app.motion.types import DOF
 class Source(BaseModel):
     id: str
     dt: float = Field(..., gt=0, description="Seconds per frame (uniform sampling)")
-    frames: List[List[float]] = Field(
-        ..., description=f"List of frames; each pose must have length {DOF}"
+    frames: Optional[List[List[float]]] = Field(
+        None,
+        description=f"List of frames; each pose must have length {DOF}. "
+        "Omit when referring to an uploaded source by hash",
     )
     name: Optional[str] = None
+    hash: Optional[str] = Field(
+        None, description="Content hash returned by POST /motion/sources"
+    )
 
     @model_validator(mode="after")
     def _check_frames(self):
+        if self.frames is None:
+            if not self.hash:
+                raise ValueError("Source needs either frames or hash")
+            return self
         if not self.frames:
             raise ValueError("Source.frames must not be empty")
         for i, q in enumerate(self.frames):
@@ -70,14 +79,80 @@ class SetProjectMsg(BaseModel):
     project: Project
 
 
+# ---------- Incremental Ops (apply_ops) ----------
+class AddClipOp(BaseModel):
+    op: Literal["add_clip"] = "add_clip"
+    clip: Clip
+
+
+class MoveClipOp(BaseModel):
+    op: Literal["move_clip"] = "move_clip"
+    clipId: str
+    t0: int = Field(..., ge=0, description="New start time (ms)")
+
+
+class TrimClipOp(BaseModel):
+    op: Literal["trim_clip"] = "trim_clip"
+    clipId: str
+    inFrame: int = Field(..., ge=0)
+    outFrame: int = Field(..., ge=1)
+    t0: Optional[int] = Field(
+        None, ge=0, description="왼쪽 trim처럼 시작 시각도 같이 바뀌는 경우"
+    )
+
+    @model_validator(mode="after")
+    def _check_range(self):
+        if self.outFrame <= self.inFrame:
+            raise ValueError("trim_clip.outFrame must be > inFrame")
+        return self
+
+
+class DeleteClipOp(BaseModel):
+    op: Literal["delete_clip"] = "delete_clip"
+    clipId: str
+
+
+class SetBlendOp(BaseModel):
+    op: Literal["set_blend"] = "set_blend"
+    clipId: str
+    blend: Blend
+
+
+class AddSourceOp(BaseModel):
+    op: Literal["add_source"] = "add_source"
+    source: Source
+
+
+class RemoveSourceOp(BaseModel):
+    op: Literal["remove_source"] = "remove_source"
+    sourceId: str
+
+
+Op = Annotated[
+    Union[
+        AddClipOp,
+        MoveClipOp,
+        TrimClipOp,
+        DeleteClipOp,
+        SetBlendOp,
+        AddSourceOp,
+        RemoveSourceOp,
+    ],
+    Field(discriminator="op"),
+]
+
+
 class ApplyOpsMsg(BaseModel):
     type: Literal["apply_ops"] = "apply_ops"
-    ops: List[Dict[str, Any]]
+    ops: List[Op]
 
 
 class SeekMsg(BaseModel):
     type: Literal["seek"] = "seek"
     t_ms: int
+    req: Optional[Union[int, str]] = Field(
+        None, description="Client request id (echoed in the reply)"
+    )
 
 
 class PrefetchMsg(BaseModel):
@@ -85,6 +160,45 @@ class PrefetchMsg(BaseModel):
     center_ms: int
     window_ms: int = 4000
     step_ms: float = 16.67
+    req: Optional[Union[int, str]] = Field(
+        None, description="Client request id (echoed in the reply)"
+    )
+    joint_mask: int = Field(
+        (1 << DOF) - 1,
+        ge=1,
+        le=(1 << DOF) - 1,
+        description="Bit i set → joint i is included in poses",
+    )
+
+
+class EnvelopeMsg(BaseModel):
+    type: Literal["envelope"] = "envelope"
+    t0_ms: float
+    t1_ms: float
+    pixels: int = Field(..., ge=1, le=8192, description="Bucket count (one per pixel)")
+    sourceId: Optional[str] = Field(
+        None, description="If set, envelope of this source (source-local time)"
+    )
+    req: Optional[Union[int, str]] = Field(
+        None, description="Client request id (echoed in the reply)"
+    )
+
+
+class SourceUploadReq(BaseModel):
+    frames: List[List[float]] = Field(
+        ..., description=f"List of frames; each pose must have length {DOF}"
+    )
+
+
+class SourceUploadHeader(BaseModel):
+    """Binary upload header (JSON form field next to the buffer)."""
+
+    id: Optional[str] = None
+    dt: Optional[float] = Field(None, gt=0, description="Seconds per frame")
+    name: Optional[str] = None
+    dtype: Optional[Literal["f32", "f64"]] = Field(
+        None, description="Element type of a raw buffer (ignored for .npy/.npz)"
+    )
 
 
 # ---------- Robot / Quest ----------
@@ -1,12 +1,14 @@
 # app/motion/adapters.py
 from __future__ import annotations
-from typing import Dict
+from typing import Dict, Optional
 from app.models import (
     Project as PydProject,
     Clip as PydClip,
     Source as PydSource,
     Blend as PydBlend,
 )
+from .frames import FrameStore
+from .source_registry import SourceRegistry
 from .types import (
     Project as RTProject,
     Clip as RTClip,
@@ -15,39 +17,63 @@ from .types import (
 )
 
 
-def to_runtime(p: PydProject) -> RTProject:
-    """Pydantic Project -> Runtime Project (dataclass)"""
-    sources_rt: Dict[str, RTSource] = {}
-    for sid, s in p.sources.items():
-        sources_rt[sid] = RTSource(
-            id=s.id,
-            dt=float(s.dt),
-            frames=[list(q) for q in s.frames],
-            name=s.name,
-        )
+def source_to_runtime(
+    s: PydSource, registry: Optional[SourceRegistry] = None
+) -> RTSource:
+    """
+    registry가 있으면 프레임은 내용 해시로 등록/조회한다.
+    - frames가 있으면 등록 (이미 있는 내용이면 기존 저장소 재사용)
+    - hash만 있으면 이미 올라와 있는 저장소를 그대로 참조 (복사 X)
+    registry가 없으면 frames를 float64로 그대로 담는다.
+    """
+    h = s.hash
+    if s.frames is not None:
+        if registry is not None:
+            h, frames = registry.register(s.frames)
+        else:
+            frames = FrameStore.encode(s.frames)
+    else:
+        try:
+            if registry is None:
+                raise KeyError(h)
+            frames = registry.get(h)
+        except KeyError:
+            raise ValueError(f"Source {s.id}: unknown or evicted source hash {h}")
+    return RTSource(id=s.id, dt=float(s.dt), frames=frames, name=s.name, hash=h)
+
+
+def clip_to_runtime(c: PydClip) -> RTClip:
+    return RTClip(
+        id=c.id,
+        sourceId=c.sourceId,
+        t0=int(c.t0),
+        inFrame=int(c.inFrame),
+        outFrame=int(c.outFrame),
+        name=c.name,
+        blend=blend_to_runtime(c.blend or PydBlend()),
+    )
+
+
+def blend_to_runtime(b: PydBlend) -> RTBlend:
+    return RTBlend(
+        mode=b.mode,
+        inMs=int(b.inMs),
+        outMs=int(b.outMs),
+        curve=b.curve,
+        weight=float(b.weight),
+        priority=int(b.priority),
+    )
 
-    clips_rt = []
-    for c in p.clips:
-        b: PydBlend = c.blend or PydBlend()
-        clips_rt.append(
-            RTClip(
-                id=c.id,
-                sourceId=c.sourceId,
-                t0=int(c.t0),
-                inFrame=int(c.inFrame),
-                outFrame=int(c.outFrame),
-                name=c.name,
-                blend=RTBlend(
-                    mode=b.mode,
-                    inMs=int(b.inMs),
-                    outMs=int(b.outMs),
-                    curve=b.curve,
-                    weight=float(b.weight),
-                    priority=int(b.priority),
-                ),
-            )
-        )
 
+def to_runtime(p: PydProject, registry: Optional[SourceRegistry] = None) -> RTProject:
+    """
+    Pydantic Project -> Runtime Project (dataclass)
+    registry: 소스 프레임 레지스트리 (해시 참조 해석 / 저장 형식 / 디스크 저장)
+    """
+    sources_rt: Dict[str, RTSource] = {
+        sid: source_to_runtime(s, registry) for sid, s in p.sources.items()
+    }
+    clips_rt = [clip_to_runtime(c) for c in p.clips]
     return RTProject(lengthMs=int(p.lengthMs), sources=sources_rt, clips=clips_rt)
 
 
@@ -58,8 +84,9 @@ def from_runtime(p: RTProject) -> PydProject:
         sources_pd[sid] = PydSource(
             id=s.id,
             dt=float(s.dt),
-            frames=[list(q) for q in s.frames],
+            frames=s.frames.tolist(),
             name=s.name,
+            hash=s.hash,
         )
 
     clips_pd = []
@@ -0,0 +1,43 @@
+# app/motion/bake.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class BakedTrajectory:
+    """
+    제어 주기 격자로 미리 렌더링한 최종 trajectory (블렌딩 + 브릿지 포함).
+
+    - times[i] = round(i * step_ms) : time_grid(0, end, step_ms)와 동일한 정수 ms 시각
+    - q[i]                          : times[i]에서의 평가 결과 [N, DOF] (읽기 전용)
+
+    evaluator는 요청 시각이 격자 시각과 정확히 같을 때만 q를 읽고,
+    나머지는 그대로 평가한다 → 결과는 bake 유무와 무관하게 동일하다.
+    """
+
+    step_ms: float
+    times: np.ndarray  # [N]
+    q: np.ndarray  # [N, DOF]
+
+    def __len__(self) -> int:
+        return self.times.shape[0]
+
+    @property
+    def end_ms(self) -> float:
+        return float(self.times[-1]) if len(self) else 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.nbytes + self.q.nbytes
+
+    def lookup(self, ts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """샘플별 (hit [N] bool, idx [N]). hit인 샘플만 q[idx]가 유효하다."""
+        n = len(self)
+        idx = np.rint(ts / self.step_ms).astype(np.int64)
+        inside = (idx >= 0) & (idx < n)
+        idx = np.where(inside, idx, 0)
+        hit = inside & (self.times[idx] == ts) if n else inside
+        return hit, idx
@@ -1,42 +1,126 @@
 # app/motion/bridge_cache.py
 from __future__ import annotations
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Dict, Optional
+import hashlib
+import threading
+
+import numpy as np
+
+from .poly_bridge import PolyBridge
+from .types import DOF
+
+# Ruckig Trajectory는 C++ 객체라 크기를 직접 잴 수 없다 → DOF당 프로파일 크기 추정치
+_RUCKIG_TRAJ_NBYTES_PER_DOF = 512
+
+
+def digest_arrays(*arrays: np.ndarray) -> bytes:
+    """float64 배열들의 내용 해시 (16 bytes)."""
+    h = hashlib.blake2b(digest_size=16)
+    for a in arrays:
+        h.update(np.ascontiguousarray(a, dtype=np.float64).tobytes())
+    return h.digest()
 
 
 @dataclass(frozen=True)
 class BridgeKey:
-    # 두 클립과 그 경계가 바뀌면 키가 달라지도록 구성
-    prev_id: str
-    next_id: str
-    prev_in: int
-    prev_out: int
-    next_in: int
-    next_out: int
-    prev_t0: int
-    next_t0: int
-    dt_ms_prev: int
-    dt_ms_next: int
+    # 내용 기반 키: 블렌딩된 경계 상태 + gap 길이 + limit이 같으면
+    # 어떤 클립/프로젝트에서 왔든 같은 브릿지를 재사용한다.
+    state_digest: bytes  # (q0, v0, a0, q1, v1, a1)
+    limits_digest: bytes  # (v_max, a_max, j_max, control_dt, bridge mode)
+    T_ms: int  # gap 길이 (ms)
+
+    @staticmethod
+    def of(
+        q0: np.ndarray,
+        v0: np.ndarray,
+        a0: np.ndarray,
+        q1: np.ndarray,
+        v1: np.ndarray,
+        a1: np.ndarray,
+        T_ms: int,
+        limits_digest: bytes,
+    ) -> BridgeKey:
+        return BridgeKey(
+            state_digest=digest_arrays(q0, v0, a0, q1, v1, a1),
+            limits_digest=limits_digest,
+            T_ms=int(T_ms),
+        )
 
 
 @dataclass
 class BridgeCacheItem:
-    t0_ms: int  # gap 시작 (project time)
     T_ms: float  # gap 길이 (ms)
-    duration_s: float  # ruckig trajectory duration (s)
-    # ruckig Trajectory 객체를 런타임에 보관 (직렬화 X)
+    duration_s: float  # trajectory duration (s)
+    # ruckig Trajectory 객체를 런타임에 보관 (직렬화 X). poly 브릿지면 None
     traj: object  # ruckig.Trajectory
+    q0: np.ndarray  # 시작 경계 pose (브릿지 생성 실패 시 유지)
+    poly: Optional[PolyBridge] = None  # 닫힌형 다항식 브릿지 (limit 안일 때만)
+
+    @property
+    def nbytes(self) -> int:
+        if self.poly is not None:
+            return self.q0.nbytes + self.poly.nbytes
+        return self.q0.nbytes + DOF * _RUCKIG_TRAJ_NBYTES_PER_DOF
 
 
 class BridgeCache:
-    def __init__(self) -> None:
-        self._map: Dict[BridgeKey, BridgeCacheItem] = {}
+    """
+    내용 주소 기반 LRU 브릿지 캐시 (스레드 안전).
+    max_entries / max_bytes 중 하나라도 넘으면 오래된 것부터 버린다.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 64 << 20) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self._map: OrderedDict[BridgeKey, BridgeCacheItem] = OrderedDict()
+        self._lock = threading.Lock()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._map)
 
     def get(self, key: BridgeKey) -> Optional[BridgeCacheItem]:
-        return self._map.get(key)
+        with self._lock:
+            item = self._map.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._map.move_to_end(key)
+            self.hits += 1
+            return item
 
     def put(self, key: BridgeKey, item: BridgeCacheItem) -> None:
-        self._map[key] = item
+        with self._lock:
+            old = self._map.pop(key, None)
+            if old is not None:
+                self._nbytes -= old.nbytes
+            self._map[key] = item
+            self._nbytes += item.nbytes
+            while len(self._map) > 1 and (
+                len(self._map) > self.max_entries or self._nbytes > self.max_bytes
+            ):
+                _, ev = self._map.popitem(last=False)
+                self._nbytes -= ev.nbytes
+                self.evictions += 1
 
     def clear(self) -> None:
-        self._map.clear()
+        with self._lock:
+            self._map.clear()
+            self._nbytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._map),
+                "bytes": self._nbytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,81 @@
+# app/motion/clip_index.py
+from __future__ import annotations
+from typing import Tuple
+
+import numpy as np
+
+
+class ClipIndex:
+    """
+    클립 구간 분할 (compile_timeline이 세그먼트 테이블을 만들 때만 쓴다).
+
+    - starts[i] .. ends[i] : 클립 i가 커버하는 구간 (양끝 포함, ms)
+    - tails[i]             : 클립 i의 마지막 프레임 시각 (이웃 탐색용, ms)
+    - cuts                 : 추가로 구간을 자를 시각들 (선택)
+
+    모든 경계점(bounds)으로 시간축을 elementary 구간 [bounds[i], bounds[i+1])으로
+    나누고, (구간, 클립) 활성 쌍을 구간 → 클립 순으로 정렬해 entry_seg / entry_clip에 둔다.
+    시각 → 세그먼트 조회는 CompiledTimeline.segment_of가 맡는다.
+    클립 번호는 입력 순서(=evaluator의 _clips_sorted 위치)이다.
+    """
+
+    def __init__(
+        self,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        tails: np.ndarray,
+        cuts: np.ndarray = np.empty((0,)),
+    ):
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.tails = np.asarray(tails, dtype=np.float64)
+        n = self.starts.shape[0]
+
+        # 양끝 포함 [s, e] → 반열림 [s, nextafter(e))
+        ends_x = np.nextafter(self.ends, np.inf)
+        self.bounds = np.unique(
+            np.concatenate([self.starts, ends_x, np.asarray(cuts, dtype=np.float64)])
+        )
+
+        # 클립 i는 구간 first[i] .. last[i]-1 을 연속으로 커버한다
+        first = np.searchsorted(self.bounds, self.starts, side="left")
+        last = np.searchsorted(self.bounds, ends_x, side="left")
+        counts = last - first
+        total = int(counts.sum())
+        entry_clip = np.repeat(np.arange(n, dtype=np.int64), counts)
+        offsets = np.arange(total, dtype=np.int64) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        entry_seg = np.repeat(first, counts) + offsets
+
+        # (구간, 클립) 순 정렬
+        order = np.lexsort((entry_clip, entry_seg))
+        self.entry_seg = entry_seg[order]  # 구간별 활성 클립 (flat)
+        self.entry_clip = entry_clip[order]
+
+        # 이웃 탐색용 정렬 배열
+        self._start_order = np.argsort(self.starts, kind="stable")
+        self._starts_sorted = self.starts[self._start_order]
+        self._tail_order = np.argsort(self.tails, kind="stable")
+        self._tails_sorted = self.tails[self._tail_order]
+
+    def __len__(self) -> int:
+        return self.starts.shape[0]
+
+    # ---------- neighbors ----------
+    def neighbors(self, ts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        샘플별 (prev, next) 클립 번호. 없으면 -1.
+        - prev: 마지막 프레임 시각(tail) <= t 인 클립 중 가장 늦게 끝나는 것
+        - next: 시작 시각 >= t 인 클립 중 가장 먼저 시작하는 것
+        """
+        n = len(self)
+        pi = np.searchsorted(self._tails_sorted, ts, side="right") - 1
+        prev = np.where(pi >= 0, self._tail_order[np.maximum(pi, 0)], -1) if n else pi
+        ni = np.searchsorted(self._starts_sorted, ts, side="left")
+        nxt = (
+            np.where(ni < n, self._start_order[np.minimum(ni, n - 1)], -1)
+            if n
+            else np.full(ts.shape, -1, dtype=np.int64)
+        )
+        return prev, nxt
@@ -0,0 +1,187 @@
+# app/motion/envelope.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def _reduce_level(
+    mn: np.ndarray,
+    mx: np.ndarray,
+    cells: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """아래 레벨의 셀 2c, 2c+1 → 셀 c. cells가 주어지면 그 셀들만 계산."""
+    m = mn.shape[0]
+    if cells is None:
+        cells = np.arange((m + 1) // 2, dtype=np.int64)
+    left = 2 * cells
+    right = np.minimum(left + 1, m - 1)
+    return np.minimum(mn[left], mn[right]), np.maximum(mx[left], mx[right])
+
+
+def _prefix_sum(q: np.ndarray, out: Optional[np.ndarray] = None, start: int = 0):
+    """
+    누적합 P [N+1, DOF] float64 (P[i] = 샘플 [0, i)의 합). out이 주어지면
+    P[start+1:]만 다시 채운다 (P[:start+1]은 그대로 둔다).
+    """
+    if out is None:
+        out = np.empty((q.shape[0] + 1, q.shape[1]), dtype=np.float64)
+        out[0] = 0.0
+        start = 0
+    np.cumsum(q[start:], axis=0, dtype=np.float64, out=out[start + 1 :])
+    out[start + 1 :] += out[start]
+    return out
+
+
+@dataclass(frozen=True)
+class EnvelopePyramid:
+    """
+    [N, DOF] 샘플에 대한 관절별 min/max mipmap + 누적합.
+
+    - level 0 = 원본 샘플 그대로 (배열 공유, 복사 X). float32/int16 원본이면
+      min/max도 같은 dtype으로 둔다 (값은 저장 단위).
+    - level k 셀 c = level 0 샘플 [c·2^k, (c+1)·2^k) 의 min / max
+    - prefix [N+1, DOF] float64: 샘플 [0, i)의 합 (mean용)
+    - 샘플 i의 시각 = i * step_ms (원점 0)
+
+    query()는 픽셀당 버킷 하나를 돌려준다. 버킷의 샘플 구간 [a, b)를 레벨마다 양 끝
+    셀 하나씩만 떼어 내는 방식(segment tree)으로 겹침 없이 정확히 덮고, mean은
+    prefix[b] - prefix[a]로 구한다 → min / max / mean 모두 [a, b) 샘플만의 값이다.
+    """
+
+    step_ms: float
+    mins: Tuple[np.ndarray, ...]
+    maxs: Tuple[np.ndarray, ...]
+    prefix: np.ndarray
+
+    @property
+    def n(self) -> int:
+        return self.mins[0].shape[0]
+
+    @property
+    def base(self) -> np.ndarray:
+        return self.mins[0]
+
+    @property
+    def nbytes(self) -> int:
+        # level 0은 원본 공유라 제외
+        return self.prefix.nbytes + sum(
+            a.nbytes for lv in (self.mins, self.maxs) for a in lv[1:]
+        )
+
+    @staticmethod
+    def build(q: np.ndarray, step_ms: float) -> EnvelopePyramid:
+        mins, maxs = [q], [q]
+        while mins[-1].shape[0] > 1:
+            mn, mx = _reduce_level(mins[-1], maxs[-1])
+            mins.append(mn)
+            maxs.append(mx)
+        return EnvelopePyramid(float(step_ms), tuple(mins), tuple(maxs), _prefix_sum(q))
+
+    def updated(
+        self, q: np.ndarray, dirty: List[Tuple[float, float]]
+    ) -> EnvelopePyramid:
+        """
+        새 level 0 샘플 q로 갱신. dirty [(lo, hi)] ms 구간과 길이 변화로
+        바뀐 셀만 다시 계산하고 나머지는 이전 레벨을 복사한다.
+        """
+        n, n_old = q.shape[0], self.n
+        if n == 0 or n_old == 0:
+            return EnvelopePyramid.build(q, self.step_ms)
+        spans = []
+        span_ms = n * self.step_ms
+        for lo, hi in dirty:
+            lo, hi = max(lo, 0.0), min(hi, span_ms)  # ±inf 포함
+            a = int(np.floor(lo / self.step_ms))
+            b = min(n, int(np.ceil(hi / self.step_ms)) + 1)
+            if a < b:
+                spans.append((a, b))
+        # 길이가 달라지면 이전 마지막 샘플부터 끝까지 (부분 셀 포함)
+        if n != n_old:
+            spans.append((min(n, n_old) - 1, n))
+
+        mins, maxs = [q], [q]
+        k = 0
+        while mins[-1].shape[0] > 1:
+            k += 1
+            m = (mins[-1].shape[0] + 1) // 2
+            if k < len(self.mins):
+                keep = min(m, self.mins[k].shape[0])
+                mn = np.empty((m, q.shape[1]), dtype=q.dtype)
+                mx = np.empty_like(mn)
+                mn[:keep] = self.mins[k][:keep]
+                mx[:keep] = self.maxs[k][:keep]
+                cells = [np.arange(a >> k, ((b - 1) >> k) + 1) for a, b in spans]
+                cells.append(np.arange(keep, m))
+                cells = np.unique(np.concatenate(cells)).astype(np.int64)
+                cells = cells[cells < m]
+                if cells.shape[0]:
+                    mn[cells], mx[cells] = _reduce_level(mins[-1], maxs[-1], cells)
+            else:
+                mn, mx = _reduce_level(mins[-1], maxs[-1])
+            mins.append(mn)
+            maxs.append(mx)
+        # 누적합은 가장 앞 변경 샘플부터 끝까지만 다시 더한다
+        first = min([a for a, _ in spans], default=n)
+        first = min(first, n_old, n)
+        prefix = np.empty((n + 1, q.shape[1]), dtype=np.float64)
+        prefix[: first + 1] = self.prefix[: first + 1]
+        if first < n:
+            _prefix_sum(q, prefix, first)
+        return EnvelopePyramid(self.step_ms, tuple(mins), tuple(maxs), prefix)
+
+    def query(
+        self, t0_ms: float, t1_ms: float, pixels: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        [t0, t1)을 pixels개 버킷으로 나눠 버킷별 (min, max, mean, valid) 반환.
+        min/max/mean: [P, DOF], valid: [P] (샘플 범위 밖 버킷은 False, 값은 NaN)
+        """
+        n, dof = self.n, self.base.shape[1]
+        P = max(1, int(pixels))
+        w = max(float(t1_ms - t0_ms), 0.0) / P
+        edges = t0_ms + w * np.arange(P + 1, dtype=np.float64)
+        a = np.ceil(edges[:-1] / self.step_ms).astype(np.int64)
+        b = np.ceil(edges[1:] / self.step_ms).astype(np.int64)
+        # 샘플 간격보다 좁은 픽셀 → 가장 가까운 샘플 하나
+        narrow = b <= a
+        center = np.rint((edges[:-1] + 0.5 * w) / self.step_ms).astype(np.int64)
+        a = np.where(narrow, center, a)
+        b = np.where(narrow, center + 1, b)
+        a, b = np.clip(a, 0, n), np.clip(b, 0, n)
+        valid = b > a
+
+        mn = np.full((P, dof), np.nan)
+        mx = np.full((P, dof), np.nan)
+        mean = np.full((P, dof), np.nan)
+        if not valid.any():
+            return mn, mx, mean, valid
+
+        av, bv = a[valid], b[valid]
+        vmn = np.full((av.shape[0], dof), np.inf)
+        vmx = np.full((av.shape[0], dof), -np.inf)
+        # 아래 레벨부터 [lo, hi) 양 끝의 홀수 셀을 떼어 내고 한 레벨 올라간다
+        lo, hi = av.copy(), bv.copy()
+        for k in range(len(self.mins)):
+            for side in (0, 1):
+                take = (lo < hi) & (((hi if side else lo) & 1) == 1)
+                if not take.any():
+                    continue
+                rows = np.flatnonzero(take)
+                cells = hi[rows] - 1 if side else lo[rows]
+                vmn[rows] = np.minimum(vmn[rows], self.mins[k].take(cells, axis=0))
+                vmx[rows] = np.maximum(vmx[rows], self.maxs[k].take(cells, axis=0))
+                if side:
+                    hi -= take
+                else:
+                    lo += take
+            lo >>= 1
+            hi >>= 1
+            if not (lo < hi).any():
+                break
+
+        mn[valid] = vmn
+        mx[valid] = vmx
+        mean[valid] = (self.prefix[bv] - self.prefix[av]) / (bv - av)[:, None]
+        return mn, mx, mean, valid
@@ -1,15 +1,27 @@
 # app/motion/evaluator.py
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List, Optional, Tuple, Dict
-import bisect
-import math
+from dataclasses import dataclass, field, replace
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple, Dict, get_args
+import threading
 
 import numpy as np
-from ruckig import Ruckig, InputParameter, Trajectory as RuckigTrajectory, Result
-
-from .types import Project as RTProject, Clip as RTClip, Blend as RTBlend, DOF
-from .bridge_cache import BridgeKey, BridgeCache, BridgeCacheItem
+from ruckig import (
+    Ruckig,
+    InputParameter,
+    Trajectory as RuckigTrajectory,
+    Result,
+    RuckigError,
+)
+
+from .types import Project as RTProject, DOF
+from .bridge_cache import BridgeKey, BridgeCache, BridgeCacheItem, digest_arrays
+from .timeline import CompiledTimeline, compile_timeline, merge_ranges
+from .bake import BakedTrajectory
+from .envelope import EnvelopePyramid
+from .frames import FrameStore
+from .instrument import Instrumentation
+from .poly_bridge import BridgeMode, PolyBridge
 
 
 # ----------------- NumPy helpers -----------------
@@ -18,42 +30,133 @@ def _clamp_idx(i: int, lo: int, hi: int) -> int:
     return int(np.clip(i, lo, hi))
 
 
-def _zeros_np() -> np.ndarray:
-    return np.zeros((DOF,), dtype=np.float64)
+def grid_len(t0_ms: float, t1_ms: float, step_ms: float) -> int:
+    """time_grid(t0, t1, step_ms)의 샘플 수."""
+    if t1_ms < t0_ms:
+        return 0
+    if step_ms <= 0:
+        raise ValueError("step_ms must be > 0")
+    return int(np.floor((t1_ms - t0_ms + 1e-6) / step_ms)) + 1
+
+
+def time_grid(t0_ms: float, t1_ms: float, step_ms: float) -> np.ndarray:
+    """t0..t1 (inclusive-ish) 구간의 step_ms 간격 샘플 시각. 정수 ms로 반올림, shape [N]"""
+    n = grid_len(t0_ms, t1_ms, step_ms)
+    return np.round(t0_ms + step_ms * np.arange(n, dtype=np.float64))
+
+
+def time_grid_chunks(
+    t0_ms: float, t1_ms: float, step_ms: float, rows: int
+) -> Iterator[np.ndarray]:
+    """time_grid와 같은 시각을 rows개씩 나눠 생성 (전체 배열을 만들지 않는다)."""
+    n = grid_len(t0_ms, t1_ms, step_ms)
+    rows = max(1, int(rows))
+    for i in range(0, n, rows):
+        k = np.arange(i, min(i + rows, n), dtype=np.float64)
+        yield np.round(t0_ms + step_ms * k)
 
 
 # ----------------- Blend ramp (only for overlaps) -----------------
-def _blend_curve(alpha: float, curve: str) -> float:
-    """0..1 → 0..1. clip 겹침에서만 사용. gap(브릿지)에는 사용하지 않는다."""
-    a = float(np.clip(alpha, 0.0, 1.0))
+def _blend_curve(alpha: np.ndarray, curve: str) -> np.ndarray:
+    """0..1 → 0..1 (벡터). clip 겹침에서만 사용. gap(브릿지)에는 사용하지 않는다."""
+    a = np.clip(alpha, 0.0, 1.0)
     if curve == "smoothstep":
         # 3a^2 - 2a^3
         return a * a * (3.0 - 2.0 * a)
     if curve == "easeInOut":
         # cosine ease-in-out
-        return 0.5 * (1.0 - math.cos(math.pi * a))
+        return 0.5 * (1.0 - np.cos(np.pi * a))
     # linear
     return a
 
 
 def _ramp_weight(
-    local_ms: float, length_ms: float, in_ms: int, out_ms: int, curve: str
-) -> float:
-    """겹침일 때만 쓰는 램프. 공격(in) / 유지 / 감쇠(out) 형태."""
+    local_ms: np.ndarray, length_ms: float, in_ms: int, out_ms: int, curve: str
+) -> np.ndarray:
+    """겹침일 때만 쓰는 램프. 공격(in) / 유지 / 감쇠(out) 형태. local_ms: [N]"""
+    w = np.ones(local_ms.shape, dtype=np.float64)
     if length_ms <= 1e-9:
-        return 1.0
-    w = 1.0
+        return w
 
-    if in_ms > 0 and local_ms < in_ms:
+    if in_ms > 0:
         a = local_ms / float(max(in_ms, 1))
-        w *= _blend_curve(a, curve)
+        w = np.where(local_ms < in_ms, w * _blend_curve(a, curve), w)
 
-    if out_ms > 0 and local_ms > (length_ms - out_ms):
+    if out_ms > 0:
         tail = length_ms - local_ms
         a = tail / float(max(out_ms, 1))
-        w *= _blend_curve(a, curve)
+        w = np.where(local_ms > (length_ms - out_ms), w * _blend_curve(a, curve), w)
 
-    return float(np.clip(w, 0.0, 1.0))
+    return np.clip(w, 0.0, 1.0)
+
+
+def _blend_curve_derivs(alpha: np.ndarray, curve: str) -> Tuple[np.ndarray, np.ndarray]:
+    """_blend_curve의 alpha에 대한 1차 / 2차 도함수. clip된 바깥(0 이하, 1 이상)은 0."""
+    a = np.clip(alpha, 0.0, 1.0)
+    inside = (alpha > 0.0) & (alpha < 1.0)
+    if curve == "smoothstep":
+        d1, d2 = 6.0 * a * (1.0 - a), 6.0 - 12.0 * a
+    elif curve == "easeInOut":
+        d1, d2 = 0.5 * np.pi * np.sin(np.pi * a), 0.5 * np.pi**2 * np.cos(np.pi * a)
+    else:
+        d1, d2 = np.ones_like(a), np.zeros_like(a)
+    return np.where(inside, d1, 0.0), np.where(inside, d2, 0.0)
+
+
+def _ramp_weight_kin(
+    local_ms: np.ndarray, length_ms: float, in_ms: int, out_ms: int, curve: str
+) -> np.ndarray:
+    """
+    _ramp_weight와 그 시간 도함수 → [N, 3] (w, dw/dt, d²w/dt²), t는 초.
+    in / out 램프의 곱이므로 곱의 미분으로 합친다. w 열은 _ramp_weight 그대로.
+    """
+    n = local_ms.shape[0]
+    out = np.zeros((n, 3), dtype=np.float64)
+    out[:, 0] = _ramp_weight(local_ms, length_ms, in_ms, out_ms, curve)
+    if length_ms <= 1e-9:
+        return out
+
+    # (값, 1차, 2차) for in / out 램프 각각. 램프 밖은 (1, 0, 0)
+    ramps = []
+    for active, a, da_dt in (
+        (in_ms > 0, local_ms / float(max(in_ms, 1)), 1000.0 / max(in_ms, 1)),
+        (
+            out_ms > 0,
+            (length_ms - local_ms) / float(max(out_ms, 1)),
+            -1000.0 / max(out_ms, 1),
+        ),
+    ):
+        r = np.zeros((n, 3), dtype=np.float64)
+        r[:, 0] = 1.0
+        if active:
+            m = a < 1.0
+            d1, d2 = _blend_curve_derivs(a[m], curve)
+            r[m, 0] = _blend_curve(a[m], curve)
+            r[m, 1] = d1 * da_dt
+            r[m, 2] = d2 * da_dt * da_dt
+        ramps.append(r)
+    (f, f1, f2), (g, g1, g2) = ramps[0].T, ramps[1].T
+    out[:, 1] = f1 * g + f * g1
+    out[:, 2] = f2 * g + 2.0 * f1 * g1 + f * g2
+    return out
+
+
+def _mul_kin(w: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """weight (w, w', w'') [K, 3] × pose (x, x', x'') [K, 3, DOF] → 곱과 그 도함수 [K, 3, DOF]"""
+    w0, w1, w2 = w[:, 0, None], w[:, 1, None], w[:, 2, None]
+    x0, x1, x2 = x[:, 0], x[:, 1], x[:, 2]
+    return np.stack(
+        [w0 * x0, w1 * x0 + w0 * x1, w2 * x0 + 2.0 * w1 * x1 + w0 * x2], axis=1
+    )
+
+
+def _div_kin(p: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """p [K, 3, DOF] / w [K, 3] 와 그 도함수 (crossfade 정규화)."""
+    w0, w1, w2 = w[:, 0, None], w[:, 1, None], w[:, 2, None]
+    y0 = p[:, 0] / w0
+    y1 = (p[:, 1] - y0 * w1) / w0
+    y2 = (p[:, 2] - 2.0 * y1 * w1 - y0 * w2) / w0
+    return np.stack([y0, y1, y2], axis=1)
 
 
 # ----------------- Velocity estimation -----------------
@@ -88,6 +191,25 @@ class Limits:
         ), "limits length must equal DOF"
 
 
+# ----------------- Snapshot -----------------
+@dataclass(frozen=True, eq=False)
+class EvalSnapshot:
+    """
+    한 시점의 평가 상태 전체 (불변). 쓰기는 새 스냅샷을 만들어 참조만 바꾼다.
+    읽는 쪽은 스냅샷 하나를 잡고 끝까지 쓰므로 절반만 바뀐 프로젝트를 보지 않는다.
+    """
+
+    tl: CompiledTimeline
+    version: int = 0
+    proj: Optional[RTProject] = None
+    src_frames: Dict[str, FrameStore] = field(default_factory=dict)  # [F, DOF]
+    # bake 모드: 제어 주기 격자로 미리 렌더링한 trajectory (step None이면 끔)
+    bake_step_ms: Optional[float] = None
+    bake: Optional[BakedTrajectory] = None
+    # 타임라인 overview용 min/max/mean 피라미드 (bake 위)
+    envelope: Optional[EnvelopePyramid] = None
+
+
 # ----------------- Evaluator -----------------
 class TrajectoryEvaluator:
     """
@@ -96,337 +218,924 @@ class TrajectoryEvaluator:
       * 빈 구간(gap): Ruckig 브릿지 (minimum_duration = gap_sec). 램프 미사용.
       * 브릿지 경계 상태(q, v)는 그 시점의 '블렌딩된 실제 상태'를 사용.
       * 클립 내부: NumPy 선형 보간.
+
+    모든 평가는 시간 그리드 [N] 단위로 벡터화되어 있으며 결과는 [N, DOF] float64.
+    리스트 변환은 API 경계(라우터)에서만 한다.
+    클램프/필터링/우선순위 정렬은 set_project 시 CompiledTimeline으로 미리 끝내 두고,
+    샘플마다 세그먼트 조회 + 보간만 한다.
     """
 
-    def __init__(self, limits: Limits):
+    def __init__(
+        self,
+        limits: Limits,
+        precompute_bridges: bool = False,
+        bridge_workers: int = 4,
+        bridge_cache_entries: int = 4096,
+        bridge_cache_bytes: int = 64 << 20,
+        bake_step_ms: Optional[float] = None,
+        instrument: bool = False,
+        bridge_mode: BridgeMode = "ruckig",
+    ):
         self.lim = limits
-        self._ruckig = Ruckig(DOF, limits.control_dt)
-        self._cache = BridgeCache()
+        # 브릿지 방식마다 결과가 다르므로 캐시 키의 limit digest에 방식도 섞는다
+        self._limits_digests: Dict[str, bytes] = {
+            mode: digest_arrays(
+                limits.v_max, limits.a_max, limits.j_max, [limits.control_dt], [i]
+            )
+            for i, mode in enumerate(get_args(BridgeMode))
+        }
+        self._otg_local = threading.local()  # 스레드별 Ruckig 인스턴스
+        # 내용 기반 키라 프로젝트가 바뀌어도 비우지 않는다 (같은 gap이면 재사용)
+        self._cache = BridgeCache(bridge_cache_entries, bridge_cache_bytes)
+
+        # set_project 시 모든 gap 브릿지를 미리 만들지 여부 / 워커 수
+        self.precompute_bridges = precompute_bridges
+        self.bridge_workers = max(1, int(bridge_workers))
+        # gap 브릿지 방식: ruckig(jerk 제한) | quintic / septic(닫힌형, limit 위반 시 ruckig)
+        self.bridge_mode: BridgeMode = self._check_bridge_mode(bridge_mode)
+        # 단계별 지연 히스토그램 / 브릿지 카운터 (opt-in, 런타임에 켜고 끌 수 있다)
+        self.instr = Instrumentation(enabled=instrument)
+
+        # 런타임 상태: 불변 스냅샷 하나를 참조 교체(RCU)로 공개한다.
+        # 읽기는 self._snap을 한 번 읽어 그 스냅샷만 쓰므로 잠금이 없고,
+        # 쓰기(set_project / update_project / set_bake)끼리만 _write_lock으로 직렬화한다.
+        self._write_lock = threading.Lock()
+        self._snap = EvalSnapshot(tl=compile_timeline(RTProject(), {}))
+        # 소스별 overview 피라미드: 처음 요청될 때 만드는 캐시 (스냅샷 밖)
+        self._src_envelopes: Dict[str, EnvelopePyramid] = {}
+        if bake_step_ms is not None:
+            self.set_bake(bake_step_ms)
+
+    def snapshot(self) -> EvalSnapshot:
+        """현재 공개된 평가 상태. 여러 호출을 같은 프로젝트 기준으로 묶을 때 쓴다."""
+        return self._snap
+
+    def _publish(self, snap: EvalSnapshot) -> None:
+        """쓰기 잠금 안에서 호출. 참조 대입 한 번으로 새 상태를 공개한다."""
+        self._snap = snap
+        self._prune_src_envelopes(snap)
+
+    # ---------- project ----------
+    def set_project(
+        self, p: RTProject, precompute_bridges: Optional[bool] = None
+    ) -> None:
+        """
+        프로젝트 컴파일 후 교체. precompute_bridges(기본: 생성자 설정)가 켜져 있으면
+        모든 gap 브릿지를 스레드 풀에서 미리 만든 뒤에야 새 상태를 공개한다.
+        브릿지 캐시는 내용 기반이라 유지된다 → 바뀌지 않은 gap은 다시 계산하지 않는다.
+        """
+        src_frames = self._ingest_sources(p)
+        tl = compile_timeline(p, src_frames, self.bridge_mode)
+        if precompute_bridges is None:
+            precompute_bridges = self.precompute_bridges
+        if precompute_bridges:
+            self._build_all_bridges(tl, self._cache)
+
+        with self._write_lock:
+            cur = self._snap
+            bake = self._render_bake(tl, cur.bake_step_ms)
+            self._publish(
+                replace(
+                    cur,
+                    version=cur.version + 1,
+                    proj=p,
+                    tl=tl,
+                    src_frames=src_frames,
+                    bake=bake,
+                    envelope=self._render_envelope(bake),
+                )
+            )
 
-        # 런타임 상태
-        self._proj: Optional[RTProject] = None
-        self._clips_sorted: List[RTClip] = []
-        self._t0s: np.ndarray = np.empty((0,), dtype=np.int64)  # 이웃 탐색용
+    def update_project(
+        self, p: RTProject, touched: Iterable[str]
+    ) -> List[Tuple[float, float]]:
+        """
+        apply_ops 결과 반영. touched(바뀐 클립 ID)의 이전/이후 영향 구간을 병합해
+        dirty 범위 [(lo, hi)] (ms, ±inf 가능)로 돌려준다.
+        바뀌지 않은 소스는 배열을 재사용하고, 브릿지 선계산과 bake 재렌더링도
+        dirty 범위만 한다 (나머지 브릿지는 내용 키가 같아 캐시에 그대로 있다).
+        """
+        src_frames = self._ingest_sources(p)
+        tl = compile_timeline(p, src_frames, self.bridge_mode)
+        touched = list(touched)
+
+        with self._write_lock:
+            cur = self._snap
+            dirty = merge_ranges(cur.tl.dirty_spans(touched) + tl.dirty_spans(touched))
+            if self.precompute_bridges and dirty:
+                self._build_all_bridges(tl, self._cache, dirty)
+            bake = self._render_bake(tl, cur.bake_step_ms, cur.bake, dirty)
+            self._publish(
+                replace(
+                    cur,
+                    version=cur.version + 1,
+                    proj=p,
+                    tl=tl,
+                    src_frames=src_frames,
+                    bake=bake,
+                    envelope=self._render_envelope(bake, cur.envelope, dirty),
+                )
+            )
+        return dirty
 
-        # 가속화 캐시
-        self._src_frames_np: Dict[str, np.ndarray] = {}  # [F, DOF], float64
-        self._src_dt: Dict[str, float] = {}
-        self._src_dt_ms: Dict[str, float] = {}
+    @staticmethod
+    def _check_bridge_mode(mode: str) -> BridgeMode:
+        if mode not in get_args(BridgeMode):
+            raise ValueError(f"Unknown bridge mode: {mode}")
+        return mode
 
-    # ---------- project ----------
-    def set_project(self, p: RTProject) -> None:
-        self._proj = p
-        self._clips_sorted = sorted(p.clips, key=lambda c: c.t0)
-        self._t0s = np.fromiter(
-            (c.t0 for c in self._clips_sorted),
-            dtype=np.int64,
-            count=len(self._clips_sorted),
-        )
-        self._cache.clear()
+    def set_bridge_mode(self, mode: BridgeMode) -> None:
+        """
+        gap 브릿지 방식 교체. 현재 프로젝트를 새 방식의 타임라인으로 다시 공개한다
+        (브릿지 메모 초기화, 선계산 / bake 재렌더링 포함). 캐시 키가 방식별이라
+        이전 방식의 브릿지는 되돌아올 때 그대로 재사용된다.
+        """
+        mode = self._check_bridge_mode(mode)
+        with self._write_lock:
+            self.bridge_mode = mode
+            cur = self._snap
+            tl = replace(cur.tl, bridge_mode=mode, bridge_keys={})
+            if self.precompute_bridges:
+                self._build_all_bridges(tl, self._cache)
+            bake = self._render_bake(tl, cur.bake_step_ms)
+            self._publish(
+                replace(
+                    cur,
+                    version=cur.version + 1,
+                    tl=tl,
+                    bake=bake,
+                    envelope=self._render_envelope(bake),
+                )
+            )
 
-        # 소스 프레임 NumPy로 캐싱
-        self._src_frames_np.clear()
-        self._src_dt.clear()
-        self._src_dt_ms.clear()
+    def set_bake(self, step_ms: Optional[float]) -> None:
+        """bake 모드 켜기(step_ms 격자) / 끄기(None). 켜면 현재 프로젝트를 바로 렌더링한다."""
+        if step_ms is not None and step_ms <= 0:
+            raise ValueError("bake step_ms must be > 0")
+        step_ms = float(step_ms) if step_ms is not None else None
+        with self._write_lock:
+            cur = self._snap
+            bake = self._render_bake(cur.tl, step_ms)
+            self._publish(
+                replace(
+                    cur,
+                    version=cur.version + 1,
+                    bake_step_ms=step_ms,
+                    bake=bake,
+                    envelope=self._render_envelope(bake),
+                )
+            )
+
+    def bake_info(self) -> Dict[str, object]:
+        snap = self._snap
+        bake = snap.bake
+        return {
+            "enabled": snap.bake_step_ms is not None,
+            "step_ms": snap.bake_step_ms,
+            "samples": len(bake) if bake is not None else 0,
+            "end_ms": bake.end_ms if bake is not None else 0.0,
+            "bytes": bake.nbytes if bake is not None else 0,
+        }
+
+    @staticmethod
+    def _ingest_sources(p: RTProject) -> Dict[str, FrameStore]:
+        """소스 프레임 저장소 수집 (복사/변환 없음, 모양만 검증)."""
+        src_frames: Dict[str, FrameStore] = {}
         for sid, s in p.sources.items():
-            arr = np.asarray(s.frames, dtype=np.float64)  # [F, DOF]
-            if arr.ndim != 2 or arr.shape[1] != DOF:
+            if s.frames.ndim != 2 or s.frames.shape[1] != DOF:
                 raise ValueError(f"Source {sid} frames must be [F,{DOF}]")
-            self._src_frames_np[sid] = arr
-            self._src_dt[sid] = float(s.dt)
-            self._src_dt_ms[sid] = float(s.dt) * 1000.0
+            src_frames[sid] = s.frames
+        return src_frames
+
+    def bridge_cache_stats(self) -> Dict[str, int]:
+        """브릿지 캐시 hit/miss/eviction 카운터와 사용량."""
+        return self._cache.stats()
+
+    # ---------- envelope ----------
+    def envelope(
+        self, t0_ms: float, t1_ms: float, pixels: int
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        최종 trajectory의 픽셀별 (min, max, mean [P, DOF], valid [P]).
+        bake된 샘플 위에서 만들므로 bake가 꺼져 있으면 None.
+        """
+        env = self._snap.envelope
+        if env is None:
+            return None
+        return env.query(t0_ms, t1_ms, pixels)
+
+    def source_envelope(
+        self, source_id: str, t0_ms: float, t1_ms: float, pixels: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        소스 프레임의 픽셀별 envelope (시각은 소스 기준, frame i = i * dt).
+        피라미드는 처음 요청될 때 만들고, 소스 배열이 바뀌지 않는 한 재사용한다.
+        """
+        snap = self._snap
+        frames = snap.src_frames.get(source_id)
+        if frames is None:
+            raise KeyError(source_id)
+        env = self._src_envelopes.get(source_id)
+        if env is None or env.base is not frames.data:
+            dt_ms = float(snap.proj.sources[source_id].dt) * 1000.0
+            env = EnvelopePyramid.build(frames.data, dt_ms)  # 저장 단위 그대로
+            # dict 항목 대입은 원자적. 동시에 만든 쪽이 덮어써도 내용은 같다
+            self._src_envelopes[source_id] = env
+        mn, mx, mean, valid = env.query(t0_ms, t1_ms, pixels)
+        # 양자화는 관절별 affine(scale > 0)이라 min/max/mean에 그대로 적용된다
+        return (
+            frames.decode_values(mn),
+            frames.decode_values(mx),
+            frames.decode_values(mean),
+            valid,
+        )
 
     # ---------- public ----------
-    def eval_at(self, t_ms: int) -> List[float]:
-        if self._proj is None:
-            return _zeros_np().tolist()
-
-        # 1) 스택 구성
-        normal_stack, additive_stack = self._gather_stacks(t_ms)
-
-        # 2) 스택 합성 (겹침이면 블렌딩, 없으면 None)
-        base = self._combine_stacks(normal_stack, additive_stack)
-
-        if base is None:
-            # 3) 커버가 전혀 없으면 → 브릿지 사용
-            prev_c, next_c = self._find_neighbors(t_ms)
-            if prev_c and next_c:
-                qb = self._sample_bridge(prev_c, next_c, t_ms)
-                if qb is not None:
-                    return qb
-            elif prev_c:
-                _, _, _, t = self._clip_end_state(prev_c)
-                q = self._eval_blended_no_bridge(int(round(t)) - 1)
-                return q.tolist()
-            elif next_c:
-                _, _, _, t = self._clip_start_state(next_c)
-                q = self._eval_blended_no_bridge(int(round(t)) + 1)
-                return q.tolist()
-            return _zeros_np().tolist()
-
-        return base.tolist()
-
-    def eval_range(self, t0_ms: int, t1_ms: int, step_ms: float) -> List[List[float]]:
-        """t0..t1 (inclusive-ish) 구간을 step_ms 간격으로 샘플."""
-        if t1_ms < t0_ms:
-            return []
-        out: List[List[float]] = []
-        t = float(t0_ms)
-        while t <= t1_ms + 1e-6:
-            out.append(self.eval_at(int(round(t))))
-            t += step_ms
+    def eval_at(self, t_ms: float, snap: Optional[EvalSnapshot] = None) -> np.ndarray:
+        """단일 시점 평가. 반환 shape [DOF]"""
+        t = self.instr.start()
+        q = self.eval_times(np.array([t_ms], dtype=np.float64), snap)[0]
+        self.instr.stop("eval_at", t, where=float(t_ms))
+        return q
+
+    def eval_range(
+        self,
+        t0_ms: int,
+        t1_ms: int,
+        step_ms: float,
+        snap: Optional[EvalSnapshot] = None,
+    ) -> np.ndarray:
+        """t0..t1 (inclusive-ish) 구간을 step_ms 간격으로 샘플. 반환 shape [N, DOF]"""
+        t = self.instr.start()
+        q = self.eval_times(time_grid(t0_ms, t1_ms, step_ms), snap)
+        self.instr.stop("eval_range", t, where=[float(t0_ms), float(t1_ms)])
+        return q
+
+    def eval_times(
+        self, ts: np.ndarray, snap: Optional[EvalSnapshot] = None
+    ) -> np.ndarray:
+        """
+        임의의 시간 배열 ts [N] (ms)을 한 번에 평가. 반환 shape [N, DOF]
+        bake가 있으면 격자 시각과 정확히 일치하는 샘플은 인덱스로 읽고 나머지만 평가한다.
+        snap이 없으면 호출 시점의 스냅샷 하나로 끝까지 평가한다 (도중 교체와 무관).
+        """
+        if snap is None:
+            snap = self._snap
+        ts = np.asarray(ts, dtype=np.float64).reshape(-1)
+        if snap.proj is None or ts.shape[0] == 0:
+            return np.zeros((ts.shape[0], DOF), dtype=np.float64)
+        tl, bake = snap.tl, snap.bake
+        if bake is None:
+            return self._eval_times(tl, ts)
+
+        hit, idx = bake.lookup(ts)
+        if hit.all():
+            return bake.q[idx]
+        out = np.empty((ts.shape[0], DOF), dtype=np.float64)
+        out[hit] = bake.q[idx[hit]]
+        miss = ~hit
+        out[miss] = self._eval_times(tl, ts[miss])
         return out
 
-    # ---------- internals : shared ----------
-    def _gather_stacks(self, t_ms: int) -> Tuple[
-        List[tuple[int, float, np.ndarray, RTClip]],
-        List[tuple[float, np.ndarray, RTClip]],
-    ]:
+    def eval_kinematics_at(
+        self, t_ms: float, snap: Optional[EvalSnapshot] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """단일 시점 (q, dq, ddq). 각 shape [DOF]"""
+        t = self.instr.start()
+        q, v, a = self.eval_kinematics_times(np.array([t_ms], dtype=np.float64), snap)
+        self.instr.stop("eval_kinematics_at", t, where=float(t_ms))
+        return q[0], v[0], a[0]
+
+    def eval_kinematics_range(
+        self,
+        t0_ms: int,
+        t1_ms: int,
+        step_ms: float,
+        snap: Optional[EvalSnapshot] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """eval_range와 같은 격자에서 (q, dq, ddq). 각 shape [N, DOF]"""
+        t = self.instr.start()
+        out = self.eval_kinematics_times(time_grid(t0_ms, t1_ms, step_ms), snap)
+        self.instr.stop("eval_kinematics_range", t, where=[float(t0_ms), float(t1_ms)])
+        return out
+
+    def eval_kinematics_times(
+        self, ts: np.ndarray, snap: Optional[EvalSnapshot] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        현재 시점 t_ms에서 유효한 클립들을 모아
-        - normal_stack: (priority, weight, pose(np.ndarray), clip)
-        - additive_stack: (weight, pose(np.ndarray), clip)
-        로 나눈다.
-        """
-        normal_stack: List[tuple[int, float, np.ndarray, RTClip]] = []
-        additive_stack: List[tuple[float, np.ndarray, RTClip]] = []
-
-        for c in self._clips_sorted:
-            q = self._sample_clip_at(c, t_ms)
-            if q is None:
-                continue
-
-            frames = self._src_frames_np[c.sourceId]
-            F = frames.shape[0]
-            dt_ms = self._src_dt_ms[c.sourceId]
-            inF = _clamp_idx(c.inFrame, 0, F - 1)
-            outF = _clamp_idx(c.outFrame, 1, F)
-            length_ms = 0.0 if outF <= inF + 1 else (outF - inF - 1) * dt_ms
-            local_ms = float(t_ms - c.t0)
-
-            b: RTBlend = c.blend
-            mode = b.mode
-            w = float(b.weight) * _ramp_weight(
-                local_ms, length_ms, int(b.inMs), int(b.outMs), b.curve
-            )
-            if w <= 1e-12:
-                continue
+        ts [N] (ms) → (q, dq, ddq) 각 [N, DOF]. 속도/가속도는 초 단위 (rad/s, rad/s²).
+        q는 eval_times와 같은 값이고, 도함수는 차분 없이 해석적으로 구한다:
+          * 클립 내부: 선형 보간 기울기 / 가장 가까운 프레임의 2차 차분
+          * 겹침: 램프 weight 도함수 + 곱 / 몫의 미분
+          * gap: 브릿지(Ruckig / 다항식)의 v, a
+          * 프로젝트 앞/뒤 hold: 0
+        bake는 q만 담으므로 항상 타임라인에서 직접 평가한다.
+        """
+        if snap is None:
+            snap = self._snap
+        ts = np.asarray(ts, dtype=np.float64).reshape(-1)
+        if snap.proj is None or ts.shape[0] == 0:
+            z = np.zeros((ts.shape[0], DOF), dtype=np.float64)
+            return z, z.copy(), z.copy()
+        out = self._eval_times(snap.tl, ts, kin=True)
+        return out[:, 0], out[:, 1], out[:, 2]
+
+    # ---------- internals : bake ----------
+    def _render_bake(
+        self,
+        tl: CompiledTimeline,
+        step: Optional[float],
+        prev: Optional[BakedTrajectory] = None,
+        dirty: Optional[List[Tuple[float, float]]] = None,
+    ) -> Optional[BakedTrajectory]:
+        """
+        tl을 [0, 끝] 구간 step 격자로 렌더링 (step이 None이면 bake 없음).
+        prev(같은 step)와 dirty가 주어지면 dirty 구간과 새로 늘어난 구간만 다시 평가한다.
+        """
+        if step is None or tl.clip_t0.shape[0] == 0:
+            return None
+        ts = time_grid(0.0, tl.end_ms, step)
 
-            if mode == "additive":
-                additive_stack.append((w, q, c))
-            elif mode == "crossfade":
-                normal_stack.append((int(b.priority), w, q, c))
-            else:  # "override"
-                normal_stack.append((int(b.priority), 1.0, q, c))
+        if prev is None or dirty is None or prev.step_ms != step:
+            q = self._eval_times(tl, ts)
+        else:
+            n, m = ts.shape[0], min(ts.shape[0], len(prev))
+            q = np.empty((n, DOF), dtype=np.float64)
+            q[:m] = prev.q[:m]  # 격자가 0부터라 앞부분 시각은 동일
+            redo = np.zeros((n,), dtype=bool)
+            redo[m:] = True
+            for lo, hi in dirty:
+                redo |= (ts >= lo) & (ts <= hi)
+            if redo.any():
+                q[redo] = self._eval_times(tl, ts[redo])
+
+        ts.flags.writeable = False
+        q.flags.writeable = False
+        return BakedTrajectory(step_ms=step, times=ts, q=q)
+
+    def _prune_src_envelopes(self, snap: EvalSnapshot) -> None:
+        """배열이 바뀌었거나 사라진 소스의 피라미드는 버린다 (dict째 교체)."""
+        frames = snap.src_frames
+        self._src_envelopes = {
+            sid: env
+            for sid, env in self._src_envelopes.items()
+            if sid in frames and frames[sid].data is env.base
+        }
+
+    @staticmethod
+    def _render_envelope(
+        bake: Optional[BakedTrajectory],
+        prev: Optional[EnvelopePyramid] = None,
+        dirty: Optional[List[Tuple[float, float]]] = None,
+    ) -> Optional[EnvelopePyramid]:
+        """bake 샘플 위 피라미드. prev와 dirty가 있으면 바뀐 셀만 다시 계산."""
+        if bake is None:
+            return None
+        if prev is None or dirty is None or prev.step_ms != bake.step_ms:
+            return EnvelopePyramid.build(bake.q, bake.step_ms)
+        return prev.updated(bake.q, dirty)
+
+    # ---------- internals : shared ----------
+    def _eval_times(
+        self, tl: CompiledTimeline, ts: np.ndarray, kin: bool = False
+    ) -> np.ndarray:
+        """
+        tl 기준 직접 평가 (bake 미사용). 반환 [N, DOF],
+        kin이면 [N, 3, DOF] (q, dq, ddq).
+        """
+        shape = (ts.shape[0], 3, DOF) if kin else (ts.shape[0], DOF)
+        out = np.zeros(shape, dtype=np.float64)
+        if ts.shape[0] == 0:
+            return out
+        cache = self._cache
+        seg = tl.segment_of(ts)
+
+        # 1) 스택 구성 + 2) 합성 (겹침이면 블렌딩)
+        base, covered = self._eval_blended_no_bridge(tl, ts, seg, kin)
+        out[covered] = base[covered]
+
+        # 3) 커버가 전혀 없는 샘플 → 브릿지 / 홀드
+        gap_idx = np.flatnonzero(~covered)
+        if gap_idx.shape[0]:
+            self._fill_gaps(tl, cache, ts, seg, gap_idx, out)
+        return out
 
-        return normal_stack, additive_stack
+    def _gather_stacks(
+        self, tl: CompiledTimeline, s: int, ts: np.ndarray, kin: bool = False
+    ) -> Tuple[
+        List[tuple[np.ndarray, np.ndarray]],
+        List[tuple[np.ndarray, np.ndarray, np.ndarray]],
+        List[tuple[np.ndarray, np.ndarray, np.ndarray]],
+    ]:
+        """
+        세그먼트 s에 속한 샘플 ts [K]에 대해 참여 클립들을 평가해
+        - override_stack: (idx, pose) — 샘플별 승자 (priority 순으로 weight > 0인 첫 클립)
+        - crossfade_stack: (idx, weight, pose) — override 승자가 없는 샘플만
+        - additive_stack: (idx, weight, pose)
+        로 나눈다. idx는 ts 내 로컬 인덱스.
+        kin이면 weight는 [K, 3] (w, w', w''), pose는 [K, 3, DOF] (q, dq, ddq).
+        """
+        k = ts.shape[0]
+        weight = self._clip_weight_kin if kin else self._clip_weight
+        sample = self._sample_clip_kin if kin else self._sample_clip_at
+        override_stack: List[tuple[np.ndarray, np.ndarray]] = []
+        crossfade_stack: List[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        additive_stack: List[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+        pending = np.arange(k)
+        for ci in tl.overrides(s):
+            if pending.shape[0] == 0:
+                break
+            w = weight(tl, ci, ts[pending])
+            w0 = w[:, 0] if kin else w
+            win = pending[w0 > 1e-12]
+            if win.shape[0]:
+                override_stack.append((win, sample(tl, ci, ts[win])))
+                pending = pending[w0 <= 1e-12]
+
+        if pending.shape[0]:
+            for ci in tl.crossfades(s):
+                w = weight(tl, ci, ts[pending])
+                keep = (w[:, 0] if kin else w) > 1e-12
+                if keep.any():
+                    idx = pending[keep]
+                    crossfade_stack.append((idx, w[keep], sample(tl, ci, ts[idx])))
+
+        for ci in tl.additives(s):
+            w = weight(tl, ci, ts)
+            idx = np.flatnonzero((w[:, 0] if kin else w) > 1e-12)
+            if idx.shape[0]:
+                additive_stack.append((idx, w[idx], sample(tl, ci, ts[idx])))
+
+        return override_stack, crossfade_stack, additive_stack
 
     def _combine_stacks(
         self,
-        normal_stack: List[tuple[int, float, np.ndarray, RTClip]],
-        additive_stack: List[tuple[float, np.ndarray, RTClip]],
-    ) -> Optional[np.ndarray]:
+        k: int,
+        override_stack: List[tuple[np.ndarray, np.ndarray]],
+        crossfade_stack: List[tuple[np.ndarray, np.ndarray, np.ndarray]],
+        additive_stack: List[tuple[np.ndarray, np.ndarray, np.ndarray]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        - normal_stack과 additive_stack을 합쳐 최종 pose(np.ndarray)를 만든다.
-        - 둘 다 비어있으면 None (브릿지 후보)
+        - 스택들을 합쳐 샘플별 최종 pose [k, DOF]를 만든다.
+        - covered [k] (bool): 하나라도 클립이 커버하는 샘플. False면 브릿지 후보.
         """
-        covered = bool(normal_stack) or bool(additive_stack)
-        if not covered:
-            return None
+        base = np.zeros((k, DOF), dtype=np.float64)
+        covered = np.zeros((k,), dtype=bool)
 
         # base: override > crossfade(정규화)
-        if normal_stack:
-            overrides = [x for x in normal_stack if x[3].blend.mode == "override"]
-            if overrides:
-                overrides.sort(key=lambda x: -x[0])  # priority desc
-                base = overrides[0][2]
-            else:
-                weights = np.array([x[1] for x in normal_stack], dtype=np.float64)
-                wsum = float(weights.sum())
-                if wsum <= 1e-12:
-                    base = normal_stack[0][2]
-                else:
-                    weights /= wsum
-                    qs = np.stack([x[2] for x in normal_stack], axis=0)  # [K, DOF]
-                    base = (weights[:, None] * qs).sum(axis=0)
-        else:
-            base = _zeros_np()
+        for idx, q in override_stack:
+            base[idx] = q
+            covered[idx] = True
+
+        if crossfade_stack:
+            wsum = np.zeros((k,), dtype=np.float64)
+            acc = np.zeros((k, DOF), dtype=np.float64)
+            for idx, w, q in crossfade_stack:
+                wsum[idx] += w
+                acc[idx] += w[:, None] * q
+            xf = wsum > 1e-12
+            base[xf] = acc[xf] / wsum[xf, None]
+            covered |= xf
 
         # additive 누적
-        if additive_stack:
-            add = np.add.reduce([w * q for (w, q, _) in additive_stack], axis=0)
-            base = base + add
+        for idx, w, q in additive_stack:
+            base[idx] += w[:, None] * q
+            covered[idx] = True
+
+        return base, covered
 
-        return base
+    def _combine_stacks_kin(
+        self,
+        k: int,
+        override_stack: List[tuple[np.ndarray, np.ndarray]],
+        crossfade_stack: List[tuple[np.ndarray, np.ndarray, np.ndarray]],
+        additive_stack: List[tuple[np.ndarray, np.ndarray, np.ndarray]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        _combine_stacks의 (q, dq, ddq) 버전 → ([k, 3, DOF], covered [k]).
+        override는 그대로, crossfade는 Σw·q / Σw의 몫의 미분, additive는 w·q의 곱의 미분.
+        q 열은 _combine_stacks와 같은 연산 순서라 값이 일치한다.
+        """
+        base = np.zeros((k, 3, DOF), dtype=np.float64)
+        covered = np.zeros((k,), dtype=bool)
+
+        for idx, x in override_stack:
+            base[idx] = x
+            covered[idx] = True
+
+        if crossfade_stack:
+            wsum = np.zeros((k, 3), dtype=np.float64)
+            acc = np.zeros((k, 3, DOF), dtype=np.float64)
+            for idx, w, x in crossfade_stack:
+                wsum[idx] += w
+                acc[idx] += _mul_kin(w, x)
+            xf = wsum[:, 0] > 1e-12
+            base[xf] = _div_kin(acc[xf], wsum[xf])
+            covered |= xf
+
+        for idx, w, x in additive_stack:
+            base[idx] += _mul_kin(w, x)
+            covered[idx] = True
+
+        return base, covered
 
     # ---------- internals : sampling ----------
-    def _sample_clip_at(self, c: RTClip, t_ms: int) -> Optional[np.ndarray]:
-        frames = self._src_frames_np.get(c.sourceId)
-        if frames is None:
-            return None
-        F = frames.shape[0]
-        dt_ms = self._src_dt_ms[c.sourceId]
-
-        inF = _clamp_idx(c.inFrame, 0, F - 1)
-        outF = _clamp_idx(c.outFrame, 1, F)
-        length_ms = (outF - inF) * dt_ms  # <=0이면 단일 프레임 취급
-        local = t_ms - c.t0
-        if local < 0 or local > length_ms:
-            return None
+    def _clip_weight(self, tl: CompiledTimeline, ci: int, ts: np.ndarray) -> np.ndarray:
+        """클립 ci의 블렌드 weight × 램프. ts [K] → [K]"""
+        return float(tl.clip_weight[ci]) * _ramp_weight(
+            ts - tl.clip_t0[ci],
+            float(tl.clip_ramp_ms[ci]),
+            int(tl.clip_in_ms[ci]),
+            int(tl.clip_out_ms[ci]),
+            tl.clip_curve[ci],
+        )
+
+    def _clip_weight_kin(
+        self, tl: CompiledTimeline, ci: int, ts: np.ndarray
+    ) -> np.ndarray:
+        """_clip_weight와 그 시간 도함수 → [K, 3]"""
+        return float(tl.clip_weight[ci]) * _ramp_weight_kin(
+            ts - tl.clip_t0[ci],
+            float(tl.clip_ramp_ms[ci]),
+            int(tl.clip_in_ms[ci]),
+            int(tl.clip_out_ms[ci]),
+            tl.clip_curve[ci],
+        )
+
+    @staticmethod
+    def _clip_frame_index(
+        tl: CompiledTimeline, ci: int, ts: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ts [K] → (연속 프레임 인덱스, f0, f1, frac [K, 1]) (클립 범위로 clamp)."""
+        dt_ms = float(tl.src_dt_ms[tl.clip_src[ci]])
+        inF = int(tl.clip_in[ci])
+        outF = int(tl.clip_out[ci])
 
         # 연속 인덱스 보간
-        f_cont = inF + (local / dt_ms)
-        f0 = int(np.floor(f_cont))
+        f_cont = inF + ((ts - tl.clip_t0[ci]) / dt_ms)
+        f0 = np.floor(f_cont)
         frac = f_cont - f0
 
-        f0 = _clamp_idx(f0, inF, outF - 1)
-        f1 = _clamp_idx(f0 + 1, inF, outF - 1)
+        f0 = np.clip(f0.astype(np.int64), inF, outF - 1)
+        f1 = np.clip(f0 + 1, inF, outF - 1)
+        frac = np.where((f1 == f0) | (frac <= 1e-12), 0.0, frac)[:, None]
+        return f_cont, f0, f1, frac
+
+    def _sample_clip_at(
+        self, tl: CompiledTimeline, ci: int, ts: np.ndarray
+    ) -> np.ndarray:
+        """클립 ci를 ts [K]에서 선형 보간. 커버 여부는 세그먼트가 보장. 반환 [K, DOF]"""
+        frames = tl.frames_of(ci)
+        _, f0, f1, frac = self._clip_frame_index(tl, ci, ts)
 
         q0 = frames[f0]
         q1 = frames[f1]
-        if f1 == f0 or frac <= 1e-12:
-            return q0.copy()
         return q0 * (1.0 - frac) + q1 * frac
 
-    def _find_neighbors(self, t_ms: int) -> Tuple[Optional[RTClip], Optional[RTClip]]:
-        # bisect로 O(log N)
-        idx = bisect.bisect_left(self._t0s, t_ms)
-        prev_c = (
-            self._clips_sorted[idx - 1]
-            if 0 <= idx - 1 < len(self._clips_sorted)
-            else None
-        )
-        next_c = self._clips_sorted[idx] if 0 <= idx < len(self._clips_sorted) else None
-        return prev_c, next_c
+    def _sample_clip_kin(
+        self, tl: CompiledTimeline, ci: int, ts: np.ndarray
+    ) -> np.ndarray:
+        """
+        클립 ci의 (q, dq, ddq) [K, 3, DOF].
+        - dq : 보간 구간 [f0, f1]의 기울기 (마지막 프레임 유지 구간은 0)
+        - ddq: 선형 보간의 2차 도함수는 0(프레임에서 델타)이므로 가장 가까운
+               프레임의 2차 차분 (유지 구간 / 프레임 3개 미만이면 0)
+        """
+        frames = tl.frames_of(ci)
+        dt = float(tl.src_dt[tl.clip_src[ci]])
+        inF = int(tl.clip_in[ci])
+        outF = int(tl.clip_out[ci])
+        f_cont, f0, f1, frac = self._clip_frame_index(tl, ci, ts)
+
+        out = np.zeros((ts.shape[0], 3, DOF), dtype=np.float64)
+        q0 = frames[f0]
+        q1 = frames[f1]
+        out[:, 0] = q0 * (1.0 - frac) + q1 * frac
+        out[:, 1] = (q1 - q0) / dt
+        if outF - inF >= 3:
+            c = np.clip(np.round(f_cont).astype(np.int64), inF + 1, outF - 2)
+            ddq = (frames[c + 1] - 2.0 * frames[c] + frames[c - 1]) / (dt * dt)
+            out[:, 2] = np.where((f1 > f0)[:, None], ddq, 0.0)
+        return out
+
+    def _fill_gaps(
+        self,
+        tl: CompiledTimeline,
+        cache: BridgeCache,
+        ts: np.ndarray,
+        seg: np.ndarray,
+        gap_idx: np.ndarray,
+        out: np.ndarray,
+    ) -> None:
+        """커버되지 않은 샘플(gap_idx)을 세그먼트의 이웃 쌍별로 묶어 브릿지/홀드로 채운다."""
+        kin = out.ndim == 3
+        # hold는 정지 상태: kin이면 q 열만 채우고 dq / ddq는 0으로 둔다
+        pos = out[:, 0] if kin else out
+        prev_i = tl.seg_prev[seg[gap_idx]]
+        next_i = tl.seg_next[seg[gap_idx]]
+        pairs = np.stack([prev_i, next_i], axis=1)
+        for pi, ni in np.unique(pairs, axis=0):
+            sel = gap_idx[(prev_i == pi) & (next_i == ni)]
+            if pi >= 0 and ni >= 0:
+                out[sel] = self._sample_bridge(
+                    tl, cache, int(pi), int(ni), ts[sel], kin
+                )
+            elif pi >= 0:
+                t = int(tl.clip_tail[pi])
+                pos[sel] = self._eval_hold(tl, int(pi), int(round(t)) - 1, end=True)
+            elif ni >= 0:
+                t = int(tl.clip_t0[ni])
+                pos[sel] = self._eval_hold(tl, int(ni), int(round(t)) + 1, end=False)
 
     # ----- blended-only sampler (for bridge boundaries) -----
-    def _eval_blended_no_bridge(self, t_ms: int) -> Optional[np.ndarray]:
-        """겹치는 클립들만 합성해서 pose 반환. (빈 구간이면 None)"""
-        normal_stack, additive_stack = self._gather_stacks(t_ms)
-        return self._combine_stacks(normal_stack, additive_stack)
-
-    def _estimate_vel_blended(self, t_ms: int, h_ms: float) -> Optional[np.ndarray]:
-        """블렌딩 평가로 q(t±h)를 구해 중앙차분. 둘 중 하나라도 None이면 None."""
-        qm = self._eval_blended_no_bridge(int(round(t_ms - h_ms)))
-        qp = self._eval_blended_no_bridge(int(round(t_ms + h_ms)))
-        if qm is None or qp is None:
-            return None
-        h = max(h_ms, 1e-3) / 1000.0  # seconds
-        return (qp - qm) / (2.0 * h)
+    def _eval_blended_no_bridge(
+        self,
+        tl: CompiledTimeline,
+        ts: np.ndarray,
+        seg: Optional[np.ndarray] = None,
+        kin: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        겹치는 클립들만 합성해서 (pose [N, DOF], covered [N]) 반환.
+        kin이면 pose는 [N, 3, DOF] (q, dq, ddq).
+        """
+        if seg is None:
+            seg = tl.segment_of(ts)
+        n = ts.shape[0]
+        base = np.zeros((n, 3, DOF) if kin else (n, DOF), dtype=np.float64)
+        covered = np.zeros((n,), dtype=bool)
+
+        # 세그먼트별로 묶어서 처리
+        order = np.argsort(seg, kind="stable")
+        seg_sorted = seg[order]
+        cuts = np.flatnonzero(np.diff(seg_sorted)) + 1
+        instr = self.instr
+        combine = self._combine_stacks_kin if kin else self._combine_stacks
+        for idx in np.split(order, cuts):
+            s = int(seg[idx[0]])
+            t = instr.start()
+            stacks = self._gather_stacks(tl, s, ts[idx], kin)
+            t = instr.lap("gather_stacks", t)
+            q, cov = combine(idx.shape[0], *stacks)
+            instr.stop("combine_stacks", t)
+            base[idx] = q
+            covered[idx] = cov
+        return base, covered
+
+    def _eval_hold(
+        self, tl: CompiledTimeline, ci: int, t_ms: int, end: bool
+    ) -> np.ndarray:
+        """프로젝트 앞/뒤 바깥: 경계 시점의 블렌딩 pose 유지 (없으면 클립 경계 pose)."""
+        q, covered = self._eval_blended_no_bridge(
+            tl, np.array([t_ms], dtype=np.float64)
+        )
+        if covered[0]:
+            return q[0]
+        q, _, _, _ = (
+            self._clip_end_state(tl, ci) if end else self._clip_start_state(tl, ci)
+        )
+        return q
 
     # ----- clip endpoint states (fallbacks) -----
     def _clip_end_state(
-        self, c: RTClip
+        self, tl: CompiledTimeline, ci: int
     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
-        frames = self._src_frames_np[c.sourceId]
-        F = frames.shape[0]
-        dt = self._src_dt[c.sourceId]
-        dt_ms = self._src_dt_ms[c.sourceId]
-
-        inF = _clamp_idx(c.inFrame, 0, F - 1)
-        outF = _clamp_idx(c.outFrame, 1, F)
+        frames = tl.frames_of(ci)
+        inF = int(tl.clip_in[ci])
+        outF = int(tl.clip_out[ci])
         endF = inF if outF <= inF + 1 else (outF - 1)
-        gap_start = c.t0 if outF <= inF + 1 else int(c.t0 + (outF - inF - 1) * dt_ms)
 
         q = frames[endF]
-        v = _finite_diff_vel(frames, endF, dt)
+        v = _finite_diff_vel(frames, endF, float(tl.src_dt[tl.clip_src[ci]]))
         a = np.zeros((DOF,), dtype=np.float64)
-        return q, v, a, gap_start
+        return q, v, a, int(tl.clip_tail[ci])
 
     def _clip_start_state(
-        self, c: RTClip
+        self, tl: CompiledTimeline, ci: int
     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
-        frames = self._src_frames_np[c.sourceId]
-        dt = self._src_dt[c.sourceId]
-        inF = _clamp_idx(c.inFrame, 0, frames.shape[0] - 1)
+        frames = tl.frames_of(ci)
+        inF = int(tl.clip_in[ci])
         q = frames[inF]
-        v = _finite_diff_vel(frames, inF, dt)
+        v = _finite_diff_vel(frames, inF, float(tl.src_dt[tl.clip_src[ci]]))
         a = np.zeros((DOF,), dtype=np.float64)
-        return q, v, a, c.t0
+        return q, v, a, int(tl.clip_t0[ci])
 
     # ----- bridge (gap only) -----
     def _sample_bridge(
-        self, prev_c: RTClip, next_c: RTClip, t_ms: int
-    ) -> Optional[np.ndarray]:
-        # 빈 구간에서만 호출됨
-        # 1) gap 시간 계산
-        _, _, _, gap_start = self._clip_end_state(prev_c)
-        _, _, _, next_start = self._clip_start_state(next_c)
-        if next_start <= gap_start:
+        self,
+        tl: CompiledTimeline,
+        cache: BridgeCache,
+        pi: int,
+        ni: int,
+        ts: np.ndarray,
+        kin: bool = False,
+    ) -> np.ndarray:
+        """
+        빈 구간 샘플 ts [K]를 클립 pi → ni 브릿지로 평가. 반환 shape [K, DOF]
+        (kin이면 [K, 3, DOF]).
+        계측은 캐시 hit / Ruckig 생성을 나눠 기록한다 (where = gap 구간 ms).
+        """
+        t = self.instr.start()
+        item, built = self._ensure_bridge(tl, cache, pi, ni)
+        out = self._bridge_samples(tl, pi, item, ts, kin)
+        self.instr.stop(
+            "sample_bridge_build" if built else "sample_bridge_hit",
+            t,
+            where=[float(tl.clip_tail[pi]), float(tl.clip_t0[ni])],
+        )
+        return out
+
+    def _bridge_samples(
+        self,
+        tl: CompiledTimeline,
+        pi: int,
+        item: Optional[BridgeCacheItem],
+        ts: np.ndarray,
+        kin: bool = False,
+    ) -> np.ndarray:
+        hold = None
+        if item is None:
             # 이상 상황: 겹침/역전 → 직전 포즈 유지
-            q_end, _, _, _ = self._clip_end_state(prev_c)
-            return q_end.copy()
+            hold, _, _, _ = self._clip_end_state(tl, pi)
+        elif item.duration_s <= 0.0:
+            # 브릿지 생성 실패 → 시작 경계 pose 유지
+            hold = item.q0
+        if hold is not None:
+            if not kin:
+                return np.broadcast_to(hold, (ts.shape[0], DOF))
+            out = np.zeros((ts.shape[0], 3, DOF), dtype=np.float64)
+            out[:, 0] = hold
+            return out
+
+        gap_start = int(tl.clip_tail[pi])
+        if item.poly is not None:
+            t_s = (ts - gap_start) / 1000.0
+            if not kin:
+                return item.poly.at(t_s)
+            return np.stack([item.poly.derivative(t_s, d) for d in range(3)], axis=1)
+
+        # 샘플 (Ruckig Trajectory는 스칼라 API뿐이라 gap 샘플만 순회)
+        t_local = np.clip((ts - gap_start) / 1000.0, 0.0, item.duration_s)
+        if kin:
+            out = np.empty((ts.shape[0], 3, DOF), dtype=np.float64)
+            for k, tl_s in enumerate(t_local.tolist()):
+                out[k] = item.traj.at_time(tl_s)
+            return out
+        out = np.empty((ts.shape[0], DOF), dtype=np.float64)
+        for k, tl_s in enumerate(t_local.tolist()):
+            out[k] = item.traj.at_time(tl_s)[0]
+        return out
 
-        # Gap 길이(초) = minimum_duration에 그대로 사용
-        T_gap = (next_start - gap_start) / 1000.0
+    def _build_all_bridges(
+        self,
+        tl: CompiledTimeline,
+        cache: BridgeCache,
+        ranges: Optional[List[Tuple[float, float]]] = None,
+    ) -> None:
+        """
+        tl의 gap 브릿지를 스레드 풀에서 미리 만들어 cache에 채운다.
+        ranges가 주어지면 [prev tail, next 시작]이 그 중 하나와 겹치는 gap만.
+        """
+        gaps = tl.gaps()
+        if ranges is not None and gaps.shape[0]:
+            g0 = tl.clip_tail[gaps[:, 0]]
+            g1 = tl.clip_t0[gaps[:, 1]]
+            hit = np.zeros((gaps.shape[0],), dtype=bool)
+            for lo, hi in ranges:
+                hit |= (g0 <= hi) & (g1 >= lo)
+            gaps = gaps[hit]
+        if gaps.shape[0] == 0:
+            return
+        workers = min(self.bridge_workers, gaps.shape[0])
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futs = [
+                ex.submit(self._ensure_bridge, tl, cache, int(pi), int(ni))
+                for pi, ni in gaps
+            ]
+            for f in futs:
+                f.result()
+
+    def _ensure_bridge(
+        self, tl: CompiledTimeline, cache: BridgeCache, pi: int, ni: int
+    ) -> Tuple[Optional[BridgeCacheItem], bool]:
+        """
+        클립 pi → ni 브릿지를 캐시에서 찾거나 만든다 → (item, 새로 만들었는지).
+        gap이 없으면 item은 None.
+        """
+        # 1) gap 시간 계산
+        gap_start = int(tl.clip_tail[pi])
+        next_start = int(tl.clip_t0[ni])
+        if next_start <= gap_start:
+            return None, False
+
+        # 2) 블렌딩된 경계 상태로 내용 키 구성 (타임라인별로 메모)
+        states = None
+        key = tl.bridge_keys.get((pi, ni))
+        if key is None:
+            states = self._bridge_boundary_states(tl, pi, ni, gap_start, next_start)
+            key = BridgeKey.of(
+                *states,
+                next_start - gap_start,
+                self._limits_digests[tl.bridge_mode],
+            )
+            tl.bridge_keys[(pi, ni)] = key
+
+        # 3) 캐시 조회, 없으면 생성
+        item = cache.get(key)
+        built = item is None
+        if built:
+            if states is None:
+                states = self._bridge_boundary_states(tl, pi, ni, gap_start, next_start)
+            # Gap 길이(초) = minimum_duration에 그대로 사용
+            T_gap = (next_start - gap_start) / 1000.0
+            item = self._build_bridge(tl.bridge_mode, states, T_gap)
+            cache.put(key, item)
+        return item, built
+
+    def _build_bridge(
+        self, mode: str, states: Tuple[np.ndarray, ...], T_gap: float
+    ) -> BridgeCacheItem:
+        """
+        mode가 quintic/septic이면 닫힌형 다항식을 먼저 맞추고, v/a/jerk limit을
+        사후 검사해 넘을 때만 Ruckig로 다시 만든다.
+        """
+        q0 = np.array(states[0], dtype=np.float64)
+        if mode != "ruckig":
+            poly = PolyBridge.fit(mode, *states, T_gap)
+            lim = self.lim
+            if poly.within_limits(lim.v_max, lim.a_max, lim.j_max):
+                self.instr.count("poly_bridges")
+                return BridgeCacheItem(
+                    T_ms=T_gap * 1000.0,
+                    duration_s=T_gap,
+                    traj=None,
+                    q0=q0,
+                    poly=poly,
+                )
+            self.instr.count("poly_fallbacks")
+        traj = self._build_ruckig_bridge(*states, T_gap)
+        return BridgeCacheItem(
+            T_ms=T_gap * 1000.0, duration_s=traj.duration, traj=traj, q0=q0
+        )
 
-        # 2) blended 경계 상태 계산 (겹침 영향 반영)
-        prev_dt_ms = self._src_dt_ms[prev_c.sourceId]
-        next_dt_ms = self._src_dt_ms[next_c.sourceId]
+    def _bridge_boundary_states(
+        self, tl: CompiledTimeline, pi: int, ni: int, gap_start: int, next_start: int
+    ) -> Tuple[np.ndarray, ...]:
+        """블렌딩된 경계 상태 (q0, v0, a0, q1, v1, a1). 겹침 영향 반영."""
+        prev_dt_ms = float(tl.src_dt_ms[tl.clip_src[pi]])
+        next_dt_ms = float(tl.src_dt_ms[tl.clip_src[ni]])
         h_ms = float(min(prev_dt_ms, next_dt_ms, 8.0))  # 수치 안정용
 
-        # blended positions at t0-ε, t1+ε
-        q0 = self._eval_blended_no_bridge(int(round(gap_start - h_ms)))
-        q1 = self._eval_blended_no_bridge(int(round(next_start + h_ms)))
+        # q(t0-h), q(t0+h), q(t1-h), q(t1+h)를 한 번에 평가
+        probe = np.round(
+            np.array(
+                [
+                    gap_start - h_ms,
+                    gap_start + h_ms,
+                    next_start - h_ms,
+                    next_start + h_ms,
+                ],
+                dtype=np.float64,
+            )
+        )
+        qs, cov = self._eval_blended_no_bridge(tl, probe)
 
+        # blended positions at t0-ε, t1+ε
         # fallback: blended가 없으면 소스 기반 엔드/스타트 사용
-        if q0 is None:
-            q0, _, _, _ = self._clip_end_state(prev_c)
-        if q1 is None:
-            q1, _, _, _ = self._clip_start_state(next_c)
+        q0 = qs[0] if cov[0] else self._clip_end_state(tl, pi)[0]
+        q1 = qs[3] if cov[3] else self._clip_start_state(tl, ni)[0]
 
         # blended velocities at t0, t1 (중앙차분)
-        v0 = self._estimate_vel_blended(gap_start, h_ms)
-        v1 = self._estimate_vel_blended(next_start, h_ms)
-        if v0 is None:
-            frames_prev = self._src_frames_np[prev_c.sourceId]
+        h = max(h_ms, 1e-3) / 1000.0  # seconds
+        if cov[0] and cov[1]:
+            v0 = (qs[1] - qs[0]) / (2.0 * h)
+        else:
+            frames_prev = tl.frames_of(pi)
             v0 = _finite_diff_vel(
                 frames_prev,
-                _clamp_idx(prev_c.outFrame - 1, 0, frames_prev.shape[0] - 1),
-                self._src_dt[prev_c.sourceId],
+                _clamp_idx(tl.clips[pi].outFrame - 1, 0, frames_prev.shape[0] - 1),
+                float(tl.src_dt[tl.clip_src[pi]]),
             )
-        if v1 is None:
-            frames_next = self._src_frames_np[next_c.sourceId]
+        if cov[2] and cov[3]:
+            v1 = (qs[3] - qs[2]) / (2.0 * h)
+        else:
+            frames_next = tl.frames_of(ni)
             v1 = _finite_diff_vel(
-                frames_next,
-                _clamp_idx(next_c.inFrame, 0, frames_next.shape[0] - 1),
-                self._src_dt[next_c.sourceId],
+                frames_next, int(tl.clip_in[ni]), float(tl.src_dt[tl.clip_src[ni]])
             )
 
         a0 = np.zeros((DOF,), dtype=np.float64)
         a1 = np.zeros((DOF,), dtype=np.float64)
+        return q0, v0, a0, q1, v1, a1
 
-        # 3) 캐시 키 & 조회
-        key = BridgeKey(
-            prev_id=prev_c.id,
-            next_id=next_c.id,
-            prev_in=prev_c.inFrame,
-            prev_out=prev_c.outFrame,
-            next_in=next_c.inFrame,
-            next_out=next_c.outFrame,
-            prev_t0=prev_c.t0,
-            next_t0=next_c.t0,
-            dt_ms_prev=int(round(prev_dt_ms)),
-            dt_ms_next=int(round(next_dt_ms)),
-        )
-        item = self._cache.get(key)
-
-        if item is None or abs(item.T_ms - (T_gap * 1000.0)) > 0.5:
-            traj = self._build_ruckig_bridge(q0, v0, a0, q1, v1, a1, T_gap)
-            item = BridgeCacheItem(
-                t0_ms=gap_start,
-                T_ms=T_gap * 1000.0,
-                duration_s=traj.duration,
-                traj=traj,
-            )
-            self._cache.put(key, item)
-
-        # 4) 샘플
-        t_local = (t_ms - item.t0_ms) / 1000.0
-        t_local = max(0.0, min(t_local, item.traj.duration))
-
-        q, dq, ddq = item.traj.at_time(t_local)
-        return q
+    def _otg(self) -> Ruckig:
+        """현재 스레드 전용 Ruckig 인스턴스 (Ruckig 객체는 스레드 간 공유하지 않는다)."""
+        otg = getattr(self._otg_local, "otg", None)
+        if otg is None:
+            otg = Ruckig(DOF, self.lim.control_dt)
+            self._otg_local.otg = otg
+        return otg
 
     def _build_ruckig_bridge(
         self,
@@ -456,13 +1165,27 @@ class TrajectoryEvaluator:
         # gap 시간 강제
         ip.minimum_duration = float(T_gap)
 
+        otg = self._otg()
+        instr = self.instr
+        t = instr.start()
+        instr.count("bridge_builds")
         traj = RuckigTrajectory(DOF)
-        res = self._ruckig.calculate(ip, traj)
-        if res not in (Result.Working, Result.Finished):
+        if not self._calculate(otg, ip, traj):
             # 실패 시 제한 완화(jerk ↑) 후 재시도
-            ip.max_jerk *= 1.25
-            res = self._ruckig.calculate(ip, traj)
-            if res not in (Result.Working, Result.Finished):
+            instr.count("jerk_relaxed_retries")
+            ip.max_jerk = np.array(self.lim.j_max, dtype=np.float64) * 1.25
+            if not self._calculate(otg, ip, traj):
                 # 여전히 실패하면 빈 trajectory 반환 → 호출부에서 q0 유지
-                return RuckigTrajectory(DOF)
+                instr.count("ruckig_failures")
+                traj = RuckigTrajectory(DOF)
+        instr.stop("ruckig_build", t)
         return traj
+
+    @staticmethod
+    def _calculate(otg: Ruckig, ip: InputParameter, traj: RuckigTrajectory) -> bool:
+        """입력이 limit을 벗어나면 Ruckig가 예외를 던지므로 실패(False)로 취급."""
+        try:
+            res = otg.calculate(ip, traj)
+        except RuckigError:
+            return False
+        return res in (Result.Working, Result.Finished)
@@ -0,0 +1,210 @@
+# app/motion/export.py
+from __future__ import annotations
+from typing import Callable, Dict, Iterator, List, Literal, Tuple
+import io
+import json
+import struct
+import zipfile
+
+import numpy as np
+
+from .evaluator import grid_len, time_grid_chunks
+from .types import DOF
+
+EvalTimesFn = Callable[[np.ndarray], np.ndarray]  # ts [N] ms → q [N, DOF]
+# ts [N] ms → (q, dq, ddq) 각 [N, DOF]
+EvalKinematicsFn = Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray, np.ndarray]]
+ExportDtype = Literal["float32", "float64"]
+
+DEFAULT_CHUNK_ROWS = 4096
+
+# raw 스트림 헤더 (32 bytes, little-endian)
+#   magic "TRJ1" | dof u16 | itemsize u16 | frames u64 | t0_ms f64 | step_ms f64
+RAW_MAGIC = b"TRJ1"
+RAW_HEADER = struct.Struct("<4sHHQdd")
+
+
+def joint_names(prefix: str = "q") -> List[str]:
+    return [f"{prefix}{i}" for i in range(DOF)]
+
+
+def csv_header(derivatives: bool = False) -> str:
+    cols = joint_names()
+    if derivatives:
+        cols += joint_names("dq") + joint_names("ddq")
+    return ",".join(["time"] + cols) + "\n"
+
+
+def format_csv_rows(ts_ms: np.ndarray, q: np.ndarray) -> str:
+    """
+    [N] 시각(ms) + [N, DOF] 관절값 → CSV 텍스트 블록 (time은 초, 값은 %.9f).
+    행 템플릿을 N번 이어 붙여 % 한 번으로 포맷한다 (값마다 f-string 호출 X).
+    """
+    n = ts_ms.shape[0]
+    if n == 0:
+        return ""
+    row = "%r" + ",%.9f" * q.shape[1] + "\n"
+    cols = np.empty((n, q.shape[1] + 1), dtype=np.float64)
+    cols[:, 0] = ts_ms / 1000.0
+    cols[:, 1:] = q
+    # tolist → Python float (np.float64의 %r은 "np.float64(...)"가 된다)
+    return (row * n) % tuple(cols.ravel().tolist())
+
+
+def iter_csv(
+    eval_times: EvalTimesFn,
+    t0_ms: float,
+    t1_ms: float,
+    step_ms: float,
+    include_header: bool = True,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[str]:
+    """
+    [t0, t1]을 step_ms 격자로 chunk_rows행씩 평가 → 포맷 → yield.
+    메모리는 프로젝트 길이와 무관하게 chunk 하나 분량이고, 헤더는 평가 전에 나간다.
+    """
+    if include_header:
+        yield csv_header()
+    for ts in time_grid_chunks(t0_ms, t1_ms, step_ms, chunk_rows):
+        yield format_csv_rows(ts, eval_times(ts))
+
+
+def iter_csv_kinematics(
+    eval_kinematics: EvalKinematicsFn,
+    t0_ms: float,
+    t1_ms: float,
+    step_ms: float,
+    include_header: bool = True,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[str]:
+    """iter_csv와 같고 열만 time, q*, dq* (/s), ddq* (/s²)."""
+    if include_header:
+        yield csv_header(derivatives=True)
+    for ts in time_grid_chunks(t0_ms, t1_ms, step_ms, chunk_rows):
+        yield format_csv_rows(ts, np.hstack(eval_kinematics(ts)))
+
+
+# ---------- binary ----------
+def _q_chunks(
+    eval_times: EvalTimesFn,
+    t0_ms: float,
+    t1_ms: float,
+    step_ms: float,
+    dtype: ExportDtype,
+    chunk_rows: int,
+) -> Iterator[bytes]:
+    """chunk별 [n, DOF] little-endian 바이트 (C 순서)."""
+    dt = np.dtype(dtype).newbyteorder("<")
+    for ts in time_grid_chunks(t0_ms, t1_ms, step_ms, chunk_rows):
+        yield np.ascontiguousarray(eval_times(ts), dtype=dt).tobytes()
+
+
+def _npy_header(shape, dtype: ExportDtype) -> bytes:
+    buf = io.BytesIO()
+    np.lib.format.write_array_header_1_0(
+        buf,
+        {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(dtype).newbyteorder("<")),
+            "fortran_order": False,
+            "shape": tuple(shape),
+        },
+    )
+    return buf.getvalue()
+
+
+def iter_npy(
+    eval_times: EvalTimesFn,
+    t0_ms: float,
+    t1_ms: float,
+    step_ms: float,
+    dtype: ExportDtype = "float32",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[bytes]:
+    """[N, DOF] .npy 스트림. 샘플 수를 미리 알기 때문에 헤더를 먼저 보내고 본문을 chunk로 잇는다."""
+    n = grid_len(t0_ms, t1_ms, step_ms)
+    yield _npy_header((n, DOF), dtype)
+    yield from _q_chunks(eval_times, t0_ms, t1_ms, step_ms, dtype, chunk_rows)
+
+
+def iter_raw(
+    eval_times: EvalTimesFn,
+    t0_ms: float,
+    t1_ms: float,
+    step_ms: float,
+    dtype: ExportDtype = "float32",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[bytes]:
+    """RAW_HEADER + [N, DOF] 행 우선 little-endian 값."""
+    n = grid_len(t0_ms, t1_ms, step_ms)
+    itemsize = np.dtype(dtype).itemsize
+    yield RAW_HEADER.pack(RAW_MAGIC, DOF, itemsize, n, float(t0_ms), float(step_ms))
+    yield from _q_chunks(eval_times, t0_ms, t1_ms, step_ms, dtype, chunk_rows)
+
+
+def read_raw(buf) -> Dict[str, object]:
+    """iter_raw 결과 → {"t0_ms", "step_ms", "q" [N, DOF]} (q는 buf 위 view)."""
+    magic, dof, itemsize, n, t0_ms, step_ms = RAW_HEADER.unpack_from(buf, 0)
+    if magic != RAW_MAGIC:
+        raise ValueError("Not a raw trajectory stream")
+    dt = np.dtype("<f4") if itemsize == 4 else np.dtype("<f8")
+    q = np.frombuffer(buf, dtype=dt, count=n * dof, offset=RAW_HEADER.size)
+    return {"t0_ms": t0_ms, "step_ms": step_ms, "q": q.reshape(n, dof)}
+
+
+class _Sink:
+    """쓰기 전용 버퍼. zipfile이 tell/seek 없는 스트림으로 쓰게 하고 쌓인 바이트를 꺼내 간다."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def write(self, b) -> int:
+        self._parts.append(bytes(b))
+        return len(b)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+
+def iter_npz(
+    eval_times: EvalTimesFn,
+    t0_ms: float,
+    t1_ms: float,
+    step_ms: float,
+    dtype: ExportDtype = "float32",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    meta: Dict[str, object] | None = None,
+) -> Iterator[bytes]:
+    """
+    무압축 .npz 스트림:
+      q [N, DOF], times_ms [N], dt (초), joint_names [DOF], meta (JSON 문자열)
+    zip 항목은 data descriptor로 써서 크기를 몰라도 순서대로 흘려보낼 수 있다.
+    """
+    sink = _Sink()
+    n = grid_len(t0_ms, t1_ms, step_ms)
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+        with zf.open("q.npy", "w", force_zip64=True) as f:
+            f.write(_npy_header((n, DOF), dtype))
+            for chunk in _q_chunks(
+                eval_times, t0_ms, t1_ms, step_ms, dtype, chunk_rows
+            ):
+                f.write(chunk)
+                yield sink.drain()
+        with zf.open("times_ms.npy", "w", force_zip64=True) as f:
+            f.write(_npy_header((n,), "float64"))
+            for ts in time_grid_chunks(t0_ms, t1_ms, step_ms, chunk_rows):
+                f.write(ts.astype("<f8").tobytes())
+                yield sink.drain()
+        small = {
+            "dt": np.float64(step_ms / 1000.0),
+            "joint_names": np.array(joint_names()),
+            "meta": np.array(json.dumps(meta or {}, separators=(",", ":"))),
+        }
+        for name, arr in small.items():
+            with zf.open(f"{name}.npy", "w") as f:
+                np.save(f, arr, allow_pickle=False)
+    yield sink.drain()
@@ -0,0 +1,98 @@
+# app/motion/frames.py
+from __future__ import annotations
+from typing import List, Literal, Optional, Tuple
+
+import numpy as np
+
+FrameStorage = Literal["float64", "float32", "int16"]
+
+_INT16_MAX = 32767
+
+
+class FrameStore:
+    """
+    소스 프레임 [F, DOF]의 압축 저장소.
+
+    - float64 / float32 : 그대로 저장
+    - int16             : 관절별 affine 양자화 (q = code * scale + offset)
+                          관절별 오차 <= scale / 2 = (max - min) / (2 * 65534)
+
+    인덱싱(frames[idx])은 요청한 행만 float64로 복원해 돌려주므로
+    evaluator는 전체 배열을 풀지 않고 압축 배열 위에서 바로 보간한다.
+    """
+
+    __slots__ = ("data", "scale", "offset")
+
+    def __init__(
+        self,
+        data: np.ndarray,
+        scale: Optional[np.ndarray] = None,
+        offset: Optional[np.ndarray] = None,
+    ):
+        self.data = data
+        self.scale = scale  # [DOF] (int16만)
+        self.offset = offset  # [DOF] (int16만)
+        self.data.flags.writeable = False
+
+    @staticmethod
+    def encode(
+        frames, storage: FrameStorage = "float64", copy: bool = True
+    ) -> FrameStore:
+        """
+        [F, DOF] 배열/리스트 → FrameStore.
+        copy=False이고 이미 같은 dtype의 배열이면 그대로 감싼다 (호출자가 버퍼를 넘겨줄 때).
+        """
+        if storage == "int16":
+            x = np.asarray(frames, dtype=np.float64)
+            lo, hi = x.min(axis=0), x.max(axis=0)
+            offset = 0.5 * (lo + hi)
+            scale = (hi - lo) / (2 * _INT16_MAX)
+            scale[scale <= 0] = 1.0  # 상수 관절 → code 0
+            code = np.rint((x - offset) / scale)
+            code = np.clip(code, -_INT16_MAX, _INT16_MAX).astype(np.int16)
+            return FrameStore(code, scale, offset)
+        if storage in ("float64", "float32"):
+            if copy:
+                return FrameStore(np.array(frames, dtype=storage))
+            return FrameStore(np.ascontiguousarray(frames, dtype=storage))
+        raise ValueError(f"Unknown frame storage: {storage}")
+
+    # ---------- array-like ----------
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.data.shape
+
+    @property
+    def ndim(self) -> int:
+        return self.data.ndim
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    def __getitem__(self, idx) -> np.ndarray:
+        return self.decode_values(self.data[idx])
+
+    @property
+    def storage(self) -> str:
+        return str(self.data.dtype)
+
+    @property
+    def nbytes(self) -> int:
+        n = self.data.nbytes
+        if self.scale is not None:
+            n += self.scale.nbytes + self.offset.nbytes
+        return n
+
+    # ---------- decode ----------
+    def decode_values(self, raw: np.ndarray) -> np.ndarray:
+        """저장 단위 값(코드) → float64 관절값. min/max/mean 같은 affine 집계에도 그대로 쓴다."""
+        if self.scale is None:
+            return raw.astype(np.float64, copy=False)
+        return raw * self.scale + self.offset
+
+    def decode(self) -> np.ndarray:
+        """전체 [F, DOF] float64 (export 등 경계에서만)."""
+        return self[:]
+
+    def tolist(self) -> List[List[float]]:
+        return self.decode().tolist()
@@ -0,0 +1,132 @@
+# app/motion/instrument.py
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+import heapq
+import math
+import threading
+import time
+
+# bucket i = [2^(i-1), 2^i) µs, bucket 0 = 1 µs 미만, 마지막 = 2^(N-2) µs 이상 (~16 s)
+_N_BUCKETS = 26
+
+
+class LatencyHistogram:
+    """log2 버킷 지연 히스토그램 (µs). 백분위는 버킷 상한으로 근사한다."""
+
+    __slots__ = ("counts", "n", "total_us", "min_us", "max_us")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * _N_BUCKETS
+        self.n = 0
+        self.total_us = 0.0
+        self.min_us = math.inf
+        self.max_us = 0.0
+
+    def record(self, us: float) -> None:
+        b = 0 if us < 1.0 else min(_N_BUCKETS - 1, math.frexp(us)[1])
+        self.counts[b] += 1
+        self.n += 1
+        self.total_us += us
+        if us < self.min_us:
+            self.min_us = us
+        if us > self.max_us:
+            self.max_us = us
+
+    def percentile(self, q: float) -> float:
+        if self.n == 0:
+            return 0.0
+        need = q * self.n
+        acc = 0
+        for b, c in enumerate(self.counts):
+            acc += c
+            if acc >= need:
+                return min(float(1 << b), self.max_us)
+        return self.max_us
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "count": self.n,
+            "mean_us": self.total_us / self.n if self.n else 0.0,
+            "min_us": self.min_us if self.n else 0.0,
+            "max_us": self.max_us,
+            "p50_us": self.percentile(0.50),
+            "p90_us": self.percentile(0.90),
+            "p99_us": self.percentile(0.99),
+            # [상한 µs, 개수] (비어 있는 버킷 제외)
+            "buckets": [[1 << b, c] for b, c in enumerate(self.counts) if c],
+        }
+
+
+class Instrumentation:
+    """
+    evaluator 단계별 지연 히스토그램 + 카운터 (opt-in).
+
+    꺼져 있으면 start()가 None을 돌려주고 stop()/lap()/count()는 바로 반환하므로
+    측정 지점의 비용은 속성 읽기 한 번이다. 단계마다 가장 느린 호출 몇 개를
+    위치(where: 시각 ms 또는 구간)와 함께 남겨 어느 구간이 느린지 찾을 수 있게 한다.
+    """
+
+    def __init__(self, enabled: bool = False, slow_keep: int = 8):
+        self.enabled = enabled
+        self.slow_keep = slow_keep
+        self._lock = threading.Lock()
+        self._hist: Dict[str, LatencyHistogram] = {}
+        self._slow: Dict[str, List[Tuple[float, int, object]]] = {}
+        self._counters: Dict[str, int] = {}
+        self._seq = 0  # heap tie-breaker
+
+    def start(self) -> Optional[float]:
+        return time.perf_counter() if self.enabled else None
+
+    def stop(self, stage: str, t0: Optional[float], where: object = None) -> None:
+        if t0 is None:
+            return
+        self._record(stage, (time.perf_counter() - t0) * 1e6, where)
+
+    def lap(self, stage: str, t0: Optional[float]) -> Optional[float]:
+        """stage를 기록하고 다음 구간의 시작 시각을 돌려준다."""
+        if t0 is None:
+            return None
+        now = time.perf_counter()
+        self._record(stage, (now - t0) * 1e6, None)
+        return now
+
+    def count(self, name: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def _record(self, stage: str, us: float, where: object) -> None:
+        with self._lock:
+            h = self._hist.get(stage)
+            if h is None:
+                h = self._hist[stage] = LatencyHistogram()
+            h.record(us)
+            if where is not None and self.slow_keep > 0:
+                heap = self._slow.setdefault(stage, [])
+                self._seq += 1
+                item = (us, self._seq, where)
+                if len(heap) < self.slow_keep:
+                    heapq.heappush(heap, item)
+                elif us > heap[0][0]:
+                    heapq.heapreplace(heap, item)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hist.clear()
+            self._slow.clear()
+            self._counters.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            stages = {k: h.to_dict() for k, h in sorted(self._hist.items())}
+            for k, heap in self._slow.items():
+                stages[k]["slowest"] = [
+                    {"us": us, "where": where} for us, _, where in sorted(heap)[::-1]
+                ]
+            return {
+                "enabled": self.enabled,
+                "stages": stages,
+                "counters": dict(sorted(self._counters.items())),
+            }
@@ -0,0 +1,135 @@
+# app/motion/ops.py
+from __future__ import annotations
+from dataclasses import replace
+from typing import Iterable, List, Optional, Set, Tuple
+
+from app.models import (
+    AddClipOp,
+    MoveClipOp,
+    TrimClipOp,
+    DeleteClipOp,
+    SetBlendOp,
+    AddSourceOp,
+    RemoveSourceOp,
+)
+from .adapter import clip_to_runtime, source_to_runtime, blend_to_runtime
+from .source_registry import SourceRegistry
+from .types import Project as RTProject, Clip as RTClip, Source as RTSource
+
+
+def apply_ops(
+    p: RTProject,
+    ops: Iterable[object],
+    registry: Optional[SourceRegistry] = None,
+) -> Tuple[RTProject, Set[str]]:
+    """
+    Runtime Project에 편집 op들을 순서대로 적용한 새 Project와,
+    결과가 바뀔 수 있는 클립 ID 집합을 반환한다.
+
+    - 입력 p는 건드리지 않는다 (clips 리스트 / sources dict만 얕게 복사).
+      Source/Clip은 불변이라 바뀌지 않은 것은 객체를 그대로 공유하며,
+      evaluator는 이 identity로 소스 프레임 재변환을 건너뛴다.
+    - op 하나라도 실패하면 ValueError (p는 그대로).
+    - registry: add_source 프레임 등록 / 해시 참조 해석 (to_runtime과 동일)
+    """
+    clips: List[RTClip] = list(p.clips)
+    sources = dict(p.sources)
+    touched: Set[str] = set()
+
+    def find(clip_id: str) -> int:
+        for i, c in enumerate(clips):
+            if c.id == clip_id:
+                return i
+        raise ValueError(f"Unknown clip: {clip_id}")
+
+    for op in ops:
+        if isinstance(op, AddClipOp):
+            if any(c.id == op.clip.id for c in clips):
+                raise ValueError(f"Duplicate clip: {op.clip.id}")
+            clips.append(clip_to_runtime(op.clip))
+            touched.add(op.clip.id)
+
+        elif isinstance(op, MoveClipOp):
+            i = find(op.clipId)
+            clips[i] = replace(clips[i], t0=int(op.t0))
+            touched.add(op.clipId)
+
+        elif isinstance(op, TrimClipOp):
+            i = find(op.clipId)
+            c = clips[i]
+            clips[i] = replace(
+                c,
+                t0=int(op.t0) if op.t0 is not None else c.t0,
+                inFrame=int(op.inFrame),
+                outFrame=int(op.outFrame),
+            )
+            touched.add(op.clipId)
+
+        elif isinstance(op, DeleteClipOp):
+            clips.pop(find(op.clipId))
+            touched.add(op.clipId)
+
+        elif isinstance(op, SetBlendOp):
+            i = find(op.clipId)
+            clips[i] = replace(clips[i], blend=blend_to_runtime(op.blend))
+            touched.add(op.clipId)
+
+        elif isinstance(op, AddSourceOp):
+            # 같은 ID면 교체 → 그 소스를 쓰는 클립이 모두 영향을 받는다
+            sources[op.source.id] = source_to_runtime(op.source, registry)
+            touched.update(c.id for c in clips if c.sourceId == op.source.id)
+
+        elif isinstance(op, RemoveSourceOp):
+            if sources.pop(op.sourceId, None) is None:
+                raise ValueError(f"Unknown source: {op.sourceId}")
+            # 참조하는 클립은 남겨두되 평가에서는 제외된다 (set_project와 동일)
+            touched.update(c.id for c in clips if c.sourceId == op.sourceId)
+
+        else:
+            raise ValueError(f"Unsupported op: {op!r}")
+
+    return RTProject(lengthMs=p.lengthMs, sources=sources, clips=clips), touched
+
+
+def _same_source(a: Optional[RTSource], b: Optional[RTSource]) -> bool:
+    """평가 결과가 같은 소스인지. 레지스트리를 거치면 같은 내용은 같은 저장소 객체다."""
+    if a is None or b is None:
+        return a is b
+    if a.dt != b.dt:
+        return False
+    if a.frames is b.frames:
+        return True
+    return a.hash is not None and a.hash == b.hash
+
+
+def _clip_content(c: RTClip) -> tuple:
+    # name은 평가에 쓰이지 않는다
+    return (c.sourceId, c.t0, c.inFrame, c.outFrame, c.blend)
+
+
+def changed_clip_ids(old: RTProject, new: RTProject) -> Optional[Set[str]]:
+    """
+    set_project로 통째 교체할 때 old → new 사이 결과가 바뀔 수 있는 클립 ID 집합
+    (apply_ops의 touched와 같은 의미: 추가/삭제/이동/trim/블렌드 변경, 소스 교체).
+    클립 ID가 중복되면 ID로 구간을 특정할 수 없으므로 None (= 전체 변경).
+    """
+    old_clips = {c.id: c for c in old.clips}
+    new_clips = {c.id: c for c in new.clips}
+    if len(old_clips) != len(old.clips) or len(new_clips) != len(new.clips):
+        return None
+    changed_src = {
+        sid
+        for sid in old.sources.keys() | new.sources.keys()
+        if not _same_source(old.sources.get(sid), new.sources.get(sid))
+    }
+    touched: Set[str] = set()
+    for cid in old_clips.keys() | new_clips.keys():
+        a, b = old_clips.get(cid), new_clips.get(cid)
+        if (
+            a is None
+            or b is None
+            or _clip_content(a) != _clip_content(b)
+            or a.sourceId in changed_src
+        ):
+            touched.add(cid)
+    return touched
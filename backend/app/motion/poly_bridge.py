@@ -0,0 +1,132 @@
+# app/motion/poly_bridge.py
+from __future__ import annotations
+from dataclasses import dataclass
+from math import factorial
+from typing import Literal, Optional, Sequence
+
+import numpy as np
+
+BridgeMode = Literal["ruckig", "quintic", "septic"]
+
+# 사후 limit 검사용 샘플 수 (구간 [0, T]를 균등 분할, 양 끝 포함)
+_CHECK_SAMPLES = 129
+
+
+def _constraint_matrix(order: int, n_deriv: int) -> np.ndarray:
+    """
+    정규화 시간 s ∈ [0, 1]의 다항식 Σ c_k s^k 에 대해
+    s=0, s=1 에서 0..n_deriv-1 차 도함수를 고정하는 [2n, order+1] 행렬.
+    """
+    rows = []
+    for s in (0.0, 1.0):
+        for d in range(n_deriv):
+            row = np.zeros(order + 1)
+            for k in range(d, order + 1):
+                row[k] = factorial(k) / factorial(k - d) * (s ** (k - d))
+            rows.append(row)
+    # 행 순서: s=0의 (q, v, a[, j]) → s=1의 (q, v, a[, j])
+    return np.array(rows)
+
+
+_MATRICES = {
+    "quintic": np.linalg.inv(_constraint_matrix(5, 3)),
+    "septic": np.linalg.inv(_constraint_matrix(7, 4)),
+}
+
+
+def _check_basis(order: int, d: int) -> np.ndarray:
+    """검사 샘플 s_i 에서 d차 도함수 기저 [S, order+1] (B @ coef = d^d q / ds^d)."""
+    s = np.linspace(0.0, 1.0, _CHECK_SAMPLES)
+    B = np.zeros((_CHECK_SAMPLES, order + 1))
+    for k in range(d, order + 1):
+        B[:, k] = factorial(k) / factorial(k - d) * s ** (k - d)
+    return B
+
+
+# 모드별 (1, 2, 3)차 검사 기저: limit 검사를 행렬곱 세 번으로 끝낸다
+_CHECK_BASIS = {
+    mode: [_check_basis(M.shape[0] - 1, d) for d in (1, 2, 3)]
+    for mode, M in _MATRICES.items()
+}
+
+
+@dataclass(frozen=True)
+class PolyBridge:
+    """
+    gap [0, T] 구간의 닫힌형 Hermite 다항식 브릿지 (관절별 독립, 벡터 평가).
+
+    - quintic: 양 끝 q / v / a 일치
+    - septic : 양 끝 q / v / a 일치 + jerk 0 (더 부드럽지만 중간 피크가 약간 크다)
+
+    계수는 정규화 시간 s = t / T 기준이며 coef [order+1, DOF].
+    """
+
+    coef: np.ndarray
+    duration_s: float
+
+    @staticmethod
+    def fit(
+        mode: BridgeMode,
+        q0: np.ndarray,
+        v0: np.ndarray,
+        a0: np.ndarray,
+        q1: np.ndarray,
+        v1: np.ndarray,
+        a1: np.ndarray,
+        T: float,
+    ) -> PolyBridge:
+        """경계 상태 (q, v, a)와 gap 길이 T(초)로 계수 계산 (DOF 전체를 한 번에 풂)."""
+        Minv = _MATRICES[mode]
+        b = [q0, v0 * T, a0 * T * T]
+        if mode == "septic":
+            b.append(np.zeros_like(q0))
+        b += [q1, v1 * T, a1 * T * T]
+        if mode == "septic":
+            b.append(np.zeros_like(q1))
+        coef = Minv @ np.stack(b).astype(np.float64)
+        coef.flags.writeable = False
+        return PolyBridge(coef=coef, duration_s=float(T))
+
+    @property
+    def nbytes(self) -> int:
+        return self.coef.nbytes
+
+    def derivative(self, t_s: np.ndarray, d: int = 0) -> np.ndarray:
+        """t_s [K] (초, [0, T]로 clip) 에서 d차 도함수 [K, DOF] (Horner)."""
+        T = self.duration_s
+        s = np.clip(np.asarray(t_s, dtype=np.float64) / T, 0.0, 1.0)
+        order = self.coef.shape[0] - 1
+        if d > order:
+            return np.zeros((s.shape[0], self.coef.shape[1]))
+        # d차 도함수 계수: c_k * k! / (k-d)!
+        scale = [factorial(k) / factorial(k - d) for k in range(d, order + 1)]
+        c = self.coef[d:] * np.array(scale)[:, None]
+        out = np.broadcast_to(c[-1], (s.shape[0], c.shape[1])).copy()
+        for k in range(c.shape[0] - 2, -1, -1):
+            out *= s[:, None]
+            out += c[k]
+        return out / (T**d) if d else out
+
+    def at(self, t_s: np.ndarray) -> np.ndarray:
+        """t_s [K] (초) → q [K, DOF]"""
+        return self.derivative(t_s, 0)
+
+    def within_limits(
+        self,
+        v_max: Sequence[float],
+        a_max: Sequence[float],
+        j_max: Optional[Sequence[float]] = None,
+    ) -> bool:
+        """
+        v / a (/ jerk) 절댓값이 관절별 limit 이하인지 균등 샘플로 검사.
+        경계 상태 자체가 limit을 넘으면 Ruckig도 못 푸는 입력이므로 여기서 False가 나와도
+        호출부는 Ruckig 결과(완화/실패 처리 포함)를 그대로 쓴다.
+        """
+        mode = "quintic" if self.coef.shape[0] == 6 else "septic"
+        limits = [v_max, a_max] + ([j_max] if j_max is not None else [])
+        T = self.duration_s
+        for d, (B, lim) in enumerate(zip(_CHECK_BASIS[mode], limits), start=1):
+            peak = np.abs(B @ self.coef).max(axis=0) / (T**d)
+            if np.any(peak > np.asarray(lim, dtype=np.float64) * (1.0 + 1e-9)):
+                return False
+        return True
@@ -0,0 +1,150 @@
+# app/motion/pose_cache.py
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import math
+import threading
+
+import numpy as np
+
+from .types import DOF
+
+# 항목당 대략적인 메모리: pose 배열 + ndarray/dict/OrderedDict 오버헤드
+_ENTRY_OVERHEAD = 256
+# 구간 무효화용 시간 블록 (ms). 블록 단위로 key를 모아 두면 dirty 구간만 훑는다.
+_BLOCK_MS = 1024
+
+
+class PoseCache:
+    """
+    스크럽용 평가 결과 LRU: (프로젝트 version, 양자화된 t_ms) → pose [DOF].
+
+    - 캐시는 항상 한 version만 담는다. 프로젝트가 바뀌면 advance()로 새 version에
+      맞추면서 dirty 구간의 항목만 버리고 나머지는 그대로 새 version 값으로 쓴다.
+    - get/put은 version이 캐시의 현재 version과 다르면 무시된다 → 교체 직전
+      스냅샷으로 계산한 값이 뒤늦게 들어와도 새 version을 오염시키지 않는다.
+    - quantum_ms > 1이면 시각을 그 격자로 스냅한다 (가까운 seek끼리 항목 공유).
+    """
+
+    def __init__(self, max_bytes: int = 16 << 20, quantum_ms: int = 1) -> None:
+        self.quantum_ms = max(1, int(quantum_ms))
+        self.entry_bytes = DOF * 8 + _ENTRY_OVERHEAD
+        self.max_entries = max(0, int(max_bytes)) // self.entry_bytes
+        self.version = 0
+        self._map: OrderedDict[int, np.ndarray] = OrderedDict()
+        self._blocks: Dict[int, Set[int]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidated = 0
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, t_ms: float) -> int:
+        """양자화된 정수 ms 시각 (= 실제로 평가하는 시각)."""
+        q = self.quantum_ms
+        return int(round(t_ms / q)) * q
+
+    # ---------- lookup ----------
+    def get_many(self, version: int, keys: Sequence[int]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            if version != self.version or not self.enabled:
+                self.misses += len(keys)
+                return [None] * len(keys)
+            out: List[Optional[np.ndarray]] = []
+            for k in keys:
+                q = self._map.get(k)
+                if q is not None:
+                    self._map.move_to_end(k)
+                out.append(q)
+            n_hit = sum(q is not None for q in out)
+            self.hits += n_hit
+            self.misses += len(keys) - n_hit
+            return out
+
+    def put_many(self, version: int, keys: Sequence[int], q: np.ndarray) -> None:
+        """keys[i] → q[i] (행은 복사해 읽기 전용으로 저장)."""
+        if not self.enabled:
+            return
+        q = np.array(q, dtype=np.float64)
+        q.flags.writeable = False
+        with self._lock:
+            if version != self.version:
+                return
+            for k, row in zip(keys, q):
+                if k not in self._map:
+                    self._blocks.setdefault(k // _BLOCK_MS, set()).add(k)
+                self._map[k] = row
+                self._map.move_to_end(k)
+            while len(self._map) > self.max_entries:
+                k, _ = self._map.popitem(last=False)
+                self._discard_block_key(k)
+                self.evictions += 1
+
+    # ---------- invalidation ----------
+    def advance(self, version: int, dirty: Optional[List[Tuple[float, float]]]) -> None:
+        """
+        캐시를 version으로 올린다. dirty [(lo, hi)] ms (±inf 가능) 안의 항목만 버리고,
+        dirty가 None이면(프로젝트 전체 교체) 모두 버린다. []이면 결과 불변(bake 전환 등).
+        """
+        with self._lock:
+            self.version = version
+            if dirty is None:
+                self.invalidated += len(self._map)
+                self._map.clear()
+                self._blocks.clear()
+                return
+            for lo, hi in dirty:
+                self._drop_range(lo, hi)
+
+    def _drop_range(self, lo: float, hi: float) -> None:
+        if math.isinf(lo) or math.isinf(hi):
+            blocks = list(self._blocks)
+        else:
+            b0, b1 = int(lo) // _BLOCK_MS, int(math.ceil(hi)) // _BLOCK_MS
+            if b1 - b0 > len(self._blocks):
+                blocks = list(self._blocks)
+            else:
+                blocks = [b for b in range(b0, b1 + 1) if b in self._blocks]
+        for b in blocks:
+            keys = self._blocks[b]
+            drop = [k for k in keys if lo <= k <= hi]
+            for k in drop:
+                del self._map[k]
+                keys.discard(k)
+            if not keys:
+                del self._blocks[b]
+            self.invalidated += len(drop)
+
+    def _discard_block_key(self, k: int) -> None:
+        b = k // _BLOCK_MS
+        keys = self._blocks.get(b)
+        if keys is not None:
+            keys.discard(k)
+            if not keys:
+                del self._blocks[b]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._map.clear()
+            self._blocks.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._map),
+                "bytes": len(self._map) * self.entry_bytes,
+                "max_entries": self.max_entries,
+                "quantum_ms": self.quantum_ms,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidated": self.invalidated,
+            }
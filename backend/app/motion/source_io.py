@@ -0,0 +1,59 @@
+# app/motion/source_io.py
+from __future__ import annotations
+from typing import Optional
+import io
+
+import numpy as np
+
+from .types import DOF
+
+_NPY_MAGIC = b"\x93NUMPY"
+_ZIP_MAGIC = b"PK\x03\x04"
+_RAW_DTYPES = {"f32": np.dtype("<f4"), "f64": np.dtype("<f8")}
+
+
+def frames_from_buffer(buf: bytes, dtype: Optional[str] = None) -> np.ndarray:
+    """
+    업로드 바이트 → [F, DOF] 배열 (모양 검증 한 번, Python float 변환 없음).
+
+    - .npy : 헤더만 파싱하고 본문은 buf 위 view (복사 X)
+    - .npz : "frames" 배열 (없으면 첫 배열)
+    - raw  : little-endian float32("f32") / float64("f64") 행 우선 [F * DOF]
+    반환 배열은 읽기 전용이며 raw/.npy는 buf를 그대로 참조한다.
+    """
+    if buf[: len(_NPY_MAGIC)] == _NPY_MAGIC:
+        arr = _npy_view(buf)
+    elif buf[: len(_ZIP_MAGIC)] == _ZIP_MAGIC:
+        with np.load(io.BytesIO(buf), allow_pickle=False) as z:
+            if not z.files:
+                raise ValueError("Empty .npz")
+            arr = z["frames"] if "frames" in z.files else z[z.files[0]]
+    else:
+        dt = _RAW_DTYPES.get(dtype or "")
+        if dt is None:
+            raise ValueError('Raw buffers need dtype "f32" or "f64"')
+        if len(buf) % (dt.itemsize * DOF):
+            raise ValueError(
+                f"Raw buffer size {len(buf)} is not a multiple of {DOF} x {dt.itemsize}"
+            )
+        arr = np.frombuffer(buf, dtype=dt).reshape(-1, DOF)
+
+    if arr.ndim != 2 or arr.shape[0] == 0 or arr.shape[1] != DOF:
+        raise ValueError(f"Source frames must be [F>0, {DOF}], got {arr.shape}")
+    return arr
+
+
+def _npy_view(buf: bytes) -> np.ndarray:
+    f = io.BytesIO(buf)
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+    elif version in ((2, 0), (3, 0)):
+        shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+    else:
+        raise ValueError(f"Unsupported .npy version {version}")
+    if dtype.hasobject:
+        raise ValueError("Object arrays are not allowed")
+    count = int(np.prod(shape)) if shape else 1
+    arr = np.frombuffer(buf, dtype=dtype, count=count, offset=f.tell())
+    return arr.reshape(shape, order="F" if fortran else "C")
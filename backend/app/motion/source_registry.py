@@ -0,0 +1,155 @@
+# app/motion/source_registry.py
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+import hashlib
+import threading
+
+import numpy as np
+
+from .frames import FrameStore, FrameStorage
+from .source_store import SourceStore
+from .types import DOF
+
+_HASH_BLOCK_ROWS = 1 << 14
+
+
+def content_hash(frames: np.ndarray) -> str:
+    """
+    [F, DOF] 프레임의 내용 해시 (float64 little-endian 바이트의 sha256, hex).
+    입력 dtype과 무관하게 같은 값이면 같은 해시다. float64 연속 배열은 복사 없이,
+    나머지는 행 블록 단위로 변환하며 해시한다.
+    """
+    h = hashlib.sha256()
+    x = np.asarray(frames)
+    if x.dtype == np.dtype("<f8") and x.flags.c_contiguous:
+        h.update(memoryview(x).cast("B"))
+    else:
+        for i in range(0, x.shape[0], _HASH_BLOCK_ROWS):
+            blk = x[i : i + _HASH_BLOCK_ROWS]
+            h.update(np.ascontiguousarray(blk, dtype="<f8").tobytes())
+    return h.hexdigest()
+
+
+class SourceRegistry:
+    """
+    내용 해시 → 상주 프레임 저장소(FrameStore).
+
+    같은 프레임은 한 번만 업로드/검증/변환되고, Project는 해시로 소스를 참조한다.
+    to_runtime은 해시를 이미 올라와 있는 FrameStore로 바꿀 뿐 복사하지 않는다.
+    store가 있으면 해시를 key로 디스크(memmap)에 두므로 재시작 후에도 해시가 유효하다.
+
+    max_bytes > 0이면 그 크기를 넘을 때 set_live()로 받은 현재 프로젝트의 해시가 아닌
+    항목부터 오래 안 쓴 순서로 버린다 (디스크 사본은 남는다). 버려진 해시는 다시
+    업로드하기 전까지 get()에서 KeyError다 (store가 있으면 디스크에서 다시 연다).
+    """
+
+    def __init__(
+        self,
+        storage: FrameStorage = "float64",
+        store: Optional[SourceStore] = None,
+        max_bytes: int = 0,
+    ):
+        self.storage = storage
+        self.store = store
+        self.max_bytes = max(0, int(max_bytes))
+        self._map: OrderedDict[str, FrameStore] = OrderedDict()
+        self._live: Set[str] = set()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def register(self, frames, copy: bool = True) -> Tuple[str, FrameStore]:
+        """
+        프레임 등록 → (hash, FrameStore). 이미 있으면 기존 것을 그대로 돌려준다.
+        copy=False: frames 배열(예: 업로드 버퍼 위 view)의 소유권을 넘겨받는다.
+        dtype이 저장 형식과 같으면 복사 없이 그대로 저장소가 된다.
+        """
+        x = frames if isinstance(frames, np.ndarray) else np.asarray(frames, np.float64)
+        if x.ndim != 2 or x.shape[0] == 0 or x.shape[1] != DOF:
+            raise ValueError(f"Source frames must be [F>0, {DOF}], got {x.shape}")
+        if not np.issubdtype(x.dtype, np.floating):
+            raise ValueError(f"Source frames must be floating point, got {x.dtype}")
+        if not np.isfinite(x).all():
+            raise ValueError("Source frames must be finite")
+        h = content_hash(x)
+        with self._lock:
+            fs = self._map.get(h)
+            if fs is None:
+                if self.store is not None:
+                    fs = self.store.put(h, x, self.storage)
+                else:
+                    fs = FrameStore.encode(x, self.storage, copy=copy)
+                self._insert(h, fs)
+            else:
+                self._map.move_to_end(h)
+            return h, fs
+
+    def get(self, h: str) -> FrameStore:
+        """해시 → FrameStore. 메모리에 없으면 디스크에서 다시 연다. 없으면 KeyError."""
+        with self._lock:
+            fs = self._map.get(h)
+            if fs is None and self.store is not None:
+                try:
+                    fs = self.store.open(h)
+                except ValueError:  # 해시 형식이 아님
+                    raise KeyError(h)
+                self._insert(h, fs)
+            elif fs is not None:
+                self._map.move_to_end(h)
+            if fs is None:
+                raise KeyError(h)
+            return fs
+
+    def set_live(self, hashes: Iterable[Optional[str]]) -> None:
+        """현재 공개된 프로젝트가 참조하는 해시 (버리지 않는다). 바뀔 때마다 호출."""
+        with self._lock:
+            self._live = {h for h in hashes if h is not None}
+            self._evict()
+
+    def _insert(self, h: str, fs: FrameStore) -> None:
+        self._map[h] = fs
+        self._nbytes += fs.nbytes
+        # 방금 올라온 항목은 곧 프로젝트가 참조할 것이므로 이번에는 버리지 않는다
+        self._evict(keep=h)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        if self.max_bytes <= 0:
+            return
+        while self._nbytes > self.max_bytes:
+            victim = next(
+                (k for k in self._map if k not in self._live and k != keep), None
+            )
+            if victim is None:
+                return  # 남은 것은 모두 사용 중
+            self._nbytes -= self._map.pop(victim).nbytes
+            self.evictions += 1
+
+    def __contains__(self, h: str) -> bool:
+        try:
+            self.get(h)
+        except KeyError:
+            return False
+        return True
+
+    def info(self, h: str) -> Dict[str, object]:
+        fs = self.get(h)
+        return {
+            "hash": h,
+            "frames": len(fs),
+            "dof": fs.shape[1],
+            "storage": fs.storage,
+            "nbytes": fs.nbytes,
+        }
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "sources": len(self._map),
+                "nbytes": self._nbytes,
+                "max_bytes": self.max_bytes,
+                "live": len(self._live),
+                "evictions": self.evictions,
+                "storage": self.storage,
+                "on_disk": self.store is not None,
+            }
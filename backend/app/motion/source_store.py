@@ -0,0 +1,127 @@
+# app/motion/source_store.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List
+import os
+import re
+import tempfile
+import threading
+
+import numpy as np
+
+from .frames import FrameStore, FrameStorage
+
+_KEY_RE = re.compile(r"^[A-Za-z0-9_.\-]+$")
+
+
+class SourceStore:
+    """
+    디스크 기반 소스 프레임 저장소 (root 디렉터리 하나).
+
+    - <key>.npy        : 저장 형식(float64/float32/int16) 그대로의 [F, DOF] 배열
+    - <key>.affine.npy : int16일 때만, [2, DOF] = (scale, offset)
+
+    open()은 np.load(mmap_mode="r")로 열어 실제로 읽힌 페이지만 메모리에 올라온다.
+    같은 key는 프로세스 안에서 한 번만 열고 공유하므로, 여러 프로젝트가 같은 소스를
+    써도 메모리가 중복되지 않는다. 파일은 재시작 후에도 남는다.
+    """
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._open: Dict[str, FrameStore] = {}
+        self._lock = threading.Lock()
+
+    # ---------- paths ----------
+    def _paths(self, key: str):
+        if not _KEY_RE.match(key):
+            raise ValueError(f"Invalid source key: {key!r}")
+        return self.root / f"{key}.npy", self.root / f"{key}.affine.npy"
+
+    def __contains__(self, key: str) -> bool:
+        return self._paths(key)[0].exists()
+
+    def keys(self) -> List[str]:
+        return sorted(
+            p.name[: -len(".npy")]
+            for p in self.root.glob("*.npy")
+            if not p.name.endswith(".affine.npy")
+        )
+
+    # ---------- read / write ----------
+    def open(self, key: str) -> FrameStore:
+        """key의 프레임을 memmap으로 연다. 없으면 KeyError."""
+        with self._lock:
+            fs = self._open.get(key)
+            if fs is not None:
+                return fs
+            data_path, affine_path = self._paths(key)
+            if not data_path.exists():
+                raise KeyError(key)
+            data = np.load(data_path, mmap_mode="r")
+            scale = offset = None
+            if affine_path.exists():
+                scale, offset = np.load(affine_path)
+            fs = FrameStore(data, scale, offset)
+            self._open[key] = fs
+            return fs
+
+    def put(self, key: str, frames, storage: FrameStorage = "float64") -> FrameStore:
+        """
+        frames [F, DOF]를 storage 형식으로 key에 저장하고 memmap으로 다시 연다.
+        같은 내용이 이미 저장돼 있으면 쓰지 않고 기존 것을 돌려준다.
+        """
+        enc = FrameStore.encode(frames, storage)
+        try:
+            cur = self.open(key)
+        except KeyError:
+            cur = None
+        if cur is not None and _same(cur, enc):
+            return cur
+
+        data_path, affine_path = self._paths(key)
+        with self._lock:
+            _atomic_save(data_path, enc.data)
+            if enc.scale is not None:
+                _atomic_save(affine_path, np.stack([enc.scale, enc.offset]))
+            elif affine_path.exists():
+                affine_path.unlink()
+            # 이전 memmap은 참조 중인 프로젝트가 끝날 때까지 유효 (파일 교체는 rename)
+            self._open.pop(key, None)
+        return self.open(key)
+
+    def delete(self, key: str) -> None:
+        data_path, affine_path = self._paths(key)
+        with self._lock:
+            self._open.pop(key, None)
+            for p in (data_path, affine_path):
+                if p.exists():
+                    p.unlink()
+
+    def nbytes_on_disk(self) -> int:
+        return sum(p.stat().st_size for p in self.root.glob("*.npy"))
+
+
+def _same(a: FrameStore, b: FrameStore) -> bool:
+    if a.data.dtype != b.data.dtype or a.data.shape != b.data.shape:
+        return False
+    if (a.scale is None) != (b.scale is None):
+        return False
+    if a.scale is not None and not (
+        np.array_equal(a.scale, b.scale) and np.array_equal(a.offset, b.offset)
+    ):
+        return False
+    return bool(np.array_equal(a.data, b.data))
+
+
+def _atomic_save(path: Path, arr: np.ndarray) -> None:
+    """임시 파일에 쓰고 rename → 읽는 쪽은 항상 완전한 파일만 본다."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(arr))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
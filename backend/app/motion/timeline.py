@@ -0,0 +1,306 @@
+# app/motion/timeline.py
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .types import Project as RTProject, Clip as RTClip
+from .clip_index import ClipIndex
+from .bridge_cache import BridgeKey
+from .frames import FrameStore
+
+MODE_OVERRIDE = 0
+MODE_CROSSFADE = 1
+MODE_ADDITIVE = 2
+_MODE_CODE = {
+    "override": MODE_OVERRIDE,
+    "crossfade": MODE_CROSSFADE,
+    "additive": MODE_ADDITIVE,
+}
+
+
+# 브릿지 경계 상태 probe(gap 경계 ± min(dt, 8ms), 반올림) 여유
+_PROBE_MARGIN_MS = 9.0
+
+
+def _frozen(a: np.ndarray) -> np.ndarray:
+    a.flags.writeable = False
+    return a
+
+
+def _csr(
+    seg_ids: np.ndarray, items: np.ndarray, n_seg: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """세그먼트 순으로 정렬된 (seg_ids, items) → (ptr[S+1], flat) CSR 표현."""
+    ptr = np.zeros((n_seg + 1,), dtype=np.int64)
+    ptr[1:] = np.cumsum(np.bincount(seg_ids, minlength=n_seg))
+    return _frozen(ptr), _frozen(items.astype(np.int64))
+
+
+def merge_ranges(
+    ranges: Iterable[Tuple[float, float]],
+) -> List[Tuple[float, float]]:
+    """[lo, hi] 구간들을 정렬·병합 (겹치거나 맞닿으면 하나로)."""
+    out: List[Tuple[float, float]] = []
+    for lo, hi in sorted(ranges):
+        if out and lo <= out[-1][1]:
+            out[-1] = (out[-1][0], max(out[-1][1], hi))
+        else:
+            out.append((lo, hi))
+    return out
+
+
+@dataclass(frozen=True)
+class CompiledTimeline:
+    """
+    set_project 시점에 한 번 컴파일되는 불변 타임라인 (struct-of-arrays).
+
+    클립 테이블 (클립 번호 = t0 정렬 순서, 소스가 없는 클립은 제외):
+      clip_in/clip_out   : 소스 길이로 clamp된 in/out 프레임
+      clip_cover_ms      : 커버 구간 길이 (t0 .. t0+cover, 양끝 포함)
+      clip_ramp_ms       : 램프 계산용 길이 (마지막 프레임 시각까지)
+      clip_tail          : 마지막 프레임 시각 (= 브릿지 시작 시각, 정수 ms)
+
+    세그먼트 테이블 (seg 0 = (-inf, bounds[0]), seg i+1 = [bounds[i], bounds[i+1]),
+    마지막 = [bounds[-1], +inf)):
+      override  : weight > 0인 override 참여자, priority 내림차순 (동률은 클립 번호 순)
+      crossfade : weight > 0인 crossfade 참여자
+      additive  : weight > 0인 additive 참여자
+      seg_prev/seg_next : 아무 클립도 커버하지 않을 때의 브릿지 이웃 (없으면 -1)
+
+    bridge_keys만 예외적으로 평가 중 채워지는 메모이며, 나머지는 모두 읽기 전용이다.
+    clip_pos는 클립 ID → 클립 번호 (apply_ops의 dirty 구간 계산용).
+    """
+
+    # sources
+    src_ids: Tuple[str, ...]
+    src_frames: Tuple[FrameStore, ...]  # [F, DOF]
+    src_dt: np.ndarray  # seconds
+    src_dt_ms: np.ndarray
+
+    # clips
+    clips: Tuple[RTClip, ...]
+    clip_src: np.ndarray
+    clip_t0: np.ndarray
+    clip_in: np.ndarray
+    clip_out: np.ndarray
+    clip_cover_ms: np.ndarray
+    clip_ramp_ms: np.ndarray
+    clip_tail: np.ndarray
+    clip_mode: np.ndarray
+    clip_weight: np.ndarray
+    clip_in_ms: np.ndarray
+    clip_out_ms: np.ndarray
+    clip_curve: Tuple[str, ...]
+
+    # segments
+    bounds: np.ndarray
+    seg_ov_ptr: np.ndarray
+    seg_ov: np.ndarray
+    seg_xf_ptr: np.ndarray
+    seg_xf: np.ndarray
+    seg_add_ptr: np.ndarray
+    seg_add: np.ndarray
+    seg_prev: np.ndarray
+    seg_next: np.ndarray
+
+    clip_pos: Dict[str, int] = field(default_factory=dict, compare=False, repr=False)
+
+    # gap 브릿지 방식 (ruckig | quintic | septic). 바꾸면 결과가 달라지므로 타임라인에 묶는다
+    bridge_mode: str = "ruckig"
+
+    # 런타임 메모: (prev, next) → 브릿지 내용 키 (경계 상태 계산은 타임라인당 1회)
+    bridge_keys: Dict[Tuple[int, int], BridgeKey] = field(
+        default_factory=dict, compare=False, repr=False
+    )
+
+    @property
+    def end_ms(self) -> float:
+        """마지막 클립 커버가 끝나는 시각 (클립이 없으면 0)."""
+        if self.clip_t0.shape[0] == 0:
+            return 0.0
+        return float(np.max(self.clip_t0 + self.clip_cover_ms))
+
+    @property
+    def n_segments(self) -> int:
+        return self.bounds.shape[0] + 1
+
+    def segment_of(self, ts: np.ndarray) -> np.ndarray:
+        """샘플별 세그먼트 번호 [N]."""
+        return np.searchsorted(self.bounds, ts, side="right")
+
+    def overrides(self, s: int) -> np.ndarray:
+        return self.seg_ov[self.seg_ov_ptr[s] : self.seg_ov_ptr[s + 1]]
+
+    def crossfades(self, s: int) -> np.ndarray:
+        return self.seg_xf[self.seg_xf_ptr[s] : self.seg_xf_ptr[s + 1]]
+
+    def additives(self, s: int) -> np.ndarray:
+        return self.seg_add[self.seg_add_ptr[s] : self.seg_add_ptr[s + 1]]
+
+    def frames_of(self, ci: int) -> FrameStore:
+        return self.src_frames[self.clip_src[ci]]
+
+    def dirty_spans(self, clip_ids: Iterable[str]) -> List[Tuple[float, float]]:
+        """
+        clip_ids 클립들이 평가 결과에 영향을 주는 구간들 [(lo, hi)] (ms, 양끝 포함, 병합 전).
+        - 클립 자신의 커버 구간
+        - gap 세그먼트(브릿지/hold) 중 이 클립이 prev/next 이웃이거나,
+          이웃 경계 상태 probe 지점(prev tail / next 시작 ± 8ms) 근처를 커버하는 것
+        """
+        cis = [self.clip_pos[c] for c in clip_ids if c in self.clip_pos]
+        if not cis:
+            return []
+        cis = np.array(cis, dtype=np.int64)
+        ext_lo = self.clip_t0[cis]
+        ext_hi = np.maximum(ext_lo + self.clip_cover_ms[cis], self.clip_tail[cis])
+        out = list(zip(ext_lo.tolist(), ext_hi.tolist()))
+
+        prev, nxt = self.seg_prev, self.seg_next
+        has_p, has_n = prev >= 0, nxt >= 0
+        gap = self._gap_mask() & (has_p | has_n)
+        hit = np.isin(prev, cis) | np.isin(nxt, cis)
+        probe_p = np.where(has_p, self.clip_tail[np.maximum(prev, 0)], np.nan)
+        probe_n = np.where(has_n, self.clip_t0[np.maximum(nxt, 0)], np.nan)
+        for lo, hi in zip(ext_lo, ext_hi):
+            for probe in (probe_p, probe_n):
+                hit |= (probe + _PROBE_MARGIN_MS >= lo) & (
+                    probe - _PROBE_MARGIN_MS <= hi
+                )
+        segs = np.flatnonzero(gap & hit)
+        seg_lo = np.concatenate([[-np.inf], self.bounds])
+        seg_hi = np.concatenate([self.bounds, [np.inf]])
+        out += list(zip(seg_lo[segs].tolist(), seg_hi[segs].tolist()))
+        return out
+
+    def _gap_mask(self) -> np.ndarray:
+        """참여 클립이 없거나 모두 weight 0이 될 수 있는 세그먼트 [S] bool."""
+        n = self.n_segments
+        seg_starts = np.concatenate([[-np.inf], self.bounds])
+        solid = np.zeros((n,), dtype=np.int64)  # weight가 0이 될 수 없는 참여 클립 수
+        for ptr, flat in (
+            (self.seg_ov_ptr, self.seg_ov),
+            (self.seg_xf_ptr, self.seg_xf),
+            (self.seg_add_ptr, self.seg_add),
+        ):
+            seg_ids = np.repeat(np.arange(n), np.diff(ptr))
+            b = seg_starts[seg_ids]
+            vanish = ((self.clip_in_ms[flat] > 0) & (b == self.clip_t0[flat])) | (
+                (self.clip_out_ms[flat] > 0) & (b >= self.clip_tail[flat])
+            )
+            solid += np.bincount(seg_ids[~vanish], minlength=n)
+        return solid == 0
+
+    def gaps(self) -> np.ndarray:
+        """
+        브릿지가 샘플될 수 있는 세그먼트들의 (prev, next) 쌍 [G, 2] (중복 제거).
+        참여 클립이 없거나, 참여 클립이 모두 램프로 weight 0이 될 수 있는
+        세그먼트(fade-in 시작점 / fade-out 마지막 프레임 이후)가 대상이다.
+        """
+        cand = self._gap_mask() & (self.seg_prev >= 0) & (self.seg_next >= 0)
+        pairs = np.stack([self.seg_prev[cand], self.seg_next[cand]], axis=1)
+        return np.unique(pairs, axis=0)
+
+
+def compile_timeline(
+    p: RTProject, src_frames: Dict[str, FrameStore], bridge_mode: str = "ruckig"
+) -> CompiledTimeline:
+    """
+    Runtime Project → CompiledTimeline.
+    src_frames: 소스 ID → [F, DOF] 프레임 저장소 (Source의 것을 그대로 공유)
+    """
+    src_ids = tuple(sid for sid in p.sources if sid in src_frames)
+    src_pos = {sid: i for i, sid in enumerate(src_ids)}
+    src_dt = np.array([float(p.sources[sid].dt) for sid in src_ids], dtype=np.float64)
+    src_dt_ms = src_dt * 1000.0
+
+    clips = tuple(
+        sorted((c for c in p.clips if c.sourceId in src_pos), key=lambda c: c.t0)
+    )
+    n = len(clips)
+    clip_src = np.array([src_pos[c.sourceId] for c in clips], dtype=np.int64)
+    n_frames = np.array(
+        [src_frames[c.sourceId].shape[0] for c in clips], dtype=np.int64
+    )
+    dt_ms = src_dt_ms[clip_src] if n else np.empty((0,), dtype=np.float64)
+    clip_t0 = np.array([c.t0 for c in clips], dtype=np.float64)
+    clip_in = np.clip(
+        np.array([c.inFrame for c in clips], dtype=np.int64), 0, n_frames - 1
+    )
+    clip_out = np.clip(
+        np.array([c.outFrame for c in clips], dtype=np.int64), 1, n_frames
+    )
+    clip_cover_ms = (clip_out - clip_in) * dt_ms
+    single = clip_out <= clip_in + 1
+    clip_ramp_ms = np.where(single, 0.0, (clip_out - clip_in - 1) * dt_ms)
+    clip_tail = (clip_t0 + clip_ramp_ms).astype(np.int64)  # int() 절사와 동일
+    clip_mode = np.array(
+        [_MODE_CODE.get(c.blend.mode, MODE_OVERRIDE) for c in clips], dtype=np.int8
+    )
+    clip_weight = np.array([float(c.blend.weight) for c in clips], dtype=np.float64)
+    clip_prio = np.array([int(c.blend.priority) for c in clips], dtype=np.int64)
+
+    # 세그먼트: 커버 경계 + 이웃이 바뀌는 지점(시작 직후, tail)에서 자른다
+    index = ClipIndex(
+        clip_t0,
+        clip_t0 + clip_cover_ms,
+        clip_tail.astype(np.float64),
+        cuts=np.concatenate([np.nextafter(clip_t0, np.inf), clip_tail]),
+    )
+    bounds = index.bounds
+    n_seg = bounds.shape[0] + 1
+
+    # 인덱스 구간 i → 타임라인 세그먼트 i+1 (0은 첫 경계 이전)
+    e_seg = index.entry_seg + 1
+    e_clip = index.entry_clip
+    live = clip_weight[e_clip] > 1e-12
+    mode = clip_mode[e_clip]
+
+    # override: (세그먼트, priority 내림차순, 클립 번호) 순
+    m = live & (mode == MODE_OVERRIDE)
+    ov_seg, ov_clip = e_seg[m], e_clip[m]
+    order = np.lexsort((ov_clip, -clip_prio[ov_clip], ov_seg))
+    seg_ov_ptr, seg_ov = _csr(ov_seg[order], ov_clip[order], n_seg)
+    m = live & (mode == MODE_CROSSFADE)
+    seg_xf_ptr, seg_xf = _csr(e_seg[m], e_clip[m], n_seg)
+    m = live & (mode == MODE_ADDITIVE)
+    seg_add_ptr, seg_add = _csr(e_seg[m], e_clip[m], n_seg)
+
+    seg_starts = np.concatenate([[-np.inf], bounds])
+    seg_prev, seg_next = index.neighbors(seg_starts)
+
+    return CompiledTimeline(
+        src_ids=src_ids,
+        src_frames=tuple(src_frames[sid] for sid in src_ids),
+        src_dt=_frozen(src_dt),
+        src_dt_ms=_frozen(src_dt_ms),
+        clips=clips,
+        clip_src=_frozen(clip_src),
+        clip_t0=_frozen(clip_t0),
+        clip_in=_frozen(clip_in),
+        clip_out=_frozen(clip_out),
+        clip_cover_ms=_frozen(clip_cover_ms),
+        clip_ramp_ms=_frozen(clip_ramp_ms),
+        clip_tail=_frozen(clip_tail),
+        clip_mode=_frozen(clip_mode),
+        clip_weight=_frozen(clip_weight),
+        clip_in_ms=_frozen(
+            np.array([int(c.blend.inMs) for c in clips], dtype=np.int64)
+        ),
+        clip_out_ms=_frozen(
+            np.array([int(c.blend.outMs) for c in clips], dtype=np.int64)
+        ),
+        clip_curve=tuple(c.blend.curve for c in clips),
+        bounds=_frozen(bounds),
+        seg_ov_ptr=seg_ov_ptr,
+        seg_ov=seg_ov,
+        seg_xf_ptr=seg_xf_ptr,
+        seg_xf=seg_xf,
+        seg_add_ptr=seg_add_ptr,
+        seg_add=seg_add,
+        seg_prev=_frozen(seg_prev.astype(np.int64)),
+        seg_next=_frozen(seg_next.astype(np.int64)),
+        clip_pos={c.id: i for i, c in enumerate(clips)},
+        bridge_mode=bridge_mode,
+    )
@@ -3,6 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import Dict, List, Literal, Optional
 
+from .frames import FrameStore
+
 DOF = 24
 BlendMode = Literal["override", "crossfade", "additive"]
 BlendCurve = Literal["linear", "smoothstep", "easeInOut"]
@@ -12,8 +14,9 @@ BlendCurve = Literal["linear", "smoothstep", "easeInOut"]
 class Source:
     id: str
     dt: float  # seconds per frame (uniform)
-    frames: List[List[float]]  # shape [F][24]
+    frames: FrameStore  # [F, 24] 압축 저장 (리스트 사본 없음)
     name: Optional[str] = None
+    hash: Optional[str] = None  # 소스 레지스트리 내용 해시
 
 
 @dataclass(frozen=True)
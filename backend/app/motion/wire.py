@@ -0,0 +1,86 @@
+# app/motion/wire.py
+from __future__ import annotations
+from typing import Dict, List
+import struct
+
+import numpy as np
+
+from .types import DOF
+
+# /ws/motion 바이너리 프레임 (연결 시 ?binary=1 로 opt-in)
+# 헤더 40 bytes, little-endian:
+#   magic "MWS1" | kind u8 | itemsize u8 | dof u16 | version u32 | req u32 | count u32
+#   | joint_mask u32 | t0_ms f64 | step_ms f64
+# 본문: [count, popcount(joint_mask)] 행 우선 float32 (헤더가 8의 배수라 Float32Array로 바로 view)
+WIRE_MAGIC = b"MWS1"
+WIRE_HEADER = struct.Struct("<4sBBHIIIIdd")
+
+KIND_POSE = 1
+KIND_PREFETCH = 2
+
+FULL_JOINT_MASK = (1 << DOF) - 1
+assert DOF <= 32, "joint_mask는 u32"
+
+
+def mask_columns(joint_mask: int) -> List[int]:
+    """joint_mask 비트 → 관절 인덱스 (오름차순)."""
+    return [i for i in range(DOF) if joint_mask >> i & 1]
+
+
+def wire_req(req) -> int:
+    """헤더에 실을 요청 id (u32). 정수가 아니거나 범위를 벗어나면 0 (= 없음)."""
+    if isinstance(req, int) and not isinstance(req, bool) and 0 <= req < 1 << 32:
+        return req
+    return 0
+
+
+def pack_frame(
+    kind: int,
+    q: np.ndarray,
+    version: int,
+    t0_ms: float,
+    step_ms: float = 0.0,
+    req=None,
+    joint_mask: int = FULL_JOINT_MASK,
+) -> bytes:
+    """q [N, DOF] (또는 [DOF]) → 헤더 + float32 본문. joint_mask 밖의 관절은 보내지 않는다."""
+    q = np.atleast_2d(q)
+    if joint_mask != FULL_JOINT_MASK:
+        q = q[:, mask_columns(joint_mask)]
+    body = np.ascontiguousarray(q, dtype="<f4")
+    head = WIRE_HEADER.pack(
+        WIRE_MAGIC,
+        kind,
+        body.itemsize,
+        DOF,
+        version & 0xFFFFFFFF,
+        wire_req(req),
+        body.shape[0],
+        joint_mask,
+        float(t0_ms),
+        float(step_ms),
+    )
+    return head + body.tobytes()
+
+
+def read_frame(buf) -> Dict[str, object]:
+    """pack_frame 결과 → 헤더 필드 + "q" [count, popcount(mask)] (buf 위 view)."""
+    magic, kind, itemsize, dof, version, req, count, joint_mask, t0_ms, step_ms = (
+        WIRE_HEADER.unpack_from(buf, 0)
+    )
+    if magic != WIRE_MAGIC:
+        raise ValueError("Not a motion wire frame")
+    if itemsize != 4:
+        raise ValueError(f"Unsupported itemsize: {itemsize}")
+    cols = bin(joint_mask).count("1")
+    q = np.frombuffer(buf, dtype="<f4", count=count * cols, offset=WIRE_HEADER.size)
+    return {
+        "kind": kind,
+        "dof": dof,
+        "version": version,
+        "req": req,
+        "joint_mask": joint_mask,
+        "t0_ms": t0_ms,
+        "step_ms": step_ms,
+        "q": q.reshape(count, cols),
+    }
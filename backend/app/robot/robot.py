@@ -19,8 +19,8 @@ class RobotManager:
     TORSO_5_LINK_IDX = 1
 
     # Timeline evaluators
-    # eval_range(t0_ms, t1_ms, step_ms) -> List[np.ndarray] (full q for each sample)
-    EvalRangeFn = Callable[[float, float, float], List[np.ndarray]]
+    # eval_range(t0_ms, t1_ms, step_ms) -> np.ndarray [N, DOF] (full q for each sample)
+    EvalRangeFn = Callable[[float, float, float], np.ndarray]
     # eval_at is optional (not used in start, but available if you want in loop)
     EvalAtFn = Callable[[float], np.ndarray]
 
@@ -526,22 +526,30 @@ class RobotManager:
             return False, "No eval_range() is set"
         return True, ""
 
-    def start_play(self, *, t0_ms: float = 0.0) -> bool:
+    def start_play(self, *, t0_ms: float = 0.0, snap_to_period: bool = False) -> bool:
         """
         Start playback:
         1) Query start pose via eval_range(t0,t0,step) and pre-roll to it in 2.0s
         2) Spawn loop that tracks the playhead and sends commands every master_arm_loop_period
+        snap_to_period: round t0 to the control-period grid (only useful with a bake)
         """
         ok, reason = self.can_play()
         if not ok:
             return False
 
+        # With a bake, snap the playhead to the control-period grid so every tick
+        # lands on a baked sample (O(1) index read instead of a full evaluation).
+        # Without one, keep the requested start exactly.
+        if snap_to_period:
+            period_ms = float(Settings.master_arm_loop_period) * 1000.0
+            t0_ms = round(float(t0_ms) / period_ms) * period_ms
+
         try:
             # Fetch the exact starting pose using eval_range
             samples = self._eval_range(
                 float(t0_ms), float(t0_ms), 1.0
             )  # step doesn't matter for single sample
-            if not samples:
+            if len(samples) == 0:
                 return False
             q_start = np.asarray(samples[0], dtype=float)
 
@@ -612,6 +620,8 @@ class RobotManager:
         - Period = Settings.master_arm_loop_period (seconds)
         - Prefer eval_at(t_ms) for single-shot sampling if provided;
           else sample a short horizon via eval_range and consume the first.
+        - With a bake, start_play snaps t0 to the period grid, so ticks stay
+          on it and the baked trajectory serves each tick by index.
         """
         period_s = float(Settings.master_arm_loop_period)
         period_ms = period_s * 1000.0
@@ -634,7 +644,7 @@ class RobotManager:
                         q = self._eval_at(float(t_ms))
                     else:
                         block = self._eval_range(float(t_ms), float(t_ms), period_ms)
-                        if block:
+                        if len(block):
                             q = np.asarray(block[0], dtype=float)
                 except Exception:
                     q = None
@@ -1,11 +1,50 @@
 # app/routers/motion.py
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import (
+    APIRouter,
+    WebSocket,
+    WebSocketDisconnect,
+    HTTPException,
+    UploadFile,
+    File,
+    Form,
+)
 from fastapi.responses import StreamingResponse
-from typing import Set
+import asyncio
+import logging
+from dataclasses import dataclass
+import json
+import math
+from typing import List, Literal, Optional, Set, Tuple, Union
 from app.state import State
-from app.models import SetProjectMsg, SeekMsg, PrefetchMsg
-from app.motion.types import DOF
-from pydantic import BaseModel
+from app.models import (
+    Project,
+    SetProjectMsg,
+    ApplyOpsMsg,
+    SeekMsg,
+    PrefetchMsg,
+    EnvelopeMsg,
+    SourceUploadReq,
+    SourceUploadHeader,
+)
+from app.motion.source_io import frames_from_buffer
+from app.motion.export import (
+    iter_csv,
+    iter_csv_kinematics,
+    iter_npy,
+    iter_npz,
+    iter_raw,
+)
+from app.motion.wire import (
+    FULL_JOINT_MASK,
+    KIND_POSE,
+    KIND_PREFETCH,
+    mask_columns,
+    pack_frame,
+)
+from app.config import settings
+from app.services.eval_pool import EvalPool
+from app.services.project_compiler import ProjectCompiler
+from pydantic import BaseModel, ValidationError
 
 router = APIRouter()
 
@@ -13,75 +52,443 @@ router = APIRouter()
 class ConnectionManager:
     def __init__(self):
         self.active: Set[WebSocket] = set()
+        # pose / prefetch를 바이너리 프레임(app.motion.wire)으로 받는 연결
+        self.binary: Set[WebSocket] = set()
 
-    async def connect(self, ws: WebSocket):
+    async def connect(self, ws: WebSocket, binary: bool = False):
         await ws.accept()
         self.active.add(ws)
+        if binary:
+            self.binary.add(ws)
 
     def disconnect(self, ws: WebSocket):
         self.active.discard(ws)
+        self.binary.discard(ws)
 
     async def send_json(self, ws: WebSocket, data):
         await ws.send_json(data)
 
     async def broadcast_json(self, data):
+        await self.broadcast_text(_dumps(data))
+
+    async def broadcast_text(self, text: str):
         dead = []
         for ws in list(self.active):
             try:
-                await ws.send_json(data)
+                await ws.send_text(text)
             except Exception:
                 dead.append(ws)
         for ws in dead:
             self.disconnect(ws)
 
+    async def broadcast_pose(self, pose: Tuple[str, bytes]):
+        """(JSON 텍스트, 바이너리 프레임) → 연결마다 받기로 한 형식으로."""
+        text, frame = pose
+        dead = []
+        for ws in list(self.active):
+            try:
+                if ws in self.binary:
+                    await ws.send_bytes(frame)
+                else:
+                    await ws.send_text(text)
+            except Exception:
+                dead.append(ws)
+        for ws in dead:
+            self.disconnect(ws)
+
+
+def _dumps(data) -> str:
+    # WebSocket.send_json과 같은 직렬화
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
 
 Mgr = ConnectionManager()
 
+# 평가 전용 bounded 풀 (이벤트 루프는 I/O만)
+Pool = EvalPool(settings.motion_eval_workers, settings.motion_eval_per_connection)
+
+
+async def _send_quiet(ws: WebSocket, data) -> None:
+    """보낸 사이 연결이 끊겼을 수 있는 곳에서 쓴다."""
+    try:
+        await Mgr.send_json(ws, data)
+    except Exception:
+        Mgr.disconnect(ws)
+
+
+@dataclass(eq=False)
+class ProjectJson:
+    """POST /api/project 본문. 검증도 컴파일 워커에서 하고, 검증된 모델은 project에 남긴다."""
+
+    body: bytes
+    project: Optional[Project] = None
+
+
+def _compile_project(raw: Union[dict, ProjectJson]):
+    """워커 스레드에서 실행: 검증 + 변환 + 컴파일 → (version, dirty)."""
+    if isinstance(raw, ProjectJson):
+        raw.project = Project.model_validate_json(raw.body)
+        return State.set_project(raw.project)
+    return State.set_project(SetProjectMsg(**raw).project)
+
+
+async def _project_compiled(waiters: List[WebSocket], version: int, dirty) -> None:
+    dirty_json = _ranges_json(dirty)
+    # 1) 이 버전에 흡수된 요청을 보낸 쪽 모두에게 ACK, 2) 모두에게 version + 바뀐 구간 알림
+    for ws in waiters:
+        await _send_quiet(
+            ws, {"type": "ack", "ok": True, "version": version, "dirty": dirty_json}
+        )
+    await Mgr.broadcast_json(
+        {"type": "project_updated", "version": version, "dirty": dirty_json}
+    )
+
+
+async def _project_failed(waiters: List[WebSocket], e: Exception) -> None:
+    # 예: 아직 업로드되지 않은 source hash
+    for ws in waiters:
+        await _send_quiet(ws, {"type": "ack", "ok": False, "error": str(e)})
+
+
+# 드래그 중 쏟아지는 set_project는 최신 것만 백그라운드에서 컴파일한다 (POST /api/project도 경유)
+Compiler = ProjectCompiler(
+    _compile_project,
+    _project_compiled,
+    _project_failed,
+    errors=(ValidationError, ValueError, KeyError),
+)
+
+
+def _ranges_json(ranges: List[Tuple[float, float]]) -> List[List[Optional[float]]]:
+    """±inf는 JSON에 없으므로 null (= 열린 끝)로."""
+    return [
+        [lo if math.isfinite(lo) else None, hi if math.isfinite(hi) else None]
+        for lo, hi in ranges
+    ]
+
+
+def _buckets_json(a, valid) -> List[Optional[List[float]]]:
+    """[P, DOF] → 픽셀별 리스트 (데이터가 없는 픽셀은 null)."""
+    return [row if ok else None for row, ok in zip(a.tolist(), valid.tolist())]
+
+
+# ----- 평가 응답 (풀 스레드에서 평가 + 직렬화까지 끝내고 텍스트만 돌려준다) -----
+# 연결별 스케줄 우선순위 (작을수록 먼저). seek는 실시간 미리보기라 항상 먼저
+_PRIO_SEEK = 0
+_PRIO_ENVELOPE = 1
+_PRIO_PREFETCH = 2
+
+
+def _with_req(reply: dict, req) -> dict:
+    # 클라이언트가 보낸 요청 id는 응답에 그대로 돌려준다 (없으면 필드 생략)
+    if req is not None:
+        reply["req"] = req
+    return reply
+
+
+async def _send_invalid(ws: WebSocket, raw: dict, e: Exception) -> None:
+    # 형식이 잘못된 seek / prefetch / envelope → 연결은 유지하고 그 요청만 에러로 응답
+    req = raw.get("req")
+    reply = {"type": "error", "request": raw.get("type"), "error": str(e)}
+    await _send_quiet(
+        ws, _with_req(reply, req if isinstance(req, (int, str)) else None)
+    )
+
+
+def _seek_reply(msg: SeekMsg) -> Tuple[str, bytes]:
+    # broadcast라 연결마다 형식이 다르다 → 두 형식을 다 만든다 (pose 하나라 싸다)
+    snap = State.snapshot()
+    q = State.scrub_at(msg.t_ms, snap)
+    text = _dumps(
+        _with_req(
+            {
+                "type": "pose",
+                "t_ms": msg.t_ms,
+                "version": snap.version,
+                "q": q.tolist(),
+            },
+            msg.req,
+        )
+    )
+    frame = pack_frame(KIND_POSE, q, snap.version, msg.t_ms, req=msg.req)
+    return text, frame
+
+
+def _prefetch_reply(msg: PrefetchMsg, binary: bool = False) -> Union[str, bytes]:
+    t0 = int(msg.center_ms - msg.window_ms // 2)
+    t1 = int(msg.center_ms + msg.window_ms // 2)
+    snap = State.snapshot()
+    poses = State.scrub_range(t0, t1, msg.step_ms, snap)
+    if binary:
+        return pack_frame(
+            KIND_PREFETCH,
+            poses,
+            snap.version,
+            t0,
+            msg.step_ms,
+            req=msg.req,
+            joint_mask=msg.joint_mask,
+        )
+    reply = {
+        "type": "prefetch_result",
+        "version": snap.version,
+        "t0_ms": t0,
+        "step_ms": msg.step_ms,
+        "count": len(poses),
+    }
+    if msg.joint_mask != FULL_JOINT_MASK:
+        poses = poses[:, mask_columns(msg.joint_mask)]
+        reply["joint_mask"] = msg.joint_mask
+    reply["poses"] = poses.tolist()
+    return _dumps(_with_req(reply, msg.req))
+
+
+def _envelope_reply(msg: EnvelopeMsg) -> str:
+    reply = {
+        "type": "envelope_result",
+        "t0_ms": msg.t0_ms,
+        "t1_ms": msg.t1_ms,
+        "pixels": msg.pixels,
+        "sourceId": msg.sourceId,
+    }
+    _with_req(reply, msg.req)
+    try:
+        env = State.envelope(msg.t0_ms, msg.t1_ms, msg.pixels, msg.sourceId)
+    except KeyError:
+        env, reply["error"] = None, f"Unknown source: {msg.sourceId}"
+    if env is None:
+        reply.setdefault("error", "Trajectory envelope requires bake mode")
+    else:
+        mn, mx, mean, valid = env
+        reply["min"] = _buckets_json(mn, valid)
+        reply["max"] = _buckets_json(mx, valid)
+        reply["mean"] = _buckets_json(mean, valid)
+    return _dumps(reply)
+
 
 @router.websocket("/ws/motion")
 async def motion_ws(ws: WebSocket):
-    await Mgr.connect(ws)
+    # ?binary=1 → pose / prefetch_result를 float32 바이너리 프레임으로 받는다
+    binary = ws.query_params.get("binary", "").lower() in ("1", "true")
+    await Mgr.connect(ws, binary=binary)
+    # 이 연결의 평가 스케줄러 (우선순위 / 동시 실행 제한, 연결이 끊기면 일괄 취소)
+    session = Pool.session()
+
+    async def reply(out: Union[str, bytes]):
+        if isinstance(out, bytes):
+            await ws.send_bytes(out)
+        else:
+            await ws.send_text(out)
+
+    def superseded(msg):
+        # 대기 중에 같은 종류의 새 요청에 밀려 버려진 요청 (id가 있을 때만 알린다)
+        if msg.req is None:
+            return None
+
+        async def notify():
+            await _send_quiet(
+                ws, {"type": "cancelled", "req": msg.req, "request": msg.type}
+            )
+
+        return notify
+
     try:
         while True:
             raw = await ws.receive_json()
             t = raw.get("type")
             if t == "set_project":
-                msg = SetProjectMsg(**raw)
-                State.set_project(msg.project)
+                # 슬롯에 넣고 바로 다음 메시지로 (ACK / 알림은 컴파일 후 워커가 보낸다)
+                Compiler.submit(raw, ws)
 
-                # 1) 보낸 사람에게 ACK
-                await Mgr.send_json(ws, {"type": "ack", "ok": True})
+            elif t == "apply_ops":
+                # 먼저 보낸 set_project가 나중에 덮어쓰지 않도록 대기 중인 컴파일을 끝낸다
+                await Compiler.wait_idle()
+                try:
+                    msg = ApplyOpsMsg(**raw)
+                    version, dirty = await asyncio.to_thread(State.apply_ops, msg.ops)
+                except (ValidationError, ValueError) as e:
+                    await Mgr.send_json(
+                        ws, {"type": "ack", "ok": False, "error": str(e)}
+                    )
+                    continue
+                except Exception:
+                    # 예기치 못한 실패 (디스크 저장 OSError, update_project 버그 등)도
+                    # 연결은 유지하고 이 요청만 실패로 응답한다
+                    logging.exception("apply_ops failed")
+                    await Mgr.send_json(
+                        ws,
+                        {
+                            "type": "ack",
+                            "ok": False,
+                            "error": "Internal error while applying ops",
+                        },
+                    )
+                    continue
 
-                # 2) (선택) 다른 모두에게 프로젝트 변경 알림
-                await Mgr.broadcast_json({"type": "project_updated"})
-                # 필요하면 version/summary도 같이 보냄
-
-            elif t == "seek":
-                msg = SeekMsg(**raw)
-                q = State.eval_at(msg.t_ms)
-                await Mgr.broadcast_json(
-                    {"type": "pose", "t_ms": msg.t_ms, "q": q}
-                )  # TODO: broadcast로 보내도 되는걸까
-
-            elif t == "prefetch":
-                msg = PrefetchMsg(**raw)
-                t0 = int(msg.center_ms - msg.window_ms // 2)
-                t1 = int(msg.center_ms + msg.window_ms // 2)
-                poses = State.eval_range(t0, t1, msg.step_ms)
+                dirty_json = _ranges_json(dirty)
                 await Mgr.send_json(
                     ws,
                     {
-                        "type": "prefetch_result",
-                        "t0_ms": t0,
-                        "step_ms": msg.step_ms,
-                        "count": len(poses),
-                        "poses": poses,
+                        "type": "ack",
+                        "ok": True,
+                        "version": version,
+                        "dirty": dirty_json,
                     },
                 )
+                await Mgr.broadcast_json(
+                    {"type": "project_updated", "version": version, "dirty": dirty_json}
+                )
+
+            elif t == "seek":
+                # 연속 seek는 가장 최근 t_ms 하나로 합친다
+                try:
+                    msg = SeekMsg(**raw)
+                except (ValidationError, ValueError) as e:
+                    await _send_invalid(ws, raw, e)
+                    continue
+                session.submit(
+                    _seek_reply,
+                    msg,
+                    reply=Mgr.broadcast_pose,  # TODO: broadcast로 보내도 되는걸까
+                    priority=_PRIO_SEEK,
+                    key="seek",
+                    dropped=superseded(msg),
+                )
+
+            elif t == "prefetch":
+                # 아직 시작 안 한 prefetch는 새 윈도우 요청이 오면 버린다
+                try:
+                    msg = PrefetchMsg(**raw)
+                except (ValidationError, ValueError) as e:
+                    await _send_invalid(ws, raw, e)
+                    continue
+                session.submit(
+                    _prefetch_reply,
+                    msg,
+                    binary,
+                    reply=reply,
+                    priority=_PRIO_PREFETCH,
+                    key="prefetch",
+                    dropped=superseded(msg),
+                )
+
+            elif t == "envelope":
+                # 소스(레인)별로 최신 요청만 남긴다
+                try:
+                    msg = EnvelopeMsg(**raw)
+                except (ValidationError, ValueError) as e:
+                    await _send_invalid(ws, raw, e)
+                    continue
+                session.submit(
+                    _envelope_reply,
+                    msg,
+                    reply=reply,
+                    priority=_PRIO_ENVELOPE,
+                    key=("envelope", msg.sourceId),
+                    dropped=superseded(msg),
+                )
     except WebSocketDisconnect:
         pass
     finally:
         Mgr.disconnect(ws)
+        await session.close()
+
+
+@router.get("/motion/bridge_cache")
+async def bridge_cache_stats():
+    return State.bridge_cache_stats()
+
+
+class EvalStatsRequest(BaseModel):
+    enabled: bool
+    reset: bool = False
+
+
+@router.get("/motion/stats")
+async def eval_stats():
+    """evaluator 단계별 지연 히스토그램 (가장 느린 호출의 위치 포함) + 브릿지 카운터."""
+    out = State.eval_stats()
+    out["project_compiler"] = Compiler.stats()
+    out["eval_pool"] = Pool.stats()
+    return out
+
+
+@router.post("/motion/stats")
+async def set_eval_stats(req: EvalStatsRequest):
+    return State.set_eval_stats(req.enabled, req.reset)
+
+
+class BridgeModeRequest(BaseModel):
+    mode: str
+
+
+@router.get("/motion/bridge_mode")
+async def bridge_mode():
+    return {"mode": State.bridge_mode()}
+
+
+@router.post("/motion/bridge_mode")
+async def set_bridge_mode(req: BridgeModeRequest):
+    """ruckig | quintic | septic. 다항식 브릿지가 limit을 넘는 gap은 Ruckig로 대체된다."""
+    try:
+        return {"mode": State.set_bridge_mode(req.mode)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/motion/sources")
+async def upload_source(req: SourceUploadReq):
+    """프레임 업로드 → 내용 해시. Project의 Source는 이후 frames 대신 hash로 참조한다."""
+    try:
+        return State.register_source(req.frames)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/motion/sources/binary")
+async def upload_source_binary(file: UploadFile = File(...), header: str = Form("{}")):
+    """
+    바이너리 업로드: raw little-endian f32/f64 또는 .npy/.npz + JSON header(id, dt, name, dtype).
+    프레임별 Pydantic 검증 없이 모양만 한 번 확인하고 버퍼를 그대로 레지스트리에 넘긴다.
+    header에 id/dt가 있으면 Project에 바로 넣을 수 있는 source 항목도 돌려준다.
+    """
+    try:
+        hdr = SourceUploadHeader.model_validate_json(header)
+        frames = frames_from_buffer(await file.read(), hdr.dtype)
+        info = State.register_source(frames, copy=False)
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if hdr.id is not None and hdr.dt is not None:
+        info["source"] = {
+            "id": hdr.id,
+            "dt": hdr.dt,
+            "name": hdr.name,
+            "hash": info["hash"],
+        }
+    return info
+
+
+@router.get("/motion/sources/{source_hash}")
+async def source_info(source_hash: str):
+    try:
+        return State.source_info(source_hash)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown source hash")
+
+
+class BakeRequest(BaseModel):
+    enabled: bool
+
+
+@router.get("/motion/bake")
+async def bake_info():
+    return State.bake_info()
+
+
+@router.post("/motion/bake")
+async def set_bake(req: BakeRequest):
+    return State.set_bake(req.enabled)
 
 
 class ExportCsvRequest(BaseModel):
@@ -89,39 +496,98 @@ class ExportCsvRequest(BaseModel):
     t1_ms: int | None = None
     step_ms: float | None = None
     include_header: bool = True
+    # True면 속도 / 가속도 열(dq*, ddq*)도 함께 (해석적 도함수, 차분 불필요)
+    derivatives: bool = False
 
 
-@router.post("/motion/export_csv")
-async def export_csv(req: ExportCsvRequest):
-    # 프로젝트 유무 확인
-    rt = State.get_rt_project()
-    if rt is None:
-        raise HTTPException(status_code=400, detail="No project set")
+class ExportBinRequest(BaseModel):
+    t0_ms: int = 0
+    t1_ms: int | None = None
+    step_ms: float | None = None
+    format: Literal["npy", "npz", "raw"] = "npy"
+    dtype: Literal["float32", "float64"] = "float32"
 
-    # 구간/간격 결정
-    t0 = max(0, int(req.t0_ms))
-    t1 = int(req.t1_ms) if req.t1_ms is not None else State.project_duration_ms()
+
+def _export_range(snap, t0_ms: int, t1_ms: Optional[int], step_ms: Optional[float]):
+    """(t0, t1, step_ms) 결정. 프로젝트가 없거나 구간이 잘못되면 400."""
+    if State.get_rt_project(snap) is None:
+        raise HTTPException(status_code=400, detail="No project set")
+    t0 = max(0, int(t0_ms))
+    t1 = int(t1_ms) if t1_ms is not None else State.project_duration_ms(snap)
     if t1 < t0:
         raise HTTPException(status_code=400, detail="Invalid time range")
-    step_ms = float(req.step_ms) if req.step_ms is not None else State.default_step_ms()
-    step_ms = max(1.0, step_ms)
+    step = float(step_ms) if step_ms is not None else State.default_step_ms(snap)
+    return t0, t1, max(1.0, step)
 
-    # 샘플 (편집/블렌드/브릿지 모두 포함한 최종 trajectory)
-    samples = State.eval_range(t0, t1, step_ms)
 
-    def _iter_csv():
-        if req.include_header:
-            head = ["time"] + [f"q{i}" for i in range(DOF)]
-            yield ",".join(head) + "\n"
+@router.post("/motion/export_csv")
+async def export_csv(req: ExportCsvRequest):
+    # 스냅샷 하나로 고정 → export 도중 편집이 들어와도 구간/간격/샘플이 같은 프로젝트 기준
+    snap = State.snapshot()
+    t0, t1, step_ms = _export_range(snap, req.t0_ms, req.t1_ms, req.step_ms)
 
-        t = float(t0)
-        for row in samples:
-            vals = [f"{t/1000.}"] + [f"{v:.9f}" for v in row]
-            yield ",".join(vals) + "\n"
-            t += step_ms
+    # 샘플 (편집/블렌드/브릿지 모두 포함한 최종 trajectory)을 chunk 단위로 평가/포맷
+    if req.derivatives:
+        rows = iter_csv_kinematics(
+            lambda ts: State.eval_kinematics_times(ts, snap),
+            t0,
+            t1,
+            step_ms,
+            include_header=req.include_header,
+            chunk_rows=settings.motion_export_chunk_rows,
+        )
+    else:
+        rows = iter_csv(
+            lambda ts: State.eval_times(ts, snap),
+            t0,
+            t1,
+            step_ms,
+            include_header=req.include_header,
+            chunk_rows=settings.motion_export_chunk_rows,
+        )
 
     return StreamingResponse(
-        _iter_csv(),
+        Pool.iterate(rows),
         media_type="text/csv",
         headers={"Content-Disposition": 'attachment; filename="trajectory.csv"'},
     )
+
+
+@router.post("/motion/export_bin")
+async def export_bin(req: ExportBinRequest):
+    """
+    최종 trajectory를 바이너리로 스트리밍 (CSV와 같은 구간/간격 규칙).
+    - npy : [N, DOF] (np.load(mmap_mode="r")로 바로 열 수 있다)
+    - npz : q, times_ms, dt, joint_names, meta (무압축)
+    - raw : 32바이트 고정 헤더 + [N, DOF] little-endian (app.motion.export.RAW_HEADER)
+    """
+    snap = State.snapshot()
+    t0, t1, step_ms = _export_range(snap, req.t0_ms, req.t1_ms, req.step_ms)
+    args = (lambda ts: State.eval_times(ts, snap), t0, t1, step_ms, req.dtype)
+    chunk_rows = settings.motion_export_chunk_rows
+
+    if req.format == "npz":
+        rt = State.get_rt_project(snap)
+        meta = {
+            "t0_ms": t0,
+            "t1_ms": t1,
+            "step_ms": step_ms,
+            "version": snap.version,
+            "lengthMs": rt.lengthMs,
+            "sources": {sid: s.hash for sid, s in rt.sources.items()},
+            "clips": len(rt.clips),
+        }
+        body = iter_npz(*args, chunk_rows=chunk_rows, meta=meta)
+        filename = "trajectory.npz"
+    elif req.format == "raw":
+        body = iter_raw(*args, chunk_rows=chunk_rows)
+        filename = f"trajectory.{'f32' if req.dtype == 'float32' else 'f64'}"
+    else:
+        body = iter_npy(*args, chunk_rows=chunk_rows)
+        filename = "trajectory.npy"
+
+    return StreamingResponse(
+        Pool.iterate(body),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
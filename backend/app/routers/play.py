@@ -2,6 +2,7 @@
 from fastapi import APIRouter, HTTPException, status, Response
 from pydantic import BaseModel
 from app.robot.robot import ROBOT
+from app.state import State
 
 router = APIRouter(prefix="/play", tags=["play"])
 
@@ -19,7 +20,9 @@ def play_start(req: PlayStartReq):
     ok, reason = ROBOT.can_play()
     if not ok:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=reason)
-    if not ROBOT.start_play(t0_ms=float(req.t0_ms)):
+    # bake가 켜져 있을 때만 시작 시각을 제어 주기 격자로 맞춘다 (tick = bake 인덱스)
+    baked = bool(State.bake_info()["enabled"])
+    if not ROBOT.start_play(t0_ms=float(req.t0_ms), snap_to_period=baked):
         raise HTTPException(status_code=500, detail="Failed to start play")
     return Response(status_code=204)
 
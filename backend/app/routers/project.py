@@ -1,18 +1,39 @@
 # app/routers/project.py
-from fastapi import APIRouter, Response, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
 from app.models import Project as APIProject
-from app.state import State
+from app.routers.motion import Compiler, ProjectJson
 
 router = APIRouter()
 
 _current: APIProject | None = None
 
 
-@router.post("/api/project", status_code=status.HTTP_204_NO_CONTENT)
-async def save_project(p: APIProject):
+@router.post(
+    "/api/project",
+    status_code=status.HTTP_204_NO_CONTENT,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": APIProject.model_json_schema()}},
+        }
+    },
+)
+async def save_project(request: Request):
+    """
+    본문(Project JSON)은 /ws/motion set_project와 같은 컴파일러 워커에서 검증 + 컴파일한다
+    (이벤트 루프에서는 바이트만 읽는다). 컴파일 전에 더 새 set_project에 밀리면
+    이 본문은 반영되지 않고 204만 돌려준다 (latest-wins).
+    """
     global _current
-    _current = p
-    State.set_project(p)
+    payload = ProjectJson(await request.body())
+    try:
+        _, _, own = await Compiler.compile(payload)
+    except (ValueError, KeyError) as e:
+        # 예: 잘못된 본문, 업로드되지 않았거나 레지스트리에서 밀려난 source hash
+        raise HTTPException(status_code=400, detail=str(e))
+    # GET은 이 API로 저장되어 실제로 반영된 프로젝트만 돌려준다
+    if own:
+        _current = payload.project
     return Response(status_code=204)
 
 
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+_END = object()
+
+
+class EvalPool:
+    """
+    evaluator 호출 전용 bounded 스레드 풀. 이벤트 루프는 I/O만 하고 평가는 여기서 돈다.
+
+    NumPy 경로는 큰 배열 연산 중 GIL을 놓으므로 스레드로 충분하다
+    (프로세스는 스냅샷 전체를 넘겨야 해서 쓰지 않는다).
+    연결마다 session()을 하나 만들어 우선순위 / 동시 실행 수 제한 / 취소에 쓴다.
+    """
+
+    def __init__(self, workers: int = 4, per_connection: int = 2):
+        self.workers = max(1, int(workers))
+        self.per_connection = max(1, int(per_connection))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="motion-eval"
+        )
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.superseded = 0  # 대기 중 같은 key의 새 요청에 밀려 버려진 작업
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """fn(*args)를 풀에서 실행. 시작 전에 취소되면 실행하지 않는다."""
+        loop = asyncio.get_running_loop()
+        self.submitted += 1
+        try:
+            out = await loop.run_in_executor(self._executor, fn, *args)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return out
+
+    async def iterate(self, it: Iterator[Any]) -> AsyncIterator[Any]:
+        """
+        동기 iterator(export chunk 등)를 풀에서 한 항목씩 꺼낸다.
+        받는 쪽이 끊겨 async generator가 닫히면 다음 chunk는 평가하지 않는다.
+        """
+        try:
+            while True:
+                item = await self.run(next, it, _END)
+                if item is _END:
+                    return
+                yield item
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except ValueError:
+                    pass  # 취소 시점에 스레드에서 아직 next() 중 → 끝나면 GC가 정리
+
+    def session(self) -> "EvalSession":
+        return EvalSession(self)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "per_connection": self.per_connection,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "superseded": self.superseded,
+        }
+
+
+@dataclass(eq=False)
+class _Job:
+    priority: int
+    seq: int
+    key: Optional[Hashable]
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    reply: Callable[[Any], Awaitable[None]]
+    dropped: Optional[Callable[[], Awaitable[None]]]
+
+
+class EvalSession:
+    """
+    연결 하나의 평가 스케줄러.
+
+    - 대기 중인 작업은 priority가 작은 것부터 (같으면 먼저 온 것부터) 시작한다.
+    - 같은 key의 작업이 대기 중이면 새 작업이 그것을 대체한다 (latest-wins).
+      대체된 작업은 실행되지 않고 dropped()만 불린다.
+    - 같은 key의 작업은 동시에 하나만 돈다 → 응답 순서가 요청 순서와 같다.
+    - 동시에 풀을 쓰는 작업은 per_connection개까지. 2 이상이면 한 자리는
+      priority 0 작업 몫으로 남겨 둔다 (긴 백그라운드 작업이 seek를 막지 않도록).
+    - close()는 대기 / 진행 중인 작업을 모두 취소한다
+      (이미 스레드에서 도는 평가는 끝까지 돌지만 결과는 버린다).
+    """
+
+    def __init__(self, pool: EvalPool):
+        self._pool = pool
+        self._limit = pool.per_connection
+        self._queue: List[_Job] = []
+        self._busy: Set[Hashable] = set()  # 실행 중인 key
+        self._running = 0
+        self._tasks: Set[asyncio.Task] = set()
+        self._seq = 0
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._queue) + self._running
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        reply: Callable[[Any], Awaitable[None]],
+        priority: int = 0,
+        key: Optional[Hashable] = None,
+        dropped: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> None:
+        """fn(*args)를 풀에서 평가한 뒤 reply(결과)를 보내도록 예약 (바로 반환)."""
+        if self._closed:
+            return
+        if key is not None:
+            for old in [j for j in self._queue if j.key == key]:
+                self._queue.remove(old)
+                self._pool.superseded += 1
+                if old.dropped is not None:
+                    self._spawn(old.dropped())
+        self._seq += 1
+        self._queue.append(_Job(priority, self._seq, key, fn, args, reply, dropped))
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._queue and self._running < self._limit:
+            ready = [j for j in self._queue if j.key is None or j.key not in self._busy]
+            if self._limit > 1 and self._running >= self._limit - 1:
+                ready = [j for j in ready if j.priority <= 0]
+            if not ready:
+                return
+            job = min(ready, key=lambda j: (j.priority, j.seq))
+            self._queue.remove(job)
+            if job.key is not None:
+                self._busy.add(job.key)
+            self._running += 1
+            self._spawn(self._run(job), job)
+
+    async def _run(self, job: _Job) -> None:
+        out = await self._pool.run(job.fn, *job.args)
+        await job.reply(out)
+
+    def _spawn(self, coro: Awaitable[None], job: Optional[_Job] = None) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(lambda t: self._finished(t, job))
+
+    def _finished(self, task: asyncio.Task, job: Optional[_Job]) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error("motion eval task failed", exc_info=task.exception())
+        if job is not None:
+            self._running -= 1
+            self._busy.discard(job.key)
+            if not self._closed:
+                self._dispatch()
+
+    async def close(self) -> None:
+        self._closed = True
+        self._queue.clear()
+        tasks = list(self._tasks)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+Ranges = List[Tuple[float, float]]
+CompileFn = Callable[[Any], Tuple[int, Ranges]]  # (blocking) payload → (version, dirty)
+DoneFn = Callable[[List[Any], int, Ranges], Awaitable[None]]
+ErrorFn = Callable[[List[Any], Exception], Awaitable[None]]
+
+
+@dataclass(eq=False)
+class _Pending:
+    # compile() 대기자: 결과가 자기 payload로 만든 것인지 구분하려고 payload를 같이 든다
+    fut: asyncio.Future
+    payload: Any
+
+
+class ProjectCompiler:
+    """
+    set_project latest-wins 파이프라인.
+
+    - submit()은 단일 슬롯에 최신 요청만 남기고 바로 반환한다 (이벤트 루프에서 컴파일 X).
+    - 워커 task 하나가 슬롯을 비우며 compile_fn을 스레드에서 실행한다. 컴파일 중에 들어온
+      요청들은 슬롯에서 서로 덮어써지므로 중간 버전은 컴파일되지 않고 버려진다.
+    - 덮어써진 요청의 보낸 쪽(waiter)은 그 요청을 흡수한 버전의 결과를 같이 받는다.
+    - 컴파일 중에도 seek / prefetch는 마지막으로 공개된 스냅샷에서 바로 응답된다.
+    - compile()로 기다리는 쪽은 콜백 대신 결과 / 예외를 직접 받는다. 더 새 요청에
+      흡수됐으면 own=False (그 결과는 자기 payload가 아니라 흡수한 쪽의 것).
+
+    compile_fn에서 난 errors 예외는 on_error로 해당 waiter들에게 그대로 돌려준다.
+    그 밖의 예외는 로그를 남기고 일반 에러로 on_error를 부른다 (waiter가 응답 없이 남지 않도록).
+    """
+
+    def __init__(
+        self,
+        compile_fn: CompileFn,
+        on_done: DoneFn,
+        on_error: ErrorFn,
+        errors: Tuple[type, ...] = (ValueError,),
+    ):
+        self._compile = compile_fn
+        self._on_done = on_done
+        self._on_error = on_error
+        self._errors = errors
+        # (payload, waiters). 이벤트 루프 스레드에서만 건드린다
+        self._slot: Optional[Tuple[Any, List[Any]]] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.compiled = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_compile_ms = 0.0
+
+    def _ensure_worker(self) -> None:
+        # asyncio 객체는 실행 중인 루프에서 만든다 (첫 submit 시점)
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._task = asyncio.create_task(self._run())
+
+    def submit(self, payload: Any, waiter: Any = None) -> None:
+        """최신 요청으로 슬롯을 교체. 이전 미처리 요청은 버리되 waiter는 이어받는다."""
+        self._ensure_worker()
+        self.submitted += 1
+        waiters: List[Any] = []
+        if self._slot is not None:
+            self.dropped += 1
+            waiters = self._slot[1]
+        if waiter is not None:
+            waiters.append(waiter)
+        self._slot = (payload, waiters)
+        self._idle.clear()
+        self._wake.set()
+
+    async def compile(self, payload: Any) -> Tuple[int, Ranges, bool]:
+        """
+        submit 후 결과 (version, dirty, own)를 기다린다 (HTTP 저장 등). 실패하면 예외.
+        own=False: 컴파일 전에 더 새 요청에 밀려 그 요청의 결과를 받은 것
+        (이 payload는 컴파일도 검증도 되지 않았다).
+        """
+        fut = asyncio.get_running_loop().create_future()
+        self.submit(payload, _Pending(fut, payload))
+        return await fut
+
+    async def wait_idle(self) -> None:
+        """대기 / 진행 중인 컴파일이 모두 끝날 때까지 (apply_ops 순서 보장용)."""
+        if self._idle is not None:
+            await self._idle.wait()
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            if self._slot is None:
+                continue
+            payload, waiters = self._slot
+            self._slot = None
+            t = time.perf_counter()
+            try:
+                version, dirty = await asyncio.to_thread(self._compile, payload)
+            except self._errors as e:
+                self.failed += 1
+                waiters = self._resolve(waiters, payload, error=e)
+                await self._notify(self._on_error(waiters, e))
+            except Exception:
+                self.failed += 1
+                logging.exception("project compile failed")
+                err = RuntimeError("Internal error while compiling project")
+                waiters = self._resolve(waiters, payload, error=err)
+                await self._notify(self._on_error(waiters, err))
+            else:
+                self.compiled += 1
+                self.last_compile_ms = (time.perf_counter() - t) * 1e3
+                waiters = self._resolve(waiters, payload, result=(version, dirty))
+                await self._notify(self._on_done(waiters, version, dirty))
+            if self._slot is None:
+                self._idle.set()
+
+    @staticmethod
+    def _resolve(
+        waiters: List[Any],
+        payload: Any,
+        result: Optional[Tuple[int, Ranges]] = None,
+        error: Optional[Exception] = None,
+    ) -> List[Any]:
+        """compile() 대기자를 완료시키고 나머지 (콜백으로 알릴) waiter만 돌려준다."""
+        rest = []
+        for w in waiters:
+            if not isinstance(w, _Pending):
+                rest.append(w)
+            elif not w.fut.done():  # 기다리던 쪽이 취소됐으면 건너뜀
+                if error is not None:
+                    w.fut.set_exception(error)
+                else:
+                    w.fut.set_result((*result, w.payload is payload))
+        return rest
+
+    @staticmethod
+    async def _notify(aw: Awaitable[None]) -> None:
+        # 콜백(전송) 실패로 워커가 죽지 않도록
+        try:
+            await aw
+        except Exception:
+            logging.exception("project compile callback failed")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "pending": self._slot is not None,
+            "submitted": self.submitted,
+            "compiled": self.compiled,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "last_compile_ms": self.last_compile_ms,
+        }
@@ -1,128 +1,326 @@
 import json
 import logging
 import threading
-from typing import Optional, List
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
 from scipy.spatial.transform import Rotation as R
 from copy import deepcopy
 import numpy as np
 
-from app.motion.evaluator import TrajectoryEvaluator, Limits
+from app.config import settings
+from app.motion.evaluator import TrajectoryEvaluator, Limits, EvalSnapshot, time_grid
 from app.motion.types import DOF, Project as RTProject
 from app.motion.adapter import to_runtime, from_runtime
+from app.motion.ops import apply_ops, changed_clip_ids
+from app.motion.pose_cache import PoseCache
+from app.motion.source_store import SourceStore
+from app.motion.source_registry import SourceRegistry
 from app.models import Project as PydProject
 from app.robot.robot import ROBOT
+from app.robot.common import Settings as RobotSettings
 
 DEFAULT_V_MAX = [10.0] * DOF
 DEFAULT_A_MAX = [50.0] * DOF
 DEFAULT_J_MAX = [1000.0] * DOF
 
 
+@dataclass(frozen=True)
+class _QuestSlot:
+    """Quest 패킷 하나에서 만든 불변 값 묶음 (참조 교체로 공개)."""
+
+    state: Optional[dict] = None
+    json: str = "{}"
+    head_position: Optional[np.ndarray] = None  # 읽기 전용
+    head_quat: Optional[np.ndarray] = None  # 읽기 전용
+
+
 class RuntimeState:
     """Singleton class to manage the runtime state of the application."""
 
     def __init__(self):
-        self._lock = threading.Lock()
-        self._quest_state: Optional[dict] = None
+        # 프로젝트 쓰기(set_project / apply_ops / set_bake) 직렬화 전용.
+        # 읽기(eval/envelope/quest)는 불변 스냅샷 참조만 읽으므로 잠그지 않는다.
+        self._write_lock = threading.Lock()
         self.robot_connected: bool = False
         self.quest_udp_running: bool = False
         self.quest_udp_bind: Optional[tuple[str, int]] = None
         self.quest_seq: int = 0
 
-        # Quest 헤드 마운트
-        self._quest_head_position: np.ndarray = None
-        self._quest_head_quat: np.ndarray = None
+        # Quest 상태 + 헤드 마운트: 패킷마다 새 슬롯으로 교체 (lock-free)
+        self._quest = _QuestSlot()
 
         # Project state
         lim = Limits(v_max=DEFAULT_V_MAX, a_max=DEFAULT_A_MAX, j_max=DEFAULT_J_MAX)
-        self._evaluator = TrajectoryEvaluator(limits=lim)
-        self._rt_project: Optional[RTProject] = None
+        self._evaluator = TrajectoryEvaluator(
+            limits=lim,
+            precompute_bridges=settings.motion_precompute_bridges,
+            bridge_workers=settings.motion_bridge_workers,
+            bridge_cache_entries=settings.motion_bridge_cache_entries,
+            bridge_cache_bytes=settings.motion_bridge_cache_mb << 20,
+            bake_step_ms=self.bake_step_ms() if settings.motion_bake else None,
+            instrument=settings.motion_instrument,
+            bridge_mode=settings.motion_bridge_mode,
+        )
+        # 스크럽(seek / prefetch) 결과 캐시: 편집 시 dirty 구간만 무효화
+        self._poses = PoseCache(
+            settings.motion_pose_cache_mb << 20, settings.motion_pose_cache_quantum_ms
+        )
+        self._sources = SourceRegistry(
+            settings.motion_frame_storage,
+            (
+                SourceStore(settings.motion_source_dir)
+                if settings.motion_source_dir
+                else None
+            ),
+            settings.motion_source_registry_mb << 20,
+        )
 
         ROBOT.set_play_evaluator(self._evaluator.eval_range, self._evaluator.eval_at)
 
     @property
     def quest_state_json(self) -> str:
-        """Return the quest state as a JSON string."""
-        with self._lock:
-            return (
-                json.dumps(self._quest_state, separators=(",", ":"))
-                if self._quest_state
-                else "{}"
-            )
+        """Return the quest state as a JSON string (serialized once per packet)."""
+        return self._quest.json
 
     @property
     def quest_head_position(self) -> Optional[np.ndarray]:
-        """Get the quest head position in a thread-safe manner."""
-        with self._lock:
-            return self._quest_head_position.copy()
+        """Get a copy of the latest quest head position."""
+        hp = self._quest.head_position
+        return hp.copy() if hp is not None else None
 
     @property
     def quest_head_quat(self) -> Optional[np.ndarray]:
-        """Get the quest head position in a thread-safe manner."""
-        with self._lock:
-            return self._quest_head_quat.copy()
+        """Get a copy of the latest quest head quaternion."""
+        hq = self._quest.head_quat
+        return hq.copy() if hq is not None else None
 
     @property
     def quest_state(self) -> Optional[dict]:
-        """Get the quest state in a thread-safe manner."""
-        with self._lock:
-            return deepcopy(self._quest_state)
+        """Get a copy of the latest quest state."""
+        return deepcopy(self._quest.state)
 
-    @quest_state_json.setter
+    @quest_state.setter
     def quest_state(self, value: dict):
-        """Set the quest state and ensure it is thread-safe."""
-        with self._lock:
-            self._quest_state = value
-
-            head_controller = self._quest_state["head"]
-            self._quest_head_position = np.asarray(head_controller["position"], dtype=np.float64)
-            self._quest_head_quat = np.asarray(head_controller["rotation"], dtype=np.float64)
-
-    def set_project(self, project: PydProject):
-        rt = to_runtime(project)
-        with self._lock:
-            self._rt_project = rt
-            self._evaluator.set_project(rt)
-
-    def get_rt_project(self) -> Optional[RTProject]:
-        with self._lock:
-            return deepcopy(self._rt_project) if self._rt_project is not None else None
-
-    def eval_at(self, t_ms: int) -> List[float]:
-        with self._lock:
-            if not self._rt_project:
-                return [0.0] * DOF
-            return self._evaluator.eval_at(t_ms)
-
-    def eval_range(self, t0_ms: int, t1_ms: int, step_ms: float) -> List[List[float]]:
-        with self._lock:
-            if not self._rt_project:
-                return [[0.0] * DOF]
-            return self._evaluator.eval_range(t0_ms, t1_ms, step_ms)
-
-    def project_duration_ms(self) -> int:
-        with self._lock:
-            p = self._rt_project
-            if p is None:
-                return 0
-            max_end = 0
-            for c in p.clips:
-                s = p.sources.get(c.sourceId)
-                if not s:
-                    continue
-                frames = max(1, c.outFrame - c.inFrame)
-                dur = frames * s.dt * 1000.0
-                end = max(0, c.t0) + dur
-                if end > max_end:
-                    max_end = end
-            return int(round(max_end))
-
-    def default_step_ms(self) -> float:
-        with self._lock:
-            p = self._rt_project
-            if p is None or not p.sources:
-                return 33.0  # 30Hz fallback
-            ms = [s.dt * 1000.0 for s in p.sources.values()]
-            return float(max(1.0, min(ms)))
+        """
+        Publish a new quest state. Everything derived from the packet is built
+        first and swapped in with a single reference assignment, so readers never
+        wait on the UDP thread and never see position/rotation from different packets.
+        """
+        head_controller = value["head"]
+        position = np.asarray(head_controller["position"], dtype=np.float64)
+        quat = np.asarray(head_controller["rotation"], dtype=np.float64)
+        position.flags.writeable = False
+        quat.flags.writeable = False
+        self._quest = _QuestSlot(
+            state=value,
+            json=json.dumps(value, separators=(",", ":")) if value else "{}",
+            head_position=position,
+            head_quat=quat,
+        )
+
+    def set_project(self, project: PydProject) -> Tuple[int, List[Tuple[float, float]]]:
+        """
+        프로젝트 통째 교체 → (version, dirty [(lo, hi)] ms, ±inf 가능).
+        이전 프로젝트와 클립/소스를 비교해 바뀐 클립만 apply_ops와 같은 경로로 반영하므로
+        dirty는 실제로 결과가 바뀐 구간뿐이고, bake / 포즈 캐시도 그 구간만 다시 만든다.
+        """
+        rt = to_runtime(project, self._sources)
+        with self._write_lock:
+            cur = self._evaluator.snapshot().proj
+            touched = changed_clip_ids(cur, rt) if cur is not None else None
+            if touched is None:
+                self._evaluator.set_project(rt)
+                dirty = [(-math.inf, math.inf)]
+                self._poses.advance(self._evaluator.snapshot().version, None)
+            else:
+                dirty = self._evaluator.update_project(rt, touched)
+                self._poses.advance(self._evaluator.snapshot().version, dirty)
+            self._retain_sources(rt)
+            return self._evaluator.snapshot().version, dirty
+
+    def apply_ops(self, ops: list) -> Tuple[int, List[Tuple[float, float]]]:
+        """
+        편집 op들을 현재 프로젝트에 적용 → (version, 바뀐 구간 [(lo, hi)] ms, ±inf 가능).
+        실패 시 ValueError이며 프로젝트는 그대로다.
+        """
+        with self._write_lock:
+            cur = self._evaluator.snapshot().proj
+            base = cur if cur is not None else RTProject()
+            rt, touched = apply_ops(base, ops, self._sources)
+            dirty = self._evaluator.update_project(rt, touched)
+            self._poses.advance(self._evaluator.snapshot().version, dirty)
+            self._retain_sources(rt)
+            return self._evaluator.snapshot().version, dirty
+
+    def _retain_sources(self, rt: RTProject) -> None:
+        # 새로 공개된 프로젝트의 소스만 레지스트리에서 버리지 않게 한다 (이전 것은 LRU 대상)
+        self._sources.set_live(s.hash for s in rt.sources.values())
+
+    def register_source(self, frames, copy: bool = True) -> dict:
+        """
+        프레임 업로드 → 레지스트리 등록. 같은 내용이면 기존 것을 재사용한다.
+        copy=False: 업로드 버퍼 위 배열을 그대로 넘겨받는다.
+        """
+        h, _ = self._sources.register(frames, copy=copy)
+        return self._sources.info(h)
+
+    def source_info(self, h: str) -> dict:
+        """KeyError: 등록되지 않은 해시"""
+        return self._sources.info(h)
+
+    def snapshot(self) -> EvalSnapshot:
+        """현재 공개된 평가 상태. 여러 호출을 같은 프로젝트로 묶을 때 넘겨준다."""
+        return self._evaluator.snapshot()
+
+    def get_rt_project(
+        self, snap: Optional[EvalSnapshot] = None
+    ) -> Optional[RTProject]:
+        """공개된 프로젝트 (불변으로 취급, 공유 객체라 수정 금지)."""
+        return (snap or self._evaluator.snapshot()).proj
+
+    def eval_at(self, t_ms: int) -> np.ndarray:
+        """[DOF] float64. 리스트 변환은 호출부(API 경계)에서."""
+        return self._evaluator.eval_at(t_ms)
+
+    def eval_range(
+        self,
+        t0_ms: int,
+        t1_ms: int,
+        step_ms: float,
+        snap: Optional[EvalSnapshot] = None,
+    ) -> np.ndarray:
+        """[N, DOF] float64. 리스트 변환은 호출부(API 경계)에서."""
+        snap = snap or self._evaluator.snapshot()
+        if snap.proj is None:
+            return np.zeros((1, DOF), dtype=np.float64)
+        return self._evaluator.eval_range(t0_ms, t1_ms, step_ms, snap)
+
+    def eval_times(
+        self, ts: np.ndarray, snap: Optional[EvalSnapshot] = None
+    ) -> np.ndarray:
+        """임의 시각 ts [N] (ms) → [N, DOF] float64. 프로젝트가 없으면 0."""
+        return self._evaluator.eval_times(ts, snap)
+
+    def eval_kinematics_times(
+        self, ts: np.ndarray, snap: Optional[EvalSnapshot] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ts [N] (ms) → (q, dq, ddq) 각 [N, DOF] (속도/가속도는 초 단위)."""
+        return self._evaluator.eval_kinematics_times(ts, snap)
+
+    def scrub_times(self, ts, snap: Optional[EvalSnapshot] = None) -> np.ndarray:
+        """
+        seek / prefetch용 평가: 포즈 캐시를 먼저 보고 없는 시각만 한 번에 평가해 채운다.
+        시각은 캐시 격자(quantum_ms)로 스냅된다. 반환 [N, DOF] float64.
+        snap을 넘기면 그 스냅샷 기준 (응답에 version을 같이 실을 때).
+        """
+        if snap is None:
+            snap = self._evaluator.snapshot()
+        cache = self._poses
+        keys = [cache.key(t) for t in np.asarray(ts, dtype=np.float64).tolist()]
+        out = np.empty((len(keys), DOF), dtype=np.float64)
+        found = cache.get_many(snap.version, keys)
+        miss = [i for i, q in enumerate(found) if q is None]
+        for i, q in enumerate(found):
+            if q is not None:
+                out[i] = q
+        if miss:
+            miss_keys = [keys[i] for i in miss]
+            q = self._evaluator.eval_times(np.asarray(miss_keys, np.float64), snap)
+            out[miss] = q
+            if snap.proj is not None:
+                cache.put_many(snap.version, miss_keys, q)
+        return out
+
+    def scrub_at(self, t_ms: int, snap: Optional[EvalSnapshot] = None) -> np.ndarray:
+        """[DOF] float64 (캐시 경유 seek)."""
+        return self.scrub_times([t_ms], snap)[0]
+
+    def scrub_range(
+        self,
+        t0_ms: int,
+        t1_ms: int,
+        step_ms: float,
+        snap: Optional[EvalSnapshot] = None,
+    ) -> np.ndarray:
+        """[N, DOF] float64 (캐시 경유 prefetch)."""
+        return self.scrub_times(time_grid(t0_ms, t1_ms, step_ms), snap)
+
+    def bridge_cache_stats(self) -> dict:
+        return self._evaluator.bridge_cache_stats()
+
+    def eval_stats(self) -> dict:
+        """단계별 지연 히스토그램 + 브릿지 카운터 + 브릿지 캐시 통계."""
+        out = self._evaluator.instr.stats()
+        out["bridge_cache"] = self._evaluator.bridge_cache_stats()
+        out["pose_cache"] = self._poses.stats()
+        return out
+
+    def set_eval_stats(self, enabled: bool, reset: bool = False) -> dict:
+        instr = self._evaluator.instr
+        instr.enabled = enabled
+        if reset:
+            instr.reset()
+        return self.eval_stats()
+
+    def bridge_mode(self) -> str:
+        return self._evaluator.bridge_mode
+
+    def set_bridge_mode(self, mode: str) -> str:
+        """gap 브릿지 방식 교체 (모르는 방식은 ValueError). 브릿지 결과가 바뀌므로 캐시 전체 무효화."""
+        with self._write_lock:
+            self._evaluator.set_bridge_mode(mode)
+            self._poses.advance(self._evaluator.snapshot().version, None)
+            return self._evaluator.bridge_mode
+
+    @staticmethod
+    def bake_step_ms() -> float:
+        """bake 격자 간격 = 로봇 재생 주기 (ms)."""
+        return float(RobotSettings.master_arm_loop_period) * 1000.0
+
+    def set_bake(self, enabled: bool) -> dict:
+        with self._write_lock:
+            self._evaluator.set_bake(self.bake_step_ms() if enabled else None)
+            # bake는 결과를 바꾸지 않는다 → 캐시는 version만 따라간다
+            self._poses.advance(self._evaluator.snapshot().version, [])
+            return self._evaluator.bake_info()
+
+    def envelope(
+        self, t0_ms: float, t1_ms: float, pixels: int, source_id: Optional[str] = None
+    ):
+        """
+        픽셀별 (min, max, mean, valid). source_id가 없으면 최종 trajectory 기준이며
+        bake가 꺼져 있으면 None. 모르는 source_id는 KeyError.
+        """
+        if source_id is not None:
+            return self._evaluator.source_envelope(source_id, t0_ms, t1_ms, pixels)
+        return self._evaluator.envelope(t0_ms, t1_ms, pixels)
+
+    def bake_info(self) -> dict:
+        return self._evaluator.bake_info()
+
+    def project_duration_ms(self, snap: Optional[EvalSnapshot] = None) -> int:
+        p = (snap or self._evaluator.snapshot()).proj
+        if p is None:
+            return 0
+        max_end = 0
+        for c in p.clips:
+            s = p.sources.get(c.sourceId)
+            if not s:
+                continue
+            frames = max(1, c.outFrame - c.inFrame)
+            dur = frames * s.dt * 1000.0
+            end = max(0, c.t0) + dur
+            if end > max_end:
+                max_end = end
+        return int(round(max_end))
+
+    def default_step_ms(self, snap: Optional[EvalSnapshot] = None) -> float:
+        p = (snap or self._evaluator.snapshot()).proj
+        if p is None or not p.sources:
+            return 33.0  # 30Hz fallback
+        ms = [s.dt * 1000.0 for s in p.sources.values()]
+        return float(max(1.0, min(ms)))
 
     # Internal
     @staticmethod
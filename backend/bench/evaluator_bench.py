@@ -0,0 +1,257 @@
+# bench/evaluator_bench.py
+"""
+TrajectoryEvaluator 벤치마크 (로봇/네트워크 불필요).
+
+    cd backend
+    python -m bench.evaluator_bench --preset medium --out bench.json
+    python -m bench.evaluator_bench --preset medium --compare bench.json
+    python -m bench.evaluator_bench --preset medium --overlap 0.6 --gap 0.1 --crossfade 0.5
+
+결과는 JSON (case별 params + metrics). --compare로 이전 결과와 metric 비율을 출력한다.
+"""
+
+from __future__ import annotations
+from dataclasses import replace
+from typing import Callable, Dict, List
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.motion.evaluator import Limits, TrajectoryEvaluator
+from app.motion.types import DOF
+
+from .synthetic import PRESETS, SyntheticSpec, make_project
+
+
+def _evaluator(bake_step_ms=None, bridge_mode="ruckig") -> TrajectoryEvaluator:
+    lim = Limits(v_max=[10.0] * DOF, a_max=[50.0] * DOF, j_max=[1000.0] * DOF)
+    return TrajectoryEvaluator(
+        limits=lim, bake_step_ms=bake_step_ms, bridge_mode=bridge_mode
+    )
+
+
+def _timed(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """fn을 한 번 예열한 뒤 repeat번 실행한 ms (min / median)."""
+    fn()
+    ts = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        ts.append((time.perf_counter() - t) * 1e3)
+    return {"min_ms": float(np.min(ts)), "median_ms": float(np.median(ts))}
+
+
+def _peak_kb(fn: Callable[[], object]) -> float:
+    """fn 실행 중 tracemalloc peak (KiB). 시간 측정과 따로 돌린다."""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024.0
+
+
+def run_case(
+    name: str,
+    spec: SyntheticSpec,
+    repeat: int,
+    samples: int,
+    bake_step_ms=None,
+    bridge_mode="ruckig",
+) -> Dict[str, object]:
+    p = make_project(spec)
+    end_ms = max(c.t0 + (c.outFrame - c.inFrame) * spec.dt * 1000.0 for c in p.clips)
+    rng = np.random.default_rng(spec.seed + 1)
+    ts = rng.uniform(0.0, end_ms, samples)
+    m: Dict[str, object] = {}
+
+    # set_project: 브릿지 없이 컴파일만 (캐시 유무 무관)
+    ev = _evaluator(bake_step_ms, bridge_mode)
+    m["set_project"] = _timed(
+        lambda: ev.set_project(p, precompute_bridges=False), repeat
+    )
+
+    # 브릿지: 매번 새 evaluator(빈 캐시)에서 전부 생성
+    def cold_bridges():
+        _evaluator(bake_step_ms, bridge_mode).set_project(p, precompute_bridges=True)
+
+    m["set_project_bridges_cold"] = _timed(cold_bridges, repeat)
+    m["set_project_bridges_cold"]["peak_kb"] = _peak_kb(cold_bridges)
+
+    # eval_at: 지연 브릿지 생성 포함(cold) / 캐시가 찬 뒤(warm)
+    ev = _evaluator(bake_step_ms, bridge_mode)
+    ev.set_project(p)
+    per = []
+    for t in ts:
+        t0 = time.perf_counter()
+        ev.eval_at(float(t))
+        per.append((time.perf_counter() - t0) * 1e6)
+    m["eval_at_cold_us"] = _percentiles(per)
+    per = []
+    for t in ts:
+        t0 = time.perf_counter()
+        ev.eval_at(float(t))
+        per.append((time.perf_counter() - t0) * 1e6)
+    m["eval_at_warm_us"] = _percentiles(per)
+    m["bridges"] = ev.bridge_cache_stats()
+
+    # eval_range: 전체 10 ms export, 앞 60초 1 ms export, 스크럽용 4초 prefetch 창
+    for key, t1, step in (
+        ("eval_range_full_10ms", end_ms, 10.0),
+        ("eval_range_60s_1ms", min(end_ms, 60000.0), 1.0),
+    ):
+        m[key] = _timed(lambda: ev.eval_range(0, t1, step), repeat)
+        m[key]["peak_kb"] = _peak_kb(lambda: ev.eval_range(0, t1, step))
+    centers = iter(rng.uniform(0.0, end_ms, repeat + 1))  # + 예열 1회
+
+    def prefetch():
+        c = next(centers)
+        ev.eval_range(c - 2000, c + 2000, 16.67)
+
+    m["prefetch_4s"] = _timed(prefetch, repeat)
+    return {
+        "name": name,
+        "params": {
+            **spec.to_dict(),
+            "bake_step_ms": bake_step_ms,
+            "bridge_mode": bridge_mode,
+            "end_ms": end_ms,
+        },
+        "metrics": m,
+    }
+
+
+def _percentiles(xs: List[float]) -> Dict[str, float]:
+    a = np.asarray(xs)
+    return {
+        "p50": float(np.percentile(a, 50)),
+        "p99": float(np.percentile(a, 99)),
+        "max": float(a.max()),
+    }
+
+
+def _meta() -> Dict[str, object]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+    }
+
+
+def _flatten(m: Dict[str, object], prefix: str = "") -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for k, v in m.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, key + "."))
+        elif isinstance(v, (int, float)):
+            out[key] = float(v)
+    return out
+
+
+def compare(old: Dict[str, object], new: Dict[str, object]) -> None:
+    """case / metric별 new/old 비율 (시간·메모리는 낮을수록 좋음)."""
+    old_cases = {c["name"]: c for c in old["cases"]}
+    for case in new["cases"]:
+        prev = old_cases.get(case["name"])
+        if prev is None:
+            continue
+        print(
+            f"== {case['name']} ({old['meta'].get('commit')} -> {new['meta'].get('commit')})"
+        )
+        a, b = _flatten(prev["metrics"]), _flatten(case["metrics"])
+        for k in sorted(a.keys() & b.keys()):
+            if not (k.endswith("_ms") or k.endswith("_kb") or "_us." in k):
+                continue
+            ratio = b[k] / a[k] if a[k] else float("nan")
+            print(f"  {k:40s} {a[k]:12.3f} -> {b[k]:12.3f}  x{ratio:.2f}")
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--preset", action="append", choices=sorted(PRESETS))
+    ap.add_argument("--clips", type=int, help="n_clips override")
+    ap.add_argument("--sources", type=int, help="n_sources override")
+    # 밀도 override (SyntheticSpec 필드, 확률은 0..1)
+    ap.add_argument("--overlap", type=float, help="next clip overlaps (prob)")
+    ap.add_argument("--gap", type=float, help="gap before next clip (prob)")
+    ap.add_argument("--overlap-ms", type=int, help="overlap length ms")
+    ap.add_argument("--gap-ms", type=int, help="gap length ms")
+    ap.add_argument("--crossfade", type=float, help="crossfade blend (prob)")
+    ap.add_argument("--additive", type=float, help="additive blend (prob)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--samples", type=int, default=500, help="eval_at calls")
+    ap.add_argument("--bake", type=float, default=None, help="bake step ms")
+    ap.add_argument(
+        "--bridge-mode", default="ruckig", choices=["ruckig", "quintic", "septic"]
+    )
+    ap.add_argument("--out", help="write JSON here (default: stdout)")
+    ap.add_argument("--compare", help="previous JSON to compare against")
+    args = ap.parse_args(argv)
+
+    # CLI 인자 → SyntheticSpec 필드 (지정한 것만)
+    fields = {
+        "clips": "n_clips",
+        "sources": "n_sources",
+        "overlap": "overlap",
+        "gap": "gap",
+        "overlap_ms": "overlap_ms",
+        "gap_ms": "gap_ms",
+        "crossfade": "crossfade",
+        "additive": "additive",
+    }
+    overrides = {
+        f: getattr(args, a) for a, f in fields.items() if getattr(args, a) is not None
+    }
+    for f in ("overlap", "gap", "crossfade", "additive"):
+        if not 0.0 <= overrides.get(f, 0.0) <= 1.0:
+            ap.error(f"--{f} must be in [0, 1]")
+
+    cases = []
+    for name in args.preset or ["small", "medium"]:
+        spec = replace(PRESETS[name], seed=args.seed, **overrides)
+        if spec.overlap + spec.gap > 1.0 or spec.crossfade + spec.additive > 1.0:
+            ap.error(
+                f"{name}: overlap + gap and crossfade + additive must each be <= 1"
+            )
+        print(f"running {name} ...", file=sys.stderr)
+        case = run_case(
+            name, spec, args.repeat, args.samples, args.bake, args.bridge_mode
+        )
+        # params에는 최종 spec 전체가, overrides에는 preset과 달라진 필드만 남는다
+        case["params"]["overrides"] = overrides
+        cases.append(case)
+
+    result = {"meta": _meta(), "cases": cases}
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    elif not args.compare:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# bench/synthetic.py
+from __future__ import annotations
+from dataclasses import dataclass, asdict
+from typing import Dict, List
+
+import numpy as np
+
+from app.motion.frames import FrameStore
+from app.motion.types import DOF, Blend, Clip, Project, Source
+
+
+@dataclass(frozen=True)
+class SyntheticSpec:
+    """
+    합성 프로젝트 파라미터. 클립은 시간 순으로 이어 붙이며, 각 클립 다음 위치를
+    overlap / gap 확률로 앞당기거나(겹침) 띄운다(브릿지). 나머지는 맞붙인다.
+    """
+
+    n_sources: int = 4
+    n_clips: int = 40
+    frames_min: int = 300
+    frames_max: int = 1200
+    dt: float = 1 / 100.0  # 초/프레임
+    overlap: float = 0.3  # 다음 클립이 겹칠 확률
+    gap: float = 0.3  # 다음 클립 앞에 빈 구간이 생길 확률
+    overlap_ms: int = 400
+    gap_ms: int = 600
+    crossfade: float = 0.3  # 블렌드 모드 확률 (나머지는 override)
+    additive: float = 0.1
+    ramp_ms: int = 200
+    storage: str = "float64"
+    seed: int = 0
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+def _frames(rng: np.random.Generator, n: int) -> np.ndarray:
+    """부드러운 [n, DOF] 궤적 (관절별 사인 합 + 느린 랜덤 워크)."""
+    t = np.arange(n, dtype=np.float64)[:, None]
+    freq = rng.uniform(0.002, 0.02, (1, DOF))
+    phase = rng.uniform(0, 2 * np.pi, (1, DOF))
+    walk = np.cumsum(rng.normal(0, 0.002, (n, DOF)), axis=0)
+    return 0.5 * np.sin(2 * np.pi * freq * t + phase) + walk
+
+
+def make_project(spec: SyntheticSpec) -> Project:
+    rng = np.random.default_rng(spec.seed)
+    sources: Dict[str, Source] = {}
+    for i in range(spec.n_sources):
+        n = int(rng.integers(spec.frames_min, spec.frames_max + 1))
+        frames = FrameStore.encode(_frames(rng, n), spec.storage)
+        sources[f"s{i}"] = Source(id=f"s{i}", dt=spec.dt, frames=frames)
+
+    clips: List[Clip] = []
+    t = 0
+    for j in range(spec.n_clips):
+        sid = f"s{int(rng.integers(spec.n_sources))}"
+        F = len(sources[sid].frames)
+        a = int(rng.integers(0, F // 2))
+        b = int(rng.integers(a + F // 4, F + 1))
+        u = rng.random()
+        if u < spec.additive:
+            blend = Blend(mode="additive", weight=0.3)
+        elif u < spec.additive + spec.crossfade:
+            blend = Blend(mode="crossfade", inMs=spec.ramp_ms, outMs=spec.ramp_ms)
+        else:
+            blend = Blend(mode="override", priority=int(rng.integers(3)))
+        clips.append(
+            Clip(id=f"c{j}", sourceId=sid, t0=t, inFrame=a, outFrame=b, blend=blend)
+        )
+
+        t += int(round((b - a) * spec.dt * 1000.0))
+        v = rng.random()
+        if v < spec.overlap:
+            t = max(0, t - spec.overlap_ms)
+        elif v < spec.overlap + spec.gap:
+            t += spec.gap_ms
+
+    return Project(lengthMs=t, sources=sources, clips=clips)
+
+
+PRESETS: Dict[str, SyntheticSpec] = {
+    "small": SyntheticSpec(n_sources=2, n_clips=10),
+    "medium": SyntheticSpec(n_sources=6, n_clips=100),
+    "large": SyntheticSpec(n_sources=16, n_clips=500, frames_max=3000),
+    "gaps": SyntheticSpec(n_clips=100, overlap=0.0, gap=0.9),
+    "dense": SyntheticSpec(n_clips=100, overlap=0.9, gap=0.0, crossfade=0.5),
+}
@@ -179,7 +179,7 @@ export const api = {
 
     /** Motion (CSV export via StreamingResponse) */
     motion: {
-        exportCsv: (p: { t0_ms: number; t1_ms: number; step_ms: number; include_header?: boolean }) =>
+        exportCsv: (p: { t0_ms: number; t1_ms: number; step_ms: number; include_header?: boolean; derivatives?: boolean }) =>
             postJson<Blob>('/motion/export_csv', p),                                  // text/csv → blob
     },
 
@@ -1,35 +1,106 @@
 import { c } from "naive-ui"
 
 // src/lib/motionClient.ts
-type PoseListener = (t_ms: number, q: number[]) => void
-type PrefetchListener = (t0_ms: number, step_ms: number, poses: number[][]) => void
+// 관절값 한 행. 바이너리 모드에서는 수신 버퍼 위 Float32Array view (복사 X)
+export type Pose = number[] | Float32Array
+// req: 요청 시 받은 id (서버가 그대로 돌려준다). pose는 모든 연결에 broadcast되므로 다른 클라이언트의 id일 수 있다
+type PoseListener = (t_ms: number, q: Pose, req?: number) => void
+// joint_mask를 지정한 prefetch면 각 행은 선택한 관절만 (인덱스 오름차순)
+type PrefetchListener = (t0_ms: number, step_ms: number, poses: Pose[], req?: number) => void
+// 서버 대기열에서 더 새 요청에 밀려 처리되지 않은 요청
+type CancelledListener = (req: number, request: string) => void
 type OpenListener = () => void
+// 서버가 알려주는 변경 구간 [lo, hi] (ms). null은 열린 끝(±inf)
+type DirtyRange = [number | null, number | null]
+// 픽셀별 [DOF] 버킷 (데이터 없는 픽셀은 null)
+export type EnvelopeResult = {
+    t0_ms: number, t1_ms: number, pixels: number, sourceId: string | null,
+    min?: (number[] | null)[], max?: (number[] | null)[], mean?: (number[] | null)[],
+    error?: string, req?: number
+}
+type EnvelopeListener = (env: EnvelopeResult) => void
+// version: 서버 프로젝트 버전 (단조 증가). dirty가 빈 배열이면 결과 변화 없음
+type ProjectUpdatedListener = (dirty: DirtyRange[] | null, version: number | null) => void
+export type MotionOp =
+    | { op: 'add_clip', clip: any }
+    | { op: 'move_clip', clipId: string, t0: number }
+    | { op: 'trim_clip', clipId: string, inFrame: number, outFrame: number, t0?: number }
+    | { op: 'delete_clip', clipId: string }
+    | { op: 'set_blend', clipId: string, blend: any }
+    | { op: 'add_source', source: any }
+    | { op: 'remove_source', sourceId: string }
 type ErrorListener = (e: any) => void
+export type MotionClientOptions = {
+    // pose / prefetch_result를 float32 바이너리 프레임으로 받기 (?binary=1)
+    binary?: boolean
+}
+
+// 바이너리 프레임 헤더 (backend app/motion/wire.py, 40 bytes little-endian)
+//   magic "MWS1" | kind u8 | itemsize u8 | dof u16 | version u32 | req u32 | count u32
+//   | joint_mask u32 | t0_ms f64 | step_ms f64
+const WIRE_MAGIC = 0x3153574d // "MWS1"
+const WIRE_HEADER_BYTES = 40
+const WIRE_KIND_POSE = 1
+const WIRE_KIND_PREFETCH = 2
+
+function popcount32(x: number) {
+    let n = 0
+    for (let v = x >>> 0; v; v >>>= 1) n += v & 1
+    return n
+}
 
 export class MotionClient {
     private ws: WebSocket | null = null
     private url: string
+    private binary: boolean
     private onPoseListeners: PoseListener[] = []
     private onPrefetchListeners: PrefetchListener[] = []
     private onOpenListeners: OpenListener[] = []
+    private onProjectUpdatedListeners: ProjectUpdatedListener[] = []
+    private onEnvelopeListeners: EnvelopeListener[] = []
     private onErrorListeners: ErrorListener[] = []
+    private onCancelledListeners: CancelledListener[] = []
     private _connected = false
     // private _reconnect = 0
 
     // 프론트에서 사용할 최신 project 스냅샷(필요 시 jointNames 참고)
     private _lastProject: any | null = null
+    // 소스 frames 배열 → 서버 레지스트리 해시 (한 번 업로드한 프레임은 다시 보내지 않음)
+    private _sourceHashes = new WeakMap<object, Promise<string>>()
+    private _projectSeq = 0
+    // 마지막으로 받은 서버 프로젝트 버전 (project_updated)
+    private _projectVersion = -1
+    // seek / prefetch / envelope 요청 id
+    private _reqSeq = 0
+
+    constructor(url: string, opts: MotionClientOptions = {}) {
+        this.url = url
+        this.binary = !!opts.binary
+    }
 
-    constructor(url: string) { this.url = url }
+    // ws://host/ws/motion → http://host
+    private get httpBase() {
+        return this.url.replace(/^ws/, 'http').replace(/\/ws\/motion\/?$/, '')
+    }
 
     get connected() { return this._connected }
     get lastProject() { return this._lastProject }
+    get projectVersion() { return this._projectVersion }
 
     connect() {
         if (this.ws) try { this.ws.close() } catch { }
-        this.ws = new WebSocket(this.url)
+        let url = this.url
+        if (this.binary) {
+            const u = new URL(url)
+            u.searchParams.set('binary', '1')
+            url = u.toString()
+        }
+        this.ws = new WebSocket(url)
+        this.ws.binaryType = 'arraybuffer'
 
         this.ws.onopen = () => {
             this._connected = true
+            this._projectVersion = -1 // 서버 재시작 시 버전이 다시 시작한다
             // this._reconnect = 0
             this.onOpenListeners.forEach(f => f())
         }
@@ -44,17 +115,64 @@ export class MotionClient {
             // }
         }
         this.ws.onmessage = (ev) => {
+            if (ev.data instanceof ArrayBuffer) {
+                try { this._onFrame(ev.data) } catch { }
+                return
+            }
             try {
                 const msg = JSON.parse(ev.data)
                 if (msg.type === 'pose' && Array.isArray(msg.q)) {
-                    this.onPoseListeners.forEach(f => f(msg.t_ms ?? 0, msg.q))
+                    this.onPoseListeners.forEach(f => f(msg.t_ms ?? 0, msg.q, msg.req))
                 } else if (msg.type === 'prefetch_result' && Array.isArray(msg.poses)) {
-                    this.onPrefetchListeners.forEach(f => f(msg.t0_ms, msg.step_ms, msg.poses))
+                    if (this._isStale(msg.version)) return
+                    this.onPrefetchListeners.forEach(f => f(msg.t0_ms, msg.step_ms, msg.poses, msg.req))
+                } else if (msg.type === 'envelope_result') {
+                    this.onEnvelopeListeners.forEach(f => f(msg))
+                } else if (msg.type === 'error') {
+                    // 서버가 거부한 seek / prefetch / envelope 요청 ({ request, error, req? })
+                    this.onErrorListeners.forEach(f => f(msg))
+                } else if (msg.type === 'cancelled' && typeof msg.req === 'number') {
+                    this.onCancelledListeners.forEach(f => f(msg.req, msg.request))
+                } else if (msg.type === 'project_updated') {
+                    const version = typeof msg.version === 'number' ? msg.version : null
+                    if (version !== null) {
+                        if (version <= this._projectVersion) return // 늦게 도착한 이전 버전
+                        this._projectVersion = version
+                    }
+                    this.onProjectUpdatedListeners.forEach(f => f(msg.dirty ?? null, version))
                 }
             } catch { }
         }
     }
 
+    // 바이너리 pose / prefetch_result 프레임
+    private _onFrame(buf: ArrayBuffer) {
+        const view = new DataView(buf)
+        if (buf.byteLength < WIRE_HEADER_BYTES || view.getUint32(0, true) !== WIRE_MAGIC) return
+        const kind = view.getUint8(4)
+        if (view.getUint8(5) !== 4) return // float32만
+        const version = view.getUint32(8, true)
+        const req = view.getUint32(12, true) || undefined
+        const count = view.getUint32(16, true)
+        const cols = popcount32(view.getUint32(20, true))
+        const t0_ms = view.getFloat64(24, true)
+        const step_ms = view.getFloat64(32, true)
+        const data = new Float32Array(buf, WIRE_HEADER_BYTES, count * cols)
+        if (kind === WIRE_KIND_POSE) {
+            this.onPoseListeners.forEach(f => f(t0_ms, data, req))
+        } else if (kind === WIRE_KIND_PREFETCH) {
+            if (this._isStale(version)) return
+            const poses: Pose[] = new Array(count)
+            for (let i = 0; i < count; i++) poses[i] = data.subarray(i * cols, (i + 1) * cols)
+            this.onPrefetchListeners.forEach(f => f(t0_ms, step_ms, poses, req))
+        }
+    }
+
+    // 이미 더 새 프로젝트 버전을 받았으면 그 이전 버전으로 계산된 결과는 버린다
+    private _isStale(version: unknown) {
+        return typeof version === 'number' && version < this._projectVersion
+    }
+
     onPose(cb: PoseListener) {
         this.onPoseListeners.push(cb); return () => {
             this.onPoseListeners = this.onPoseListeners.filter(f => f !== cb)
@@ -70,22 +188,98 @@ export class MotionClient {
             this.onOpenListeners = this.onOpenListeners.filter(f => f !== cb)
         }
     }
+    onProjectUpdated(cb: ProjectUpdatedListener) {
+        this.onProjectUpdatedListeners.push(cb); return () => {
+            this.onProjectUpdatedListeners = this.onProjectUpdatedListeners.filter(f => f !== cb)
+        }
+    }
+    onEnvelope(cb: EnvelopeListener) {
+        this.onEnvelopeListeners.push(cb); return () => {
+            this.onEnvelopeListeners = this.onEnvelopeListeners.filter(f => f !== cb)
+        }
+    }
+    onCancelled(cb: CancelledListener) {
+        this.onCancelledListeners.push(cb); return () => {
+            this.onCancelledListeners = this.onCancelledListeners.filter(f => f !== cb)
+        }
+    }
     onError(cb: ErrorListener) {
         this.onErrorListeners.push(cb); return () => {
             this.onErrorListeners = this.onErrorListeners.filter(f => f !== cb)
         }
     }
 
-    setProject(projectSnapshot: any) {
+    async setProject(projectSnapshot: any) {
         this._lastProject = projectSnapshot
-        this._send({ type: 'set_project', project: projectSnapshot })
+        const seq = ++this._projectSeq
+        let project = projectSnapshot
+        try {
+            project = await this._withSourceHashes(projectSnapshot)
+        } catch {
+            // 업로드 실패 시 기존처럼 frames를 인라인으로 전송
+        }
+        if (seq !== this._projectSeq) return // 그 사이 더 새 스냅샷이 들어옴
+        this._send({ type: 'set_project', project })
     }
+
+    // sources[*].frames → hash (frames는 /motion/sources/binary로 한 번만 업로드)
+    private async _withSourceHashes(p: any) {
+        const entries = await Promise.all(
+            Object.entries(p?.sources ?? {}).map(async ([sid, s]: [string, any]) => {
+                if (!Array.isArray(s?.frames)) return [sid, s]
+                const hash = await this._uploadSource(s.frames)
+                return [sid, { ...s, frames: undefined, hash }]
+            })
+        )
+        return { ...p, sources: Object.fromEntries(entries) }
+    }
+
+    private _uploadSource(frames: number[][]): Promise<string> {
+        let pending = this._sourceHashes.get(frames)
+        if (!pending) {
+            // Float64 raw 버퍼로 업로드 (JSON 직렬화/프레임별 검증 X, 해시도 JSON 경로와 동일)
+            const dof = frames[0]?.length ?? 0
+            const buf = new Float64Array(frames.length * dof)
+            frames.forEach((row, i) => buf.set(row, i * dof))
+            const form = new FormData()
+            form.append('file', new Blob([buf.buffer]), 'frames.f64')
+            form.append('header', JSON.stringify({ dtype: 'f64' }))
+            pending = fetch(`${this.httpBase}/motion/sources/binary`, {
+                method: 'POST',
+                body: form,
+            }).then(async res => {
+                if (!res.ok) throw new Error(`HTTP ${res.status}`)
+                return (await res.json()).hash as string
+            })
+            pending.catch(() => this._sourceHashes.delete(frames))
+            this._sourceHashes.set(frames, pending)
+        }
+        return pending
+    }
+    // 전체 프로젝트 대신 편집 op만 전송 (소스 프레임 재전송 X)
+    applyOps(ops: MotionOp[]) {
+        if (!ops.length) return
+        this._send({ type: 'apply_ops', ops })
+    }
+    // seek / prefetch / envelope는 요청 id를 돌려준다 (응답의 req와 비교)
     seek(t_ms: number) {
         // console.log('Seeking to:', t_ms)
-        this._send({ type: 'seek', t_ms: Math.max(0, Math.round(t_ms)) })
+        const req = ++this._reqSeq
+        this._send({ type: 'seek', t_ms: Math.max(0, Math.round(t_ms)), req })
+        return req
+    }
+    // joint_mask: 비트 i → 관절 i만 받기 (생략 시 전체)
+    prefetch(center_ms: number, window_ms = 4000, step_ms = 16.67, joint_mask?: number) {
+        const req = ++this._reqSeq
+        this._send({ type: 'prefetch', center_ms, window_ms, step_ms, req, joint_mask })
+        return req
     }
-    prefetch(center_ms: number, window_ms = 4000, step_ms = 16.67) {
-        this._send({ type: 'prefetch', center_ms, window_ms, step_ms })
+
+    // [t0, t1) 구간을 pixels개 min/max/mean 버킷으로 (sourceId 지정 시 소스 기준 시각)
+    envelope(t0_ms: number, t1_ms: number, pixels: number, sourceId?: string) {
+        const req = ++this._reqSeq
+        this._send({ type: 'envelope', t0_ms, t1_ms, pixels: Math.max(1, Math.round(pixels)), sourceId, req })
+        return req
     }
 
     private _send(obj: any) {